@@ -1,43 +1,321 @@
 #!/usr/bin/env python3
 
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for
+from flask import (Flask, Request, Response, render_template, request, send_file, flash, redirect,
+                   url_for, jsonify, stream_with_context)
 import openpyxl
-from docx import Document
-from docx.enum.text import WD_BREAK
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet uploads are optional
+    pq = None
+from docx.oxml import parse_xml
+from lxml import etree
 import os
 import tempfile
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import re
+import io
+import csv
+import codecs
+import shutil
+import sys
+import json
+import hashlib
+import mmap
+import zipfile
+import logging
+import threading
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+
+from jobs import DONE, JobQueue, QueueFull
+from log_config import configure_logging
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, DOCUMENTS, REGISTRY, StageTimings
+from page_cache import PageCache, page_fingerprint
+from pdf_convert import PdfConverter
+from result_cache import ResultCache
+from docx_stream import ChunkSink, SpooledOutput, StreamingDocxWriter
+from form_spec import FormSpecError, detect_form_spec, load_form_spec
+from template_cache import TEMPLATE_CACHE, CompiledTemplate, get_template
+from template_registry import TemplateRegistry
+from profiles import ProfileStore
+from rows import CONTEXT_FIELDS, Row, RowContext
+from validation import ValidationReport
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Uploaded files are kept in memory up to this many bytes, then spooled to a temp file
+UPLOAD_SPILL_THRESHOLD = int(os.environ.get('ARN_UPLOAD_SPILL_THRESHOLD', str(4 * 1024 * 1024)))
+
+
+class UploadRequest(Request):
+    """Request whose file uploads spill to disk only past UPLOAD_SPILL_THRESHOLD."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPILL_THRESHOLD, mode='rb+')
+
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.secret_key = 'your-secret-key-here'  # Change this to a random secret key
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv', 'tsv'} | ({'parquet'} if pq is not None else set())
+UPLOAD_TYPES = ', '.join('.' + ext for ext in sorted(ALLOWED_EXTENSIONS))
+# Upload kind by content type, for file names without a known extension
+UPLOAD_CONTENT_TYPES = {
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'application/vnd.ms-excel': 'xls',
+    'text/csv': 'csv',
+    'text/tab-separated-values': 'tsv',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+}
+# Bundled templates live next to this file, wherever the server is started from
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 # Prefer new template when available
-NEW_TEMPLATE_DOCX = "New ARN Change form.docx"
-OLD_TEMPLATE_DOCX = "Request for Change of Broker.docx"
+NEW_TEMPLATE_DOCX = os.path.join(APP_DIR, "New ARN Change form.docx")
+OLD_TEMPLATE_DOCX = os.path.join(APP_DIR, "Request for Change of Broker.docx")
 TEMPLATE_DOCX = NEW_TEMPLATE_DOCX if os.path.exists(NEW_TEMPLATE_DOCX) else OLD_TEMPLATE_DOCX
+# Field specs (see form_spec) of the bundled templates; a template without a spec
+# of its own is filled with the first of these that detects it
+BUNDLED_FORM_SPECS = (os.path.join(APP_DIR, "New ARN Change form.json"),
+                      os.path.join(APP_DIR, "Request for Change of Broker.json"))
+# Further templates (each .docx with an optional <name>.json spec), selectable by id
+TEMPLATE_DIR = os.environ.get('ARN_TEMPLATE_DIR', os.path.join(APP_DIR, 'form_templates'))
+# Seconds between checks for changed templates (0 disables reloading)
+TEMPLATE_RELOAD_INTERVAL = float(os.environ.get('ARN_TEMPLATE_RELOAD_INTERVAL', '2'))
 
-# Defaults used only when Excel does not provide values
+# Values of the built-in 'default' distributor profile (see PROFILES)
 DEFAULT_NEW_ARN_CODE = "310082"
 DEFAULT_NEW_ARN_NAME = "Shareway Securities Pvt Ltd"
 DEFAULT_EUIN_CODE = "588234"
 DEFAULT_EUIN_NAME = "Ajath Anjanappa"
 DEFAULT_PLACE = "Bengaluru, Karnataka"
+DEFAULT_PROFILE = 'default'
+
+# Distributor profiles selectable per request (?profile=<id>); a stored 'default'
+# profile replaces the built-in one
+PROFILES = ProfileStore(os.environ.get('ARN_PROFILE_DB', os.path.join(APP_DIR, 'profiles.db')))
+
+# Parallel page rendering: 0/1 = serial, N = N worker
+# processes, 'auto' = one per CPU. Small documents are always rendered serially.
+RENDER_WORKERS = os.environ.get('ARN_RENDER_WORKERS', '0')
+PARALLEL_MIN_PAGES = 8
+
+# Page packing for templates whose spec has group_by: 'group' puts only rows with
+# equal group_by fields on a page (shared fields are filled from one row), 'file'
+# keeps file order
+PAGE_PACKING = os.environ.get('ARN_PAGE_PACKING', 'group')
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+PDF_MIMETYPE = 'application/pdf'
+OUTPUT_FORMATS = ('docx', 'pdf')
+
+# Generated documents stay in memory up to this many bytes, then spill to a temp file
+SPILL_THRESHOLD = int(os.environ.get('ARN_SPILL_THRESHOLD', str(16 * 1024 * 1024)))
+
+# Batch mode (POST /batch and populate_arn_form.py --batch): workbooks rendered at once
+BATCH_WORKERS = int(os.environ.get('ARN_BATCH_WORKERS', '4'))
+# Seconds an /upload or /batch request may spend reading rows and filling pages
+# (0 = no limit). gunicorn's worker timeout only catches workers that stop
+# responding altogether, so the deadline is checked as rows are consumed
+REQUEST_TIMEOUT = int(os.environ.get('ARN_REQUEST_TIMEOUT', '120'))
+
+# Limits on what a /batch upload may expand to once its .zip archives are unpacked
+BATCH_MAX_FILES = int(os.environ.get('ARN_BATCH_MAX_FILES', '500'))
+BATCH_MAX_FILE_BYTES = int(os.environ.get('ARN_BATCH_MAX_FILE_BYTES', str(64 * 1024 * 1024)))
+BATCH_MAX_TOTAL_BYTES = int(os.environ.get('ARN_BATCH_MAX_TOTAL_BYTES', str(256 * 1024 * 1024)))
+
+# Generated documents for repeated uploads (0 bytes disables the cache). They hold
+# client data, so the directory is private to the server's user (see result_cache)
+RESULT_CACHE = ResultCache(
+    os.environ.get('ARN_RESULT_CACHE_DIR') or os.path.join(APP_DIR, 'result_cache'),
+    max_bytes=int(os.environ.get('ARN_RESULT_CACHE_BYTES', str(256 * 1024 * 1024))),
+)
+
+# PDF output (format=pdf) through headless LibreOffice, with reused profiles;
+# converted PDFs are cached next to the result cache, keyed by the .docx hash
+PDF_CONVERTER = PdfConverter(
+    workers=int(os.environ.get('ARN_PDF_WORKERS', '2')),
+    timeout=int(os.environ.get('ARN_PDF_TIMEOUT', '120')),
+    cache=ResultCache(os.path.join(RESULT_CACHE.directory, 'pdf'), RESULT_CACHE.max_bytes, suffix='.pdf'),
+)
+
+# Filled pages kept in memory so re-uploads of an edited workbook only re-render
+# the pages whose rows changed. Off by default (0): fingerprinting and storing
+# every page makes first renders slower
+PAGE_CACHE = PageCache(max_bytes=int(os.environ.get('ARN_PAGE_CACHE_BYTES', '0')))
+
+# Background generation jobs (POST /jobs)
+JOB_QUEUE = JobQueue(
+    max_workers=int(os.environ.get('ARN_JOB_WORKERS', '2')),
+    max_pending=int(os.environ.get('ARN_JOB_MAX_PENDING', '16')),
+    ttl_seconds=int(os.environ.get('ARN_JOB_TTL', '3600')),
+)
+
+# Scrape-time views of the template cache and job queue for /metrics
+for _stat in ('hits', 'misses', 'evictions'):
+    REGISTRY.callback(f'arn_template_cache_{_stat}_total', 'counter', f'Template cache {_stat}.',
+                      lambda stat=_stat: TEMPLATE_CACHE.stats()[stat])
+REGISTRY.callback('arn_template_cache_entries', 'gauge', 'Parsed templates held in the cache.',
+                  lambda: TEMPLATE_CACHE.stats()['entries'])
+REGISTRY.callback('arn_templates', 'gauge', 'Templates available for selection.',
+                  lambda: len(TEMPLATES.ids()))
+REGISTRY.callback('arn_template_reloads_total', 'counter', 'Templates reloaded after their files changed.',
+                  lambda: TEMPLATES.reloads)
+REGISTRY.callback('arn_template_load_errors_total', 'counter', 'Template versions that failed to load.',
+                  lambda: TEMPLATES.errors)
+for _stat in ('hits', 'misses', 'evictions'):
+    REGISTRY.callback(f'arn_result_cache_{_stat}_total', 'counter', f'Result cache {_stat}.',
+                      lambda stat=_stat: RESULT_CACHE.stats()[stat])
+REGISTRY.callback('arn_result_cache_bytes', 'gauge', 'Bytes of cached results on disk.',
+                  lambda: RESULT_CACHE.stats()['bytes'])
+for _stat in ('hits', 'misses', 'evictions'):
+    REGISTRY.callback(f'arn_page_cache_{_stat}_total', 'counter', f'Page cache {_stat}.',
+                      lambda stat=_stat: PAGE_CACHE.stats()[stat])
+REGISTRY.callback('arn_jobs', 'gauge', 'Background jobs by state.',
+                  lambda: [({'state': state}, count) for state, count in JOB_QUEUE.stats().items()
+                           if state in ('queued', 'running', 'finished')])
 
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def _looks_like_pan(value: str) -> bool:
-    """Detect if a string looks like a PAN number (e.g., ABCDE1234F)."""
-    if value is None:
-        return False
-    s = str(value).strip().upper().replace(" ", "")
-    return bool(re.fullmatch(r"[A-Z]{5}[0-9]{4}[A-Z]", s))
+def upload_kind(filename, content_type=None):
+    """Reader kind (a READERS key) for an upload, from its extension or else its content type."""
+    if allowed_file(filename):
+        return filename.rsplit('.', 1)[1].lower()
+    kind = UPLOAD_CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+    return kind if kind in ALLOWED_EXTENSIONS else None
+
+
+class MappedUpload(io.RawIOBase):
+    """Read-only, seekable file object over a memory map of a spooled upload."""
+
+    def __init__(self, fileno):
+        self._map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._map.read(size if size is not None and size >= 0 else None)
+
+    def readinto(self, buffer):
+        start = self._map.tell()
+        end = min(start + len(buffer), len(self._map))
+        buffer[:end - start] = self._map[start:end]
+        self._map.seek(end)
+        return end - start
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._map.seek(offset, whence)
+        return self._map.tell()
+
+    def tell(self):
+        return self._map.tell()
+
+    def close(self):
+        if not self.closed:
+            self._map.close()
+        super().close()
+
+
+def open_upload(file):
+    """Return a seekable binary reader over an uploaded file, without copying it.
+
+    Small uploads are read straight from the in-memory upload buffer; uploads
+    that were spooled to a temp file are memory-mapped. Close the reader when done.
+    """
+    stream = file.stream
+    # SpooledTemporaryFile only has a real file descriptor once it has rolled over;
+    # calling fileno() earlier would force it to disk
+    if getattr(stream, '_rolled', False):
+        stream.flush()
+        if os.fstat(stream.fileno()).st_size:
+            return MappedUpload(stream.fileno())
+    if stream.seekable():
+        stream.seek(0)
+        return stream
+    buffer = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPILL_THRESHOLD)
+    shutil.copyfileobj(stream, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def render_settings(template, context=None):
+    """Everything besides the rows that shapes a document rendered with template today.
+
+    context is the RowContext of the rows (default_row_context() if None).
+    """
+    context = context or default_row_context()
+    return [
+        template.content_hash,
+        get_form(template).spec_hash,
+        os.path.basename(template.path),
+        *(getattr(context, field) for field in CONTEXT_FIELDS),
+        datetime.now().strftime('%d-%m-%Y'),
+    ]
+
+
+def result_cache_key(upload, template, sheets=None, context=None, kind='xlsx'):
+    """Return the result cache key for an upload rendered with template today.
+
+    Covers the upload bytes, the reader kind (the same bytes read as CSV and
+    as TSV give different rows), the sheet selection and render_settings.
+    upload is rewound afterwards.
+    """
+    upload_hash = hashlib.sha256()
+    for block in iter(lambda: upload.read(1024 * 1024), b''):
+        upload_hash.update(block)
+    upload.seek(0)
+    settings = [upload_hash.hexdigest(), kind, sheets or []] + render_settings(template, context)
+    return hashlib.sha256(json.dumps(settings).encode()).hexdigest()
+
+
+def _primed(first, chunks):
+    """Yield first, then the rest of the chunks generator (closing it with this one)."""
+    yield first
+    yield from chunks
+
+
+def cache_result(chunks, writer):
+    """Pass chunks through while saving them to a result cache writer.
+
+    The entry is only published when the whole document was produced and sent.
+    """
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            yield chunk
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit()
+
+
+def warm_pdf_converter():
+    """Create the LibreOffice profiles ahead of the first PDF request (see ARN_PDF_WARM)."""
+    if PDF_CONVERTER.available and os.path.exists(TEMPLATE_DOCX):
+        try:
+            PDF_CONVERTER.warm(get_template(TEMPLATE_DOCX).blob)
+        except Exception as e:
+            logger.warning("Could not warm the PDF converter: %s", e)
+
+
+def output_name(name, fmt):
+    """Replace the extension of a .docx file name for the requested output format."""
+    return os.path.splitext(name)[0] + '.' + fmt
 
 
 def _format_euin(euin_code: str) -> str:
@@ -49,8 +327,351 @@ def _format_euin(euin_code: str) -> str:
     return f"E{clean_code}" if clean_code else ""
 
 
-def read_excel_data(excel_file_path):
-    """Read data from Excel file and return as list of dictionaries (one per row).
+# Columns A-F of the upload sheet
+EXCEL_COLUMNS = 6
+# Rows normalized together in one column-wise pass
+NORMALIZE_BATCH_ROWS = 1024
+# A PAN (e.g. ABCDE1234F); column C values of this shape are PANs, not scheme names
+PAN_RE = re.compile(r"[A-Z]{5}[0-9]{4}[A-Z]")
+
+
+def default_row_context():
+    """RowContext of the built-in 'default' profile: the new ARN, EUIN and place shared by every row."""
+    return RowContext(
+        new_arn_code=DEFAULT_NEW_ARN_CODE,
+        new_arn_name=DEFAULT_NEW_ARN_NAME,
+        new_euin_code=_format_euin(DEFAULT_EUIN_CODE),
+        euin_name=DEFAULT_EUIN_NAME,
+        place=DEFAULT_PLACE,
+    )
+
+
+def profile_row_context(profile_id=None):
+    """RowContext for a distributor profile in PROFILES (default: DEFAULT_PROFILE).
+
+    Falls back to default_row_context() for DEFAULT_PROFILE when it is not
+    stored. Raises KeyError for an unknown profile.
+    """
+    profile_id = profile_id or DEFAULT_PROFILE
+    values = PROFILES.get(profile_id)
+    if values is None:
+        if profile_id == DEFAULT_PROFILE:
+            return default_row_context()
+        raise KeyError(profile_id)
+    values['new_euin_code'] = _format_euin(values['new_euin_code'])
+    return RowContext(**values)
+
+
+def list_profiles():
+    """{id: fields} of every profile, the built-in default included unless stored."""
+    profiles = {DEFAULT_PROFILE: default_row_context().to_dict()}
+    profiles.update(PROFILES.list())
+    return profiles
+
+
+def _clean_column(values):
+    return ['' if v is None else str(v).strip() for v in values]
+
+
+def normalize_columns(row_nums, columns, report=None, sheet=None, context=None):
+    """Turn the raw A-F columns of a batch of sheet rows into Rows, skipping empty rows.
+
+    columns holds one list of raw cell values per column (A-F), aligned with
+    row_nums. Each step runs over a whole column at a time: values are
+    stripped, column C is classified as PAN or scheme override with one regex
+    pass and empty rows are dropped through a mask. Rows share context
+    (default_row_context() if None). Kept rows are checked into report (a
+    validation.ValidationReport), if given.
+    """
+    schemes_a, folios, cols_c, investors, old_codes, old_names = map(_clean_column, columns)
+
+    # PAN in column C; if not a PAN and non-empty, it overrides the scheme name (column A)
+    pans = [c.upper().replace(" ", "") if c else '' for c in cols_c]
+    # Reuse the cell's string when it is already a clean PAN rather than keeping a copy per row
+    pans = [(c if p == c else p) if p and PAN_RE.fullmatch(p) else '' for p, c in zip(pans, cols_c)]
+    schemes = [c if c and not p else a for a, c, p in zip(schemes_a, cols_c, pans)]
+    # Schemes and old ARNs repeat across many rows: keep one string object per distinct value
+    schemes, old_codes, old_names = ([sys.intern(v) for v in column] for column in (schemes, old_codes, old_names))
+
+    keep = [
+        bool((scheme and scheme != 'None') or (folio and folio != 'None') or (investor and investor != 'None'))
+        for scheme, folio, investor in zip(schemes, folios, investors)
+    ]
+
+    context = context or default_row_context()
+    rows = [
+        Row(context, folio, scheme, investor, pan, old_code, old_name)
+        for folio, scheme, investor, pan, old_code, old_name, kept
+        in zip(folios, schemes, investors, pans, old_codes, old_names, keep)
+        if kept
+    ]
+
+    if report is not None or logger.isEnabledFor(logging.DEBUG):
+        kept_rows = iter(rows)
+        for row_num, kept, column_c in zip(row_nums, keep, cols_c):
+            if not kept:
+                logger.debug("SKIPPING empty row %s", row_num)
+                continue
+            data = next(kept_rows)
+            logger.debug("Row %s: %s", row_num, data)
+            if report is not None:
+                report.check_row(row_num, sheet, data.folio_no, data.scheme_name, data.pan, column_c)
+    return rows
+
+
+def normalize_rows(numbered_values, report=None, sheet=None, context=None):
+    """normalize_columns for (row number, raw values) pairs; short rows read as empty trailing cells."""
+    if not numbered_values:
+        return []
+    row_nums = [row_num for row_num, _ in numbered_values]
+    padding = (None,) * EXCEL_COLUMNS
+    columns = list(zip(*[(tuple(values) + padding)[:EXCEL_COLUMNS] for _, values in numbered_values]))
+    return normalize_columns(row_nums, columns, report, sheet, context)
+
+
+def _iter_normalized_rows(numbered_values, report=None, sheet=None, context=None):
+    """Yield Rows for (row number, values) pairs, NORMALIZE_BATCH_ROWS at a time."""
+    context = context or default_row_context()
+    iterator = iter(numbered_values)
+    while True:
+        batch = list(islice(iterator, NORMALIZE_BATCH_ROWS))
+        if not batch:
+            return
+        yield from normalize_rows(batch, report, sheet, context)
+
+
+def _sheet_mutual_fund(title):
+    """Mutual fund name for a sheet tab ('HDFC' or 'HDFC Mutual Fund' -> 'HDFC')."""
+    return re.sub(r'\s*mutual\s+fund\s*$', '', title.strip(), flags=re.IGNORECASE) or title.strip()
+
+
+def _iter_sheet_rows(sheet, tag=False, report=None, context=None):
+    """Yield the Rows of one worksheet.
+
+    With tag, rows carry the sheet name ('sheet') and take their mutual fund
+    from it, so pages are headed per AMC instead of 'Multiple'.
+    """
+    mutual_fund = _sheet_mutual_fund(sheet.title) if tag else None
+    numbered = enumerate(sheet.iter_rows(min_row=2, max_col=EXCEL_COLUMNS, values_only=True), start=2)
+    for data in _iter_normalized_rows(numbered, report, sheet.title, context):
+        if tag:
+            data.sheet = sheet.title
+            data.mutual_fund = mutual_fund
+        yield data
+
+
+def _select_sheets(workbook, sheets):
+    """Names of the sheets to read: every visible worksheet, or the requested ones in order."""
+    if not sheets:
+        return [ws.title for ws in workbook.worksheets if ws.sheet_state == 'visible']
+    missing = [name for name in sheets if name not in workbook.sheetnames]
+    if missing:
+        raise ValueError(f"Sheet(s) not found: {', '.join(missing)}")
+    return list(sheets)
+
+
+def _parse_sheet(source, title, tag, validate=False, context=None):
+    """Worker task: return the Rows of one sheet of a workbook (path or bytes).
+
+    Returns (rows, ValidationReport for the sheet, or None unless validate).
+    """
+    workbook = openpyxl.load_workbook(io.BytesIO(source) if isinstance(source, bytes) else source, read_only=True)
+    report = ValidationReport() if validate else None
+    try:
+        return list(_iter_sheet_rows(workbook[title], tag, report, context)), report
+    finally:
+        workbook.close()
+
+
+def iter_excel_rows(excel_file_path, sheets=None, workers=None, report=None, context=None):
+    """Yield Rows from the workbook lazily, sheet by sheet.
+
+    excel_file_path may be a path or a seekable binary file-like object
+    (e.g. from open_upload). sheets selects worksheets by name; by default
+    every visible worksheet is read. When sheets are chosen or more than one
+    is read, rows are tagged with their sheet (see _iter_sheet_rows) and, with workers > 1
+    (default RENDER_WORKERS), the sheets are parsed in the process pool.
+    Issues in the rows are added to report (a ValidationReport), if given.
+    All rows share context (default_row_context() if None).
+
+    Uses iter_rows(values_only=True) so read-only workbooks are streamed once
+    instead of being re-scanned for every cell, and does not rely on
+    sheet.max_row (unreliable in read-only mode). The workbook is closed when
+    the generator is exhausted or closed.
+    """
+    logger.debug("Starting Excel file reading: %s", excel_file_path)
+    workbook = openpyxl.load_workbook(excel_file_path, read_only=True)
+    context = context or default_row_context()
+    pending = []
+    try:
+        titles = _select_sheets(workbook, sheets)
+        tag = len(titles) > 1 or bool(sheets)
+        logger.debug("Excel file loaded successfully")
+        logger.debug("Sheets: %s", titles)
+
+        rows_found = 0
+        workers = _render_worker_count(workers)
+        if tag and workers > 1:
+            if isinstance(excel_file_path, (str, os.PathLike)):
+                source = os.path.abspath(excel_file_path)
+            else:
+                excel_file_path.seek(0)
+                source = excel_file_path.read()
+            pool = get_render_pool(workers)
+            pending = [pool.submit(_parse_sheet, source, title, tag, report is not None, context)
+                       for title in titles]
+
+            def parsed():
+                for future in pending:
+                    rows, sheet_report = future.result()
+                    if sheet_report is not None:
+                        report.merge(sheet_report)
+                    yield rows
+
+            sheet_rows = parsed()
+        else:
+            sheet_rows = (_iter_sheet_rows(workbook[title], tag, report, context) for title in titles)
+
+        for rows in sheet_rows:
+            for data in rows:
+                rows_found += 1
+                yield data
+
+        logger.info("Excel reading complete. Total data rows found: %s", rows_found)
+    finally:
+        for future in pending:
+            future.cancel()
+        workbook.close()
+        logger.debug("Excel workbook closed")
+
+
+# Encodings tried for CSV/TSV exports, in order: UTF-8 (with or without a BOM),
+# then the ANSI code page Excel on Windows saves "CSV" files in
+TEXT_ENCODINGS = ('utf-8-sig', 'cp1252')
+
+
+def detect_text_encoding(binary, encodings=TEXT_ENCODINGS, chunk_size=1024 * 1024):
+    """Return the first of encodings that decodes the whole seekable binary file.
+
+    The file is read in chunks and rewound. Raises ValueError if none fits, so
+    a bad export fails before any row is used rather than part way through.
+    """
+    for encoding in encodings:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        binary.seek(0)
+        try:
+            for chunk in iter(lambda: binary.read(chunk_size), b''):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        binary.seek(0)
+        return encoding
+    raise ValueError("Could not read the text file: it is neither UTF-8 nor Windows-1252 encoded. "
+                     "Save it as 'CSV UTF-8' and upload it again.")
+
+
+def iter_delimited_rows(source, sheets=None, workers=None, report=None, context=None, delimiter=','):
+    """Yield Rows from a CSV (or, with delimiter='\\t', TSV) export.
+
+    The file has a header line and the same columns as the workbook (A-F),
+    in UTF-8 or Windows-1252 (see TEXT_ENCODINGS). source may be a path or a
+    seekable binary file-like object, which is left open. It is read with the
+    csv module (parsed in C), so workers is unused; sheets cannot be selected
+    in a text export.
+    """
+    if sheets:
+        raise ValueError('Sheets can only be selected in Excel workbooks')
+    binary = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        encoding = detect_text_encoding(binary)
+    except BaseException:
+        if binary is not source:
+            binary.close()
+        raise
+    if encoding != TEXT_ENCODINGS[0]:
+        logger.info("Text file is not UTF-8, reading it as %s", encoding)
+    text = io.TextIOWrapper(binary, encoding=encoding, newline='')
+    rows_found = 0
+    try:
+        reader = csv.reader(text, delimiter=delimiter)
+        next(reader, None)  # header line
+        for data in _iter_normalized_rows(enumerate(reader, start=2), report, context=context):
+            rows_found += 1
+            yield data
+        logger.info("CSV reading complete. Total data rows found: %s", rows_found)
+    finally:
+        if text.buffer is source:
+            text.detach()
+        else:
+            text.close()
+
+
+def iter_tsv_rows(source, sheets=None, workers=None, report=None, context=None):
+    """Yield Rows from a tab-separated export (see iter_delimited_rows)."""
+    return iter_delimited_rows(source, sheets, workers, report, context, delimiter='\t')
+
+
+# Rows decoded per Parquet record batch
+PARQUET_BATCH_ROWS = 65536
+
+
+def _parquet_value(value):
+    # Whole numbers stored as doubles read like the integer cells openpyxl returns
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def iter_parquet_rows(source, sheets=None, workers=None, report=None, context=None):
+    """Yield Rows from a Parquet export whose first six columns are A-F.
+
+    Needs pyarrow. Columns are decoded a record batch at a time, so memory
+    stays bounded for large files.
+    """
+    if sheets:
+        raise ValueError('Sheets can only be selected in Excel workbooks')
+    if pq is None:
+        raise ValueError('Parquet uploads need pyarrow, which is not installed')
+    parquet = pq.ParquetFile(source)
+    context = context or default_row_context()
+    rows_found = 0
+    row_num = 1
+    try:
+        names = parquet.schema_arrow.names[:EXCEL_COLUMNS]
+        for batch in parquet.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=names):
+            # Already columnar: normalized without going through row tuples
+            columns = [[_parquet_value(v) for v in column.to_pylist()] for column in batch.columns]
+            columns += [[None] * batch.num_rows] * (EXCEL_COLUMNS - len(columns))
+            row_nums = range(row_num, row_num + batch.num_rows)
+            for data in normalize_columns(row_nums, columns, report, context=context):
+                rows_found += 1
+                yield data
+            row_num += batch.num_rows
+        logger.info("Parquet reading complete. Total data rows found: %s", rows_found)
+    finally:
+        parquet.close()
+
+
+# Row readers by upload kind; each takes (source, sheets=None, workers=None,
+# report=None, context=None) and yields the same normalized Rows
+READERS = {
+    'xlsx': iter_excel_rows,
+    'xls': iter_excel_rows,
+    'csv': iter_delimited_rows,
+    'tsv': iter_tsv_rows,
+    'parquet': iter_parquet_rows,
+}
+
+
+def iter_upload_rows(source, kind='xlsx', sheets=None, workers=None, report=None, context=None):
+    """Yield Rows from a path or binary file-like source with the reader for kind."""
+    reader = READERS.get(kind)
+    if reader is None:
+        raise ValueError(f"Unsupported file type '{kind}' (use {UPLOAD_TYPES})")
+    return reader(source, sheets, workers, report, context)
+
+
+def read_excel_data(excel_file_path, kind=None):
+    """Read data from Excel file and return as list of Rows (read-only mappings, one per row).
     Expected columns:
       A: Scheme Name
       B: Folio No
@@ -58,537 +679,717 @@ def read_excel_data(excel_file_path):
       D: Investor [First Holder only]
       E: Old ARN Number
       F: Old ARN Name
+    CSV, TSV and Parquet files with the same columns are read too; kind
+    defaults to the file's extension.
     """
-    print(f"[DEBUG] Starting Excel file reading: {excel_file_path}")
-    workbook = None
     try:
-        workbook = openpyxl.load_workbook(excel_file_path, read_only=True)
-        sheet = workbook.active
-        print(f"[DEBUG] Excel file loaded successfully")
-        print(f"[DEBUG] Sheet name: {sheet.title}")
-        print(f"[DEBUG] Max row: {sheet.max_row}, Max column: {sheet.max_column}")
-        
-        data_rows = []
-        max_row = sheet.max_row
-        
-        print(f"[DEBUG] Processing rows 2 to {max_row}")
-        
-        for row_num in range(2, max_row + 1):
-            print(f"[DEBUG] --- Processing Row {row_num} ---")
-            
-            # Columns
-            scheme_a = sheet[f'A{row_num}'].value
-            folio_no = sheet[f'B{row_num}'].value
-            column_c = sheet[f'C{row_num}'].value
-            investor = sheet[f'D{row_num}'].value
-            old_arn_number = sheet[f'E{row_num}'].value
-            old_arn_name = sheet[f'F{row_num}'].value
-            
-            print(f"[DEBUG] Raw values: A='{scheme_a}' (type: {type(scheme_a)})")
-            print(f"[DEBUG] Raw values: B='{folio_no}' (type: {type(folio_no)})")
-            print(f"[DEBUG] Raw values: C='{column_c}' (type: {type(column_c)})")
-            print(f"[DEBUG] Raw values: D='{investor}' (type: {type(investor)})")
-            print(f"[DEBUG] Raw values: E='{old_arn_number}' (type: {type(old_arn_number)})")
-            print(f"[DEBUG] Raw values: F='{old_arn_name}' (type: {type(old_arn_name)})")
-            
-            # Normalize
-            scheme_a_str = str(scheme_a).strip() if scheme_a is not None else ''
-            folio_no_str = str(folio_no).strip() if folio_no is not None else ''
-            col_c_str = str(column_c).strip() if column_c is not None else ''
-            investor_str = str(investor).strip() if investor is not None else ''
-            old_arn_number_str = str(old_arn_number).strip() if old_arn_number is not None else ''
-            old_arn_name_str = str(old_arn_name).strip() if old_arn_name is not None else ''
-
-            # Detect PAN in column C; if not PAN and non-empty, allow as override for scheme
-            pan_from_c = col_c_str.upper().replace(" ", "") if _looks_like_pan(col_c_str) else ''
-            scheme_from_c = '' if pan_from_c else col_c_str
-
-            # Final scheme name: prefer Column C when provided and not PAN; else Column A
-            scheme_name_str = scheme_from_c if scheme_from_c else scheme_a_str
-            # PAN for backward compatibility
-            pan_str = pan_from_c
-            
-            print(f"[DEBUG] Processed: SCHEME_A='{scheme_a_str}', SCHEME_C='{scheme_from_c}', SCHEME_FINAL='{scheme_name_str}', PAN_FROM_C='{pan_str}'")
-            print(f"[DEBUG] Processed: FOLIO='{folio_no_str}', INVESTOR='{investor_str}'")
-            print(f"[DEBUG] Processed: OLD_ARN_NUM='{old_arn_number_str}', OLD_ARN_NAME='{old_arn_name_str}'")
-            
-            has_data = any([
-                scheme_name_str and scheme_name_str != 'None',
-                folio_no_str and folio_no_str != 'None',
-                investor_str and investor_str != 'None'
-            ])
-            print(f"[DEBUG] Row {row_num} has data: {has_data}")
-            if not has_data:
-                print(f"[DEBUG] SKIPPING empty row {row_num}")
-                continue
-                
-            data = {
-                # Use a generic header indicator for the new template
-                'mutual_fund': 'Multiple',
-                'folio_no': folio_no_str,
-                'scheme_name': scheme_name_str,
-                'investor': investor_str,
-                'pan': pan_str,
-                # Old ARN details from Excel
-                'old_arn_code': old_arn_number_str,
-                'old_arn_name': old_arn_name_str,
-                # Hardcoded new ARN values
-                'new_arn_code': DEFAULT_NEW_ARN_CODE,
-                'new_arn_name': DEFAULT_NEW_ARN_NAME,
-                'new_sub_arn_code': '',
-                'new_euin_code': _format_euin(DEFAULT_EUIN_CODE),
-                'sub_distributor_name': '',
-                'euin_name': DEFAULT_EUIN_NAME,
-                'arn_euin_holder_signature': '',
-                'new_distributor_staff_info': '',
-                'place': DEFAULT_PLACE,
-            }
-            data_rows.append(data)
-            print(f"[DEBUG] ADDED row {row_num} to data_rows (total now: {len(data_rows)})")
-        
-        print(f"[DEBUG] Excel reading complete. Total data rows found: {len(data_rows)}")
+        kind = kind or upload_kind(os.fspath(excel_file_path)) or 'xlsx'
+        data_rows = list(iter_upload_rows(excel_file_path, kind))
         return data_rows if data_rows else None
     except Exception as e:
-        print(f"[DEBUG] ERROR reading Excel file: {str(e)}")
+        logger.error("Error reading Excel file: %s", e)
         return None
-    finally:
-        if workbook:
-            workbook.close()
-            print(f"[DEBUG] Excel workbook closed")
 
 
-def populate_single_page_old_form(doc, data):
-    """Populate the legacy 'Request for Change of Broker.docx' template."""
-    print(f"[DEBUG] Starting to populate legacy single page with data: {data}")
-    print(f"[DEBUG] Document has {len(doc.paragraphs)} paragraphs")
-    
-    fields_populated = 0
-    
-    # Process paragraphs with precise formatting preservation
-    for i, paragraph in enumerate(doc.paragraphs):
-        original_text = paragraph.text
-        
-        # Handle "Mutual Fund: " line (Paragraph 3)
-        if original_text.strip() == 'Mutual Fund:':
-            print(f"[DEBUG] Found Mutual Fund field at paragraph {i}")
-            paragraph.clear()
-            # Add bold label
-            run1 = paragraph.add_run("  Mutual Fund: ")
-            run1.bold = True
-            # Add underlined value
-            run2 = paragraph.add_run(str(data['mutual_fund']))
-            run2.underline = True
-            fields_populated += 1
-            print(f"[DEBUG] Populated Mutual Fund: '{data['mutual_fund']}'")
-        
-        # Handle "Folio No:* ... PAN:* " line (Paragraph 4)
-        elif 'Folio No:*' in original_text and 'PAN:*' in original_text:
-            print(f"[DEBUG] Found Folio/PAN field at paragraph {i}")
-            paragraph.clear()
-            # Add bold "Folio No:*" label
-            run1 = paragraph.add_run("      Folio No:* ")
-            run1.bold = True
-            # Add underlined folio number
-            run2 = paragraph.add_run(str(data['folio_no']))
-            run2.underline = True
-            # Add spacing
-            paragraph.add_run("                                                                                                          ")
-            # Add bold "PAN:*" label
-            run3 = paragraph.add_run("PAN:* ")
-            run3.bold = True
-            # Add underlined PAN
-            run4 = paragraph.add_run(str(data['pan']))
-            run4.underline = True
-            fields_populated += 1
-            print(f"[DEBUG] Populated Folio: '{data['folio_no']}', PAN: '{data['pan']}'")
-        
-        # Handle "Investor [First Holder only]:  " line (Paragraph 5)
-        elif original_text.strip() == 'Investor [First Holder only]:':
-            print(f"[DEBUG] Found Investor field at paragraph {i}")
-            paragraph.clear()
-            # Add bold label
-            run1 = paragraph.add_run("  Investor [First Holder only]: ")
-            run1.bold = True
-            # Add underlined value
-            run2 = paragraph.add_run(str(data['investor']).strip())
-            run2.underline = True
-            fields_populated += 1
-            print(f"[DEBUG] Populated Investor: '{data['investor']}'")
-        
-        # Handle acknowledgement slip fields
-        elif original_text.strip() == 'Mutual Fund :':
-            print(f"[DEBUG] Found Acknowledgement Mutual Fund field at paragraph {i}")
-            paragraph.clear()
-            # Add bold label
-            run1 = paragraph.add_run("Mutual Fund : ")
-            run1.bold = True
-            # Add underlined value
-            run2 = paragraph.add_run(str(data['mutual_fund']))
-            run2.underline = True
-            fields_populated += 1
-            print(f"[DEBUG] Populated Ack Mutual Fund: '{data['mutual_fund']}'")
-        elif 'Folio No :' in original_text and 'Date of Receipt:' in original_text:
-            print(f"[DEBUG] Found Acknowledgement Folio field at paragraph {i}")
-            paragraph.clear()
-            # Add bold "Folio No :" label
-            run1 = paragraph.add_run("Folio No : ")
-            run1.bold = True
-            # Add underlined folio number
-            run2 = paragraph.add_run(str(data['folio_no']))
-            run2.underline = True
-            # Add spacing and Date of Receipt
-            paragraph.add_run("                               \t\t                                       Date of Receipt:\t")
-            fields_populated += 1
-            print(f"[DEBUG] Populated Ack Folio: '{data['folio_no']}'")
-    
-    print(f"[DEBUG] Legacy single page population complete. Fields populated: {fields_populated}")
+def _load_bundled_form_specs():
+    specs = []
+    for path in BUNDLED_FORM_SPECS:
+        if os.path.exists(path):
+            specs.append(load_form_spec(path))
+    return specs
+
+
+def form_spec_path(template_path):
+    """The spec file for a template: <template>.json next to the .docx."""
+    return os.path.splitext(template_path)[0] + '.json'
+
 
+def get_form(template):
+    """Return the CompiledForm for a CompiledTemplate, built once per parsed template.
 
-def _replace_text_anywhere(doc, replacements):
-    """Replace text in all text nodes, including inside shapes/textboxes.
-    replacements: dict where key can be a string token or a tuple/list of token variants.
-    Only replaces when the text node matches the token exactly (ignoring surrounding whitespace),
-    to avoid duplicating values when the field is already filled.
+    Uses the template's own spec (see form_spec_path) or else the bundled
+    spec that detects it.
     """
-    text_nodes = doc.part.element.xpath('.//w:t')
-    replaced_counts = {}
-
-    def ensure_iterable(key):
-        if isinstance(key, (list, tuple)):
-            return list(key)
-        return [key]
-
-    for t in text_nodes:
-        current = t.text or ''
-        current_norm = current.replace('\xa0', ' ').strip()
-        for key, val in replacements.items():
-            tokens = ensure_iterable(key)
-            for token in tokens:
-                token_norm = str(token).strip()
-                if current_norm == token_norm:
-                    # Special handling for EUIN to avoid double "E"
-                    if 'EUIN No.: E' in token_norm:
-                        # Replace the entire "EUIN No.: E" with "EUIN No.: E588234"
-                        t.text = f"EUIN No.: {val}"
-                    else:
-                        # Normal replacement
-                        t.text = f"{token_norm} {val}"
-                    replaced_counts[token_norm] = replaced_counts.get(token_norm, 0) + 1
-    print(f"[DEBUG] Textbox replacements: {replaced_counts}")
-
-
-def populate_single_page_new_form(doc, data):
-    """Populate the new 'New ARN Change form.docx' template for a single-entry page (legacy mode)."""
-    print(f"[DEBUG] Starting to populate NEW single page with data: {data}")
-    print(f"[DEBUG] Document has {len(doc.paragraphs)} paragraphs and {len(doc.tables)} tables")
-
-    # Paragraph fills (header/date/place only)
-    today_str = data.get('date') or datetime.now().strftime('%d-%m-%Y')
-    place_str = data.get('place', '')
-
-    for i, paragraph in enumerate(doc.paragraphs):
-        txt = paragraph.text.strip()
-        # Header line with Mutual Fund and Date
-        if ('Mutual Fund' in txt) and ('Date' in txt):
-            print(f"[DEBUG] Found MF/Date header at paragraph {i}")
-            paragraph.clear()
-            paragraph.add_run(f"{data.get('mutual_fund', '')} Mutual Fund\t\t\t\tDate: {today_str}")
-        # Footer Date
-        elif txt.startswith('Date:') and 'Mutual Fund' not in txt:
-            print(f"[DEBUG] Found Date footer at paragraph {i}")
-            paragraph.clear()
-            paragraph.add_run(f"Date: {today_str}")
-        # Footer Place
-        elif txt.lower().startswith('place'):
-            print(f"[DEBUG] Found Place footer at paragraph {i}")
-            paragraph.clear()
-            paragraph.add_run(f"Place: {place_str}")
-
-    # Replace text (left and right) using safe token replacements
-    _replace_text_anywhere(doc, {
-        ('New ARN-.', 'New ARN:', 'New ARN -'): data.get('new_arn_code', DEFAULT_NEW_ARN_CODE),
-        ("Sub-Distributor's ARN", "Sub-Distributor's ARN"): data.get('new_sub_arn_code', ''),
-        ('EUIN No.: E', 'EUIN No.:', 'EUIN No:', 'EUIN No', 'EUIN'): data.get('new_euin_code', _format_euin(DEFAULT_EUIN_CODE)),
-        'ARN Name:': data.get('new_arn_name', DEFAULT_NEW_ARN_NAME),
-        ("Sub-Distributor's name :", "Sub-Distributor's name :"): data.get('sub_distributor_name', ''),
-        'EUIN Name:': data.get('euin_name', ''),
-        ('Signature of ARN/EUIN Holder:', 'Signature of ARN/ EUIN Holder:'): data.get('arn_euin_holder_signature', ''),
-        (
-            'Name, Designation, Employee code of new distributor (if non individual)',
-            'Name, Designation, Employee code of new distributor'
-        ): data.get('new_distributor_staff_info', ''),
-    })
-
-    # Table fills
-    tables = doc.tables
-    # Table 0: Folio/Scheme list (single entry mode)
-    if len(tables) >= 1 and len(tables[0].rows) >= 2:
-        try:
-            tables[0].cell(1, 0).text = str(data.get('folio_no', '')).strip()
-            tables[0].cell(1, 1).text = str(data.get('scheme_name', '')).strip()
-            print("[DEBUG] Filled Table 0: Folio and Scheme")
-        except Exception as e:
-            print(f"[DEBUG] Could not fill Table 0: {e}")
+    def build(doc):
+        spec_path = form_spec_path(template.path)
+        if os.path.exists(spec_path):
+            spec = load_form_spec(spec_path)
+        else:
+            spec = detect_form_spec(doc, _load_bundled_form_specs())
+        logger.debug("Template %s uses form spec '%s'", template.path, spec.name)
+        return spec.compile(doc)
+
+    return template.compiled('form', build)
+
+
+def load_registered_template(path):
+    """TEMPLATES loader: parse a template and compile its form spec, checking both.
+
+    Every version gets a fresh CompiledTemplate, so its form is the spec as
+    it is now even when only the spec changed.
+    """
+    template = TEMPLATE_CACHE.load(path, reload=True)
+    form = get_form(template)
+    if not (form.paragraphs or form.tokens or form.cells or form.repeat_cells):
+        raise FormSpecError(f"form spec '{form.spec.name}' matches nothing in {os.path.basename(path)}")
+    return template, form
+
+
+# Templates selectable per request (?template=new|old|<id>), parsed at startup and
+# reloaded when their files change
+TEMPLATES = TemplateRegistry(
+    {'new': NEW_TEMPLATE_DOCX, 'old': OLD_TEMPLATE_DOCX},
+    TEMPLATE_DIR,
+    load=load_registered_template,
+    spec_path=form_spec_path,
+    pin=TEMPLATE_CACHE.pin,
+    unpin=TEMPLATE_CACHE.unpin,
+)
+
+
+def fill_page(template, rows, form=None):
+    """Fill a fresh copy of template with one page of rows; returns its w:body.
+
+    form defaults to get_form(template). Rows carry their profile values (see
+    Row.context); plain dict rows fall back to default_row_context().
+    """
+    page_doc = template.new_page()
+    defaults = None if isinstance(rows[0], Row) else default_row_context().to_dict()
+    (form or get_form(template)).fill(page_doc, rows, defaults)
+    return page_doc.element.body
+
+
+def chunk_list(items, size):
+    return [items[i:i+size] for i in range(0, len(items), size)]
+
+
+def iter_chunks(items, size):
+    """Lazy chunk_list: yield lists of up to size items from any iterable."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def pack_pages(rows, size, fields):
+    """Yield pages of up to size rows, each holding rows with equal fields only.
+
+    Rows are bin-packed per group, so a group of n rows takes ceil(n / size)
+    pages, the fewest possible. A page is yielded as soon as it is full; the
+    partly filled last page of each group follows at the end, in order of
+    first appearance. Only open pages are held in memory, so rows still stream.
+    """
+    open_pages = {}
+    for row in rows:
+        key = tuple(row.get(field, '') for field in fields)
+        page = open_pages.setdefault(key, [])
+        page.append(row)
+        if len(page) == size:
+            del open_pages[key]
+            yield page
+    yield from open_pages.values()
+
+
+def iter_page_chunks(rows, size):
+    """Like iter_chunks, but a page never mixes rows from different sheets."""
+    chunk = []
+    for row in rows:
+        if chunk and (len(chunk) == size or row.get('sheet') != chunk[0].get('sheet')):
+            yield chunk
+            chunk = []
+        chunk.append(row)
+    if chunk:
+        yield chunk
+
+
+def _render_worker_count(workers):
+    if workers is None:
+        workers = RENDER_WORKERS
+    if workers == 'auto':
+        return os.cpu_count() or 1
+    return max(int(workers), 1)
+
+
+def _warm_render_worker(template_paths):
+    """Process pool initializer: parse and compile templates once per worker up front."""
+    for path in template_paths:
+        if os.path.exists(path):
+            get_form(get_template(path))
+
+
+_render_pool = None
+_render_pool_workers = 0
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool(workers):
+    """Return the shared page-rendering process pool, (re)creating it as needed."""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is None or _render_pool_workers != workers:
+            if _render_pool is not None:
+                _render_pool.shutdown(wait=False)
+            _render_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_warm_render_worker,
+                initargs=(TEMPLATES.paths() or [TEMPLATE_DOCX],),
+            )
+            _render_pool_workers = workers
+        return _render_pool
 
-    # Table 1: ARN details
-    if len(tables) >= 2 and len(tables[1].rows) >= 2 and len(tables[1].rows[1].cells) >= 6:
-        try:
-            old_arn_code = str(data.get('old_arn_code', '')).strip()
-            old_arn_name = str(data.get('old_arn_name', '')).strip()
-            new_arn_code = str(data.get('new_arn_code', DEFAULT_NEW_ARN_CODE)).strip()
-            new_arn_name = str(data.get('new_arn_name', DEFAULT_NEW_ARN_NAME)).strip()
-            new_sub_arn = str(data.get('new_sub_arn_code', '')).strip()
-            new_euin = str(data.get('new_euin_code', _format_euin(DEFAULT_EUIN_CODE))).strip()
-
-            row = tables[1].rows[1]
-            row.cells[0].text = old_arn_code
-            row.cells[1].text = old_arn_name
-            row.cells[2].text = new_arn_code
-            row.cells[3].text = new_arn_name
-            row.cells[4].text = new_sub_arn
-            row.cells[5].text = new_euin
-            print("[DEBUG] Filled Table 1: ARN block")
-        except Exception as e:
-            print(f"[DEBUG] Could not fill Table 1: {e}")
 
-    # Table 2: Investor details (names only, signatures left blank)
-    if len(tables) >= 3 and len(tables[2].rows) >= 3:
+def shutdown_render_pool():
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False)
+        _render_pool = None
+        _render_pool_workers = 0
+
+
+def template_version(template, form):
+    return (template.content_hash, form.spec_hash)
+
+
+def _render_page(template_path, rows, version):
+    """Worker task: fill one page and return its serialized w:body.
+
+    Workers load templates themselves, so after the files change a worker
+    reloads its copy and pins it, as TEMPLATES does in the parent, so later
+    pages use it without parsing again; if that is still not the version the
+    document is rendered with (the files changed again, or do not load), it
+    returns None and the page is filled in the parent process.
+    """
+    template = get_template(template_path)
+    form = get_form(template)
+    if template_version(template, form) != version:
         try:
-            # Row 1 is headers, Row 2 is "Name" row
-            name_row = tables[2].rows[1]
-            first_holder = str(data.get('investor', '')).strip()
-            second_holder = str(data.get('second_holder', '')).strip()
-            third_holder = str(data.get('third_holder', '')).strip()
-            # Columns: [label, 1st, 2nd, 3rd]
-            if len(name_row.cells) >= 4:
-                name_row.cells[1].text = first_holder
-                name_row.cells[2].text = second_holder
-                name_row.cells[3].text = third_holder
-                print("[DEBUG] Filled Table 2: Investor names")
+            # reload: a changed spec alone needs a fresh CompiledTemplate (see get_form)
+            template = TEMPLATE_CACHE.load(template_path, reload=True)
+            form = get_form(template)
         except Exception as e:
-            print(f"[DEBUG] Could not fill Table 2: {e}")
-
-    print("[DEBUG] NEW single page population complete")
-
-
-def populate_single_page_new_form_chunk(doc, data_chunk):
-    """Populate the new template with up to 6 rows on a single page."""
-    print(f"[DEBUG] Populating NEW template page with {len(data_chunk)} row(s)")
-    # Use first row for shared fields
-    first = data_chunk[0]
-    # Paragraphs: header/date/place
-    today_str = first.get('date') or datetime.now().strftime('%d-%m-%Y')
-    place_str = first.get('place', DEFAULT_PLACE)
-
-    # If all mutual funds are the same, use it; else mark as Multiple
-    mf_values = {d.get('mutual_fund','') for d in data_chunk}
-    header_mf = list(mf_values)[0] if len(mf_values) == 1 else 'Multiple'
-
-    for i, paragraph in enumerate(doc.paragraphs):
-        txt = paragraph.text.strip()
-        if ('Mutual Fund' in txt) and ('Date' in txt):
-            paragraph.clear()
-            paragraph.add_run(f"{header_mf} Mutual Fund\t\t\t\tDate: {today_str}")
-        elif txt.startswith('Date:') and 'Mutual Fund' not in txt:
-            paragraph.clear()
-            paragraph.add_run(f"Date: {today_str}")
-        elif txt.lower().startswith('place'):
-            paragraph.clear()
-            paragraph.add_run(f"Place: {place_str}")
-
-    # Replace text (left and right) using safe token replacements
-    _replace_text_anywhere(doc, {
-        ('New ARN-.', 'New ARN:', 'New ARN -'): first.get('new_arn_code', DEFAULT_NEW_ARN_CODE),
-        ("Sub-Distributor's ARN", "Sub-Distributor's ARN"): first.get('new_sub_arn_code', ''),
-        ('EUIN No.: E', 'EUIN No.:', 'EUIN No:', 'EUIN No', 'EUIN'): first.get('new_euin_code', _format_euin(DEFAULT_EUIN_CODE)),
-        'ARN Name:': first.get('new_arn_name', DEFAULT_NEW_ARN_NAME),
-        ("Sub-Distributor's name :", "Sub-Distributor's name :"): first.get('sub_distributor_name', ''),
-        'EUIN Name:': first.get('euin_name', ''),
-        ('Signature of ARN/EUIN Holder:', 'Signature of ARN/ EUIN Holder:'): first.get('arn_euin_holder_signature', ''),
-        (
-            'Name, Designation, Employee code of new distributor (if non individual)',
-            'Name, Designation, Employee code of new distributor'
-        ): first.get('new_distributor_staff_info', ''),
-    })
-
-    # Tables
-    tables = doc.tables
-    # Table 0: fill up to 6 rows
-    if len(tables) >= 1:
-        t0 = tables[0]
-        max_fill = min(6, len(data_chunk))
-        for i in range(max_fill):
-            try:
-                t0.cell(i+1, 0).text = str(data_chunk[i].get('folio_no',''))
-                t0.cell(i+1, 1).text = str(data_chunk[i].get('scheme_name',''))
-            except Exception as e:
-                print(f"[DEBUG] Could not fill Table 0 row {i+1}: {e}")
+            logger.warning("Could not reload template %s in render worker: %s", template_path, e)
+            return None
+        TEMPLATE_CACHE.pin(template)
+        if template_version(template, form) != version:
+            return None
+    return etree.tostring(fill_page(template, rows, form))
+
+
+def _page_context(template):
+    """Fingerprint context for PAGE_CACHE, or None when the cache is disabled."""
+    if not PAGE_CACHE.enabled:
+        return None
+    return json.dumps(render_settings(template)).encode()
+
+
+def _fill_or_reuse(rows, fill, context, timings):
+    """Return the filled w:body for rows: from PAGE_CACHE if an identical page
+    was rendered before, otherwise fill(rows) (and remember the result)."""
+    if context is not None:
+        fingerprint = page_fingerprint(context, rows)
+        xml = PAGE_CACHE.get(fingerprint)
+        if xml is not None:
+            with timings.stage('page_reuse'):
+                return parse_xml(xml)
+    with timings.stage('page_fill'):
+        body = fill(rows)
+        if context is not None:
+            PAGE_CACHE.put(fingerprint, etree.tostring(body))
+    return body
+
+
+def _iter_filled_page_bodies(template, form, template_path, pages, workers, timings, context):
+    """Yield filled w:body elements for pages, in order.
+
+    With workers > 1 the pages are filled in the process pool, keeping a
+    bounded window of pages in flight, and the serialized bodies are parsed
+    back here (page_fill then measures the wait for each result). Otherwise
+    they are filled in-process. Pages found in PAGE_CACHE are not filled again.
+    """
+    if workers <= 1:
+        for page in pages:
+            yield _fill_or_reuse(page, lambda rows: fill_page(template, rows, form), context, timings)
+        return
+
+    pool = get_render_pool(workers)
+    path = os.path.abspath(template_path)
+    version = template_version(template, form)
+    # (fingerprint, cached xml bytes or Future of the worker's xml, page rows)
+    pending = deque()
+
+    def take():
+        fingerprint, item, page = pending.popleft()
+        if isinstance(item, bytes):
+            with timings.stage('page_reuse'):
+                return parse_xml(item)
+        with timings.stage('page_fill'):
+            xml = item.result()
+            if xml is None:
+                xml = etree.tostring(fill_page(template, page, form))
+            if fingerprint is not None:
+                PAGE_CACHE.put(fingerprint, xml)
+            return parse_xml(xml)
+
+    try:
+        for page in pages:
+            fingerprint = xml = None
+            if context is not None:
+                fingerprint = page_fingerprint(context, page)
+                xml = PAGE_CACHE.get(fingerprint)
+            pending.append((fingerprint, xml if xml is not None else pool.submit(_render_page, path, page, version),
+                            page))
+            if len(pending) >= workers * 4:
+                yield take()
+        while pending:
+            yield take()
+    except BrokenProcessPool:
+        shutdown_render_pool()
+        raise
+    finally:
+        for _, item, _ in pending:
+            if not isinstance(item, bytes):
+                item.cancel()
+
+
+def iter_page_bodies(template, template_path, data_list, workers=None, timings=None, packing=None):
+    """Yield the filled w:body element of every page, in order.
 
-    # Table 1: use first row values
-    if len(tables) >= 2 and len(tables[1].rows) >= 2 and len(tables[1].rows[1].cells) >= 6:
+    The template's form spec sets the rows per page (6 for the new template,
+    1 for the legacy one). Rows are grouped by the spec's group_by fields
+    (per AMC and old ARN for the new template) or kept in file order
+    depending on packing (default PAGE_PACKING). Pages are optionally filled
+    in the process pool (see RENDER_WORKERS).
+    Pages whose rows match a recently rendered page are reused from PAGE_CACHE.
+    Fill time is added to timings (a metrics.StageTimings) as page_fill, reused
+    pages as page_reuse.
+    """
+    if timings is None:
+        timings = StageTimings()
+    context = _page_context(template)
+    form = get_form(template)
+    logger.debug("Filling '%s' with %s row(s) per page", form.spec.name, form.rows_per_page)
+    if form.group_by and form.rows_per_page > 1 and (packing or PAGE_PACKING) == 'group':
+        pages = pack_pages(data_list, form.rows_per_page, form.group_by)
+    else:
+        pages = iter_page_chunks(data_list, form.rows_per_page)
+
+    workers = _render_worker_count(workers)
+    if workers > 1:
+        # Not worth shipping work to the pool for a handful of pages
+        head = list(islice(pages, PARALLEL_MIN_PAGES))
+        pages = chain(head, pages)
+        if len(head) < PARALLEL_MIN_PAGES:
+            workers = 1
+        logger.debug("Rendering pages with %s worker(s)", workers)
+
+    yield from _iter_filled_page_bodies(template, form, template_path, pages, workers, timings, context)
+
+
+def _write_pages(writer, template, data_list, workers, timings):
+    """Fill pages and splice them into writer, yielding after each page."""
+    rows = timings.count_rows(data_list)
+    for body in iter_page_bodies(template, template.path, rows, workers, timings):
+        with timings.stage('page_splice'):
+            writer.add_page(body)
+        timings.pages = writer.page_count
+        yield
+
+
+def _open_writer(template_path, output, timings):
+    with timings.stage('template_load'):
+        # A CompiledTemplate (e.g. a TEMPLATES entry) is used as is, so a
+        # document is rendered from one version even if the file is reloaded
+        if isinstance(template_path, CompiledTemplate):
+            template = template_path
+        else:
+            template = get_template(template_path)
+    with timings.stage('docx_open'):
+        writer = StreamingDocxWriter(template, output)
+    return template, writer
+
+
+def write_word_document(template_path, data_list, output, workers=None, on_page=None, timings=None):
+    """Stream the populated document into output (a path or writable file-like).
+
+    template_path is a template file or a CompiledTemplate.
+
+    Pages are written into word/document.xml as they are filled, so memory
+    stays flat regardless of row count. Returns the number of pages written;
+    exceptions propagate after the output zip has been closed.
+
+    Stage durations are recorded in timings (a metrics.StageTimings); when
+    none is given one is created and reported to /metrics on completion.
+    """
+    owns_timings = timings is None
+    if owns_timings:
+        timings = StageTimings()
+    outcome = 'failed'
+    try:
+        template, writer = _open_writer(template_path, output, timings)
         try:
-            row = tables[1].rows[1]
-            row.cells[0].text = str(first.get('old_arn_code',''))
-            row.cells[1].text = str(first.get('old_arn_name',''))
-            row.cells[2].text = str(first.get('new_arn_code', DEFAULT_NEW_ARN_CODE))
-            row.cells[3].text = str(first.get('new_arn_name', DEFAULT_NEW_ARN_NAME))
-            row.cells[4].text = str(first.get('new_sub_arn_code',''))
-            row.cells[5].text = str(first.get('new_euin_code', _format_euin(DEFAULT_EUIN_CODE)))
-        except Exception as e:
-            print(f"[DEBUG] Could not fill Table 1: {e}")
+            for _ in _write_pages(writer, template, data_list, workers, timings):
+                if on_page:
+                    on_page(writer.page_count)
+        except BaseException:
+            writer.abort()
+            raise
+        with timings.stage('docx_save'):
+            writer.close()
+        outcome = 'ok' if writer.page_count else 'empty'
+        return writer.page_count
+    finally:
+        DOCUMENTS.inc(outcome=outcome)
+        if owns_timings:
+            timings.observe()
+
 
-    # Table 2: investor names (from first row)
-    if len(tables) >= 3 and len(tables[2].rows) >= 3:
+def stream_word_document(template_path, data_list, workers=None, timings=None):
+    """Yield the populated .docx as byte chunks, for a streamed HTTP response.
+
+    Nothing is yielded until the first page has been filled, so callers can
+    take the first chunk before committing to a response and still report
+    errors in the template or the first rows normally. An error after that is
+    logged and re-raised, so the server drops the connection without the
+    final chunk and the client sees an incomplete download rather than a
+    truncated document.
+
+    Time the server spends sending each chunk is recorded as the send stage;
+    the caller reports timings once the response is closed.
+    """
+    if timings is None:
+        timings = StageTimings()
+    sink = ChunkSink()
+    outcome = 'failed'
+    sent = False
+    try:
+        template, writer = _open_writer(template_path, sink, timings)
         try:
-            name_row = tables[2].rows[1]
-            if len(name_row.cells) >= 4:
-                name_row.cells[1].text = str(first.get('investor',''))
-                name_row.cells[2].text = str(first.get('second_holder',''))
-                name_row.cells[3].text = str(first.get('third_holder',''))
-        except Exception as e:
-            print(f"[DEBUG] Could not fill Table 2: {e}")
+            for _ in _write_pages(writer, template, data_list, workers, timings):
+                chunk = sink.drain()
+                if chunk:
+                    with timings.stage('send'):
+                        yield chunk
+                    sent = True
+        except GeneratorExit:
+            writer.abort()
+            raise
+        except BaseException:
+            writer.abort()
+            if sent:
+                logger.exception("Streaming the document failed after %s page(s); response aborted",
+                                 writer.page_count)
+            raise
+        with timings.stage('docx_save'):
+            writer.close()
+        outcome = 'ok' if writer.page_count else 'empty'
+        with timings.stage('send'):
+            yield sink.drain()
+        logger.info("Streamed document (%s pages)", writer.page_count)
+    finally:
+        DOCUMENTS.inc(outcome=outcome)
+
+
+def populate_word_document(template_path, data_list, output_path, workers=None, on_page=None, timings=None):
+    """Populate Word document with multiple pages of Excel data.
 
-    print("[DEBUG] NEW chunk page population complete")
+    data_list may be a list or any iterable of row dicts (e.g. iter_excel_rows),
+    in which case pages are filled as rows arrive. output_path is a file path
+    or a writable file-like object. Returns the page count, or False on
+    failure (no partial file is left behind at a path).
 
+    workers enables parallel page filling for the new template (see
+    RENDER_WORKERS); the output is identical to the serial path.
+    on_page, if given, is called with the running page count after each page.
+    timings is passed to write_word_document.
+    """
+    logger.debug("Starting Word document population")
+    logger.debug("Template path: %s", template_path)
+    logger.debug("Output path: %s", output_path)
 
-def populate_single_page_auto(doc, data):
-    """Detect template type and populate accordingly."""
     try:
-        # Heuristic: the new form has 3 tables and a header with 'Mutual Fund' and 'Date:' on same line
-        has_new_signature = (
-            len(doc.tables) >= 3 or any(('Mutual Fund' in p.text and 'Date' in p.text) for p in doc.paragraphs)
-        )
-        if has_new_signature and os.path.basename(TEMPLATE_DOCX) == NEW_TEMPLATE_DOCX:
-            return populate_single_page_new_form(doc, data)
-        # Fallback to old form logic
-        return populate_single_page_old_form(doc, data)
+        page_count = write_word_document(template_path, data_list, output_path, workers, on_page, timings)
+        if page_count == 0:
+            logger.debug("No data rows to populate")
+            _remove_output(output_path)
+            return False
+        logger.info("Document saved (%s pages)", page_count)
+        return page_count
     except Exception as e:
-        print(f"[DEBUG] Auto population error, falling back to old form: {e}")
-        return populate_single_page_old_form(doc, data)
+        logger.exception("Error populating Word document: %s", e)
+        _remove_output(output_path)
+        return False
 
 
-def chunk_list(items, size):
-    return [items[i:i+size] for i in range(0, len(items), size)]
+def _remove_output(output_path):
+    if isinstance(output_path, (str, os.PathLike)) and os.path.exists(output_path):
+        os.unlink(output_path)
 
 
-def populate_word_document(template_path, data_list, output_path):
-    """Populate Word document with multiple pages of Excel data"""
-    print(f"[DEBUG] Starting Word document population")
-    print(f"[DEBUG] Template path: {template_path}")
-    print(f"[DEBUG] Output path: {output_path}")
-    print(f"[DEBUG] Data list contains {len(data_list)} entries")
-    
-    try:
-        # If using new template, group 6 rows per page
-        if os.path.basename(template_path) == NEW_TEMPLATE_DOCX:
-            print("[DEBUG] New template detected - grouping 6 rows per page")
-            pages = chunk_list(data_list, 6)
-            print(f"[DEBUG] Total pages after grouping: {len(pages)}")
-
-            # Load and populate first page
-            output_doc = Document(template_path)
-            populate_single_page_new_form_chunk(output_doc, pages[0])
-
-            # Remaining pages
-            for page_index in range(1, len(pages)):
-                # Add page break
-                if output_doc.paragraphs:
-                    last_para = output_doc.paragraphs[-1]
-                    run = last_para.add_run()
-                    run.add_break(WD_BREAK.PAGE)
-                else:
-                    break_para = output_doc.add_paragraph()
-                    run = break_para.add_run()
-                    run.add_break(WD_BREAK.PAGE)
-
-                # Populate fresh template and copy into output
-                template_doc = Document(template_path)
-                populate_single_page_new_form_chunk(template_doc, pages[page_index])
-
-                for element in template_doc.element.body:
-                    element_type = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-                    if element_type == 'sectPr':
+def build_word_document(template_path, data_list, workers=None, on_page=None, timings=None,
+                        spill_threshold=None):
+    """Populate a document into a SpooledOutput buffer instead of a named file.
+
+    The buffer stays in memory unless the document outgrows spill_threshold
+    (default SPILL_THRESHOLD). Returns (page_count, buffer), or (False, None)
+    on failure or when there are no rows.
+    """
+    output = SpooledOutput(SPILL_THRESHOLD if spill_threshold is None else spill_threshold)
+    page_count = populate_word_document(template_path, data_list, output, workers, on_page, timings)
+    output.close()
+    if not page_count:
+        output.discard()
+        return False, None
+    return page_count, output
+
+
+class RequestTimeout(Exception):
+    """A request ran past its REQUEST_TIMEOUT deadline."""
+
+
+def request_deadline():
+    """time.monotonic() deadline for a request starting now, or None without a limit."""
+    return time.monotonic() + REQUEST_TIMEOUT if REQUEST_TIMEOUT > 0 else None
+
+
+def rows_until(rows, deadline):
+    """Pass rows through, raising RequestTimeout once deadline (monotonic) has passed."""
+    if deadline is None:
+        yield from rows
+        return
+    for row in rows:
+        if time.monotonic() > deadline:
+            raise RequestTimeout(f'Request took longer than {REQUEST_TIMEOUT} seconds and was stopped')
+        yield row
+
+
+class BatchTooLarge(ValueError):
+    """A batch upload expands to more files or bytes than the BATCH_MAX_* limits allow."""
+
+
+def iter_batch_workbooks(named_files, max_files=None, max_file_bytes=None, max_total_bytes=None):
+    """Expand (name, fileobj) inputs into (name, bytes) workbooks and exports.
+
+    .zip inputs are unpacked and every member with an allowed extension is yielded;
+    Office lock files (~$...) and macOS metadata are skipped.
+
+    The limits (default BATCH_MAX_FILES, BATCH_MAX_FILE_BYTES and
+    BATCH_MAX_TOTAL_BYTES; 0 disables one) cap the number of workbooks and
+    their uncompressed sizes, so a small archive cannot expand to gigabytes
+    in memory. Members are checked by their declared size before they are
+    read (zipfile never returns more than that); BatchTooLarge is raised for
+    the first one over a limit.
+    """
+    max_files = BATCH_MAX_FILES if max_files is None else max_files
+    max_file_bytes = BATCH_MAX_FILE_BYTES if max_file_bytes is None else max_file_bytes
+    max_total_bytes = BATCH_MAX_TOTAL_BYTES if max_total_bytes is None else max_total_bytes
+    count = total = 0
+
+    def admit(name, size):
+        nonlocal count, total
+        count += 1
+        total += size
+        if max_files and count > max_files:
+            raise BatchTooLarge(f'More than {max_files} files in the batch')
+        if max_file_bytes and size > max_file_bytes:
+            raise BatchTooLarge(f'{name} is larger than {max_file_bytes} bytes uncompressed')
+        if max_total_bytes and total > max_total_bytes:
+            raise BatchTooLarge(f'The batch is larger than {max_total_bytes} bytes uncompressed')
+
+    for name, fileobj in named_files:
+        data = fileobj.read()
+        if name.lower().endswith('.zip'):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    member = os.path.basename(info.filename)
+                    if info.is_dir() or member.startswith(('~$', '._')) or '__MACOSX' in info.filename:
                         continue
-                    output_doc.element.body.append(element)
-
-            output_doc.save(output_path)
-            print(f"[DEBUG] New-template multi-page document saved successfully")
-            return len(pages)
-
-        # Legacy handling (one row per page)
-        # For single page, use simpler approach
-        if len(data_list) == 1:
-            print(f"[DEBUG] Single page mode - using direct template modification")
-            doc = Document(template_path)
-            print(f"[DEBUG] Template loaded with {len(doc.paragraphs)} paragraphs")
-            populate_single_page_auto(doc, data_list[0])
-            doc.save(output_path)
-            print(f"[DEBUG] Single page document saved successfully")
-            return 1
-        
-        print(f"[DEBUG] Multi-page mode - using first page as base")
-        # For multiple pages, start with the first populated template as base
-        print(f"[DEBUG] === Processing Page 1 of {len(data_list)} ===")
-        print(f"[DEBUG] Page data: {data_list[0]}")
-        
-        # Load and populate the first page as the base document
-        output_doc = Document(template_path)
-        print(f"[DEBUG] Base template loaded with {len(output_doc.paragraphs)} paragraphs")
-        populate_single_page_auto(output_doc, data_list[0])
-        print(f"[DEBUG] Base template populated for page 1")
-        
-        # Process remaining pages (if any)
-        for page_index in range(1, len(data_list)):
-            data = data_list[page_index]
-            print(f"[DEBUG] === Processing Page {page_index + 1} of {len(data_list)} ===")
-            print(f"[DEBUG] Page data: {data}")
-            
-            # Add page break to the last paragraph of the current document
-            print(f"[DEBUG] Adding page break to last paragraph before page {page_index + 1}")
-            if output_doc.paragraphs:
-                last_para = output_doc.paragraphs[-1]
-                run = last_para.add_run()
-                run.add_break(WD_BREAK.PAGE)
-                print(f"[DEBUG] Page break added to existing paragraph")
-            else:
-                # Fallback if no paragraphs exist
-                break_para = output_doc.add_paragraph()
-                run = break_para.add_run()
-                run.add_break(WD_BREAK.PAGE)
-                print(f"[DEBUG] Page break added as new paragraph")
-            
-            # Load a fresh template for this page
-            template_doc = Document(template_path)
-            print(f"[DEBUG] Fresh template loaded with {len(template_doc.paragraphs)} paragraphs")
-            
-            # Populate this template with the current row's data
-            populate_single_page_auto(template_doc, data)
-            print(f"[DEBUG] Template populated for page {page_index + 1}")
-            
-            # Copy all paragraphs and elements from template to output (except sectPr)
-            elements_copied = 0
-            for element in template_doc.element.body:
-                element_type = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-                if element_type == 'sectPr':
-                    continue
-                output_doc.element.body.append(element)
-                elements_copied += 1
-            print(f"[DEBUG] Copied {elements_copied} elements from template into output")
-        
-        # Save the multi-page document
-        output_doc.save(output_path)
-        print(f"[DEBUG] Multi-page document saved successfully")
-        return len(data_list)  # Return number of pages created
+                    if allowed_file(member):
+                        admit(member, info.file_size)
+                        yield member, archive.read(info)
+        elif allowed_file(name):
+            admit(name, len(data))
+            yield os.path.basename(name), data
+
+
+def render_workbook(name, data, template_path=None, fmt='docx', sheets=None, context=None, deadline=None):
+    """Render one in-memory workbook (or CSV/Parquet export); returns (manifest entry, document bytes or None).
+
+    The reader is chosen from name's extension. With fmt='pdf' the document is
+    converted with PDF_CONVERTER. context is the RowContext (profile) of the rows.
+    Past deadline (see rows_until) the workbook fails.
+    """
+    entry = {'source': name, 'rows': 0, 'pages': 0}
+    report = ValidationReport()
+    excel_rows = iter_upload_rows(io.BytesIO(data), upload_kind(name), sheets, report=report, context=context)
+
+    def counted(rows):
+        for row in rows:
+            entry['rows'] += 1
+            yield row
+
+    buffer = io.BytesIO()
+    try:
+        entry['pages'] = write_word_document(template_path or TEMPLATE_DOCX,
+                                             rows_until(counted(excel_rows), deadline), buffer)
     except Exception as e:
-        print(f"[DEBUG] ERROR populating Word document: {str(e)}")
-        import traceback
-        print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
-        return False
+        logger.warning("Batch item %s failed: %s", name, e)
+        entry['error'] = str(e)
+        return entry, None
+    finally:
+        excel_rows.close()
+    entry['issues'] = report.issue_count
+    if report.issue_count:
+        entry['validation'] = report.to_dict()
+    if entry['pages'] == 0:
+        entry['error'] = 'No data found in Excel file'
+        return entry, None
+    if fmt == 'pdf':
+        try:
+            return entry, PDF_CONVERTER.convert(buffer.getvalue())
+        except Exception as e:
+            logger.warning("PDF conversion of batch item %s failed: %s", name, e)
+            entry['error'] = f'PDF conversion failed: {e}'
+            return entry, None
+    return entry, buffer.getvalue()
+
+
+def _unique_name(name, used):
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate in used:
+        n += 1
+        candidate = f"{stem} ({n}){ext}"
+    used.add(candidate)
+    return candidate
+
+
+def _iter_batch_zip(workbooks, output, template_path, max_workers, manifest, fmt='docx', sheets=None,
+                    context=None, deadline=None):
+    """Write one .docx (or .pdf) per workbook plus manifest.json into a zip on output.
+
+    Workbooks are rendered concurrently on a thread pool (sharing the process
+    template cache) and added in input order; yields after each file is added
+    so callers can stream the archive. Workbooks still rendering at deadline
+    fail with RequestTimeout's message in the manifest.
+    """
+    max_workers = max_workers or BATCH_WORKERS
+    used_names = set()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='arn-batch') as executor, \
+            zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        pending = deque()
+
+        def add_next():
+            entry, document = pending.popleft().result()
+            if document is not None:
+                entry['output'] = _unique_name(output_name(entry['source'], fmt), used_names)
+                archive.writestr(entry['output'], document)
+            manifest.append(entry)
+
+        for name, data in workbooks:
+            pending.append(executor.submit(render_workbook, name, data, template_path, fmt, sheets, context,
+                                           deadline))
+            if len(pending) >= max_workers * 2:
+                add_next()
+                yield
+        while pending:
+            add_next()
+            yield
+
+        summary = {
+            'files': manifest,
+            'total_rows': sum(e['rows'] for e in manifest),
+            'total_pages': sum(e['pages'] for e in manifest),
+            'total_issues': sum(e.get('issues', 0) for e in manifest),
+            'failed': sum(1 for e in manifest if 'error' in e),
+        }
+        archive.writestr('manifest.json', json.dumps(summary, indent=2))
+    yield
+
+
+def write_batch_zip(workbooks, output, template_path=None, max_workers=None, fmt='docx', sheets=None,
+                    context=None):
+    """Render (name, bytes) workbooks into one zip at output; returns the manifest entries."""
+    manifest = []
+    for _ in _iter_batch_zip(workbooks, output, template_path, max_workers, manifest, fmt, sheets, context):
+        pass
+    return manifest
+
+
+def stream_batch_zip(workbooks, template_path=None, max_workers=None, fmt='docx', sheets=None, context=None,
+                     deadline=None):
+    """Yield the batch zip as byte chunks, for a streamed HTTP response."""
+    sink = ChunkSink()
+    manifest = []
+    for _ in _iter_batch_zip(workbooks, sink, template_path, max_workers, manifest, fmt, sheets, context,
+                             deadline):
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    logger.info("Streamed batch of %s workbook(s)", len(manifest))
 
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', pdf_available=PDF_CONVERTER.available,
+                           allowed_extensions=sorted(ALLOWED_EXTENSIONS),
+                           templates=TEMPLATES.to_dict()['templates'], default_template=TEMPLATES.default_id,
+                           profiles=list_profiles(), default_profile=DEFAULT_PROFILE)
+
+
+def _requested_format():
+    """Output format from the 'format' form field; raises ValueError if unsupported here."""
+    fmt = (request.form.get('format') or 'docx').lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}' (use {' or '.join(OUTPUT_FORMATS)})")
+    if fmt == 'pdf' and not PDF_CONVERTER.available:
+        raise ValueError('PDF output is not available on this server (LibreOffice is not installed)')
+    return fmt
+
+
+def _requested_template():
+    """TEMPLATES entry from the 'template' query or form field (default: TEMPLATES.default_id).
+
+    Raises ValueError for an unknown template.
+    """
+    template_id = request.values.get('template') or None
+    try:
+        return TEMPLATES.get(template_id)
+    except KeyError:
+        if not TEMPLATES.ids():
+            raise ValueError('No form templates are available on this server') from None
+        raise ValueError(f"Unknown template '{template_id}' (use {', '.join(TEMPLATES.ids())})") from None
+
+
+def _requested_profile():
+    """RowContext of the profile in the 'profile' query or form field (DEFAULT_PROFILE if absent).
+
+    Raises ValueError for an unknown profile.
+    """
+    profile_id = request.values.get('profile') or None
+    try:
+        return profile_row_context(profile_id)
+    except KeyError:
+        raise ValueError(f"Unknown profile '{profile_id}' (see /profiles)") from None
+
+
+def _requested_sheets():
+    """Sheet names from the 'sheets' form field (repeated, or comma-separated), or None for all."""
+    values = [v for v in request.form.getlist('sheets') if v.strip()]
+    if len(values) == 1:
+        values = values[0].split(',')
+    return [v.strip() for v in values if v.strip()] or None
+
+
+def _pdf_response(docx_bytes, download_name, timings):
+    with timings.stage('pdf_convert'):
+        pdf = PDF_CONVERTER.convert(docx_bytes)
+    response = send_file(io.BytesIO(pdf), as_attachment=True,
+                         download_name=output_name(download_name, 'pdf'), mimetype=PDF_MIMETYPE)
+    response.headers['Server-Timing'] = timings.server_timing()
+    return response
 
 
 @app.route('/upload', methods=['POST'])
@@ -602,68 +1403,383 @@ def upload_file():
         flash('No file selected')
         return redirect(url_for('index'))
     
-    if file and allowed_file(file.filename):
+    kind = upload_kind(file.filename, file.mimetype)
+    if file and kind:
+        try:
+            fmt = _requested_format()
+            selected = _requested_template()
+            row_context = _requested_profile()
+        except ValueError as e:
+            flash(str(e))
+            return redirect(url_for('index'))
+        sheets = _requested_sheets()
+        deadline = request_deadline()
         filename = secure_filename(file.filename)
-        temp_excel_path = None
+        upload = None
+        excel_rows = None
+        streaming = False
+        timings = StageTimings()
+        report = ValidationReport()
+
+        def cleanup():
+            # Close the row stream (and its workbook) before removing the file
+            if excel_rows is not None:
+                excel_rows.close()
+            if upload is not None:
+                upload.close()
+            timings.observe()
+            if report.issue_count:
+                logger.warning("Upload %s has %s validation issue(s): %s",
+                               filename, report.issue_count, report.counts)
         
         try:
-            # Create temporary file for uploaded Excel
-            temp_excel_fd, temp_excel_path = tempfile.mkstemp(suffix='.xlsx')
-            
-            # Close the file descriptor and save the uploaded file
-            os.close(temp_excel_fd)
-            file.save(temp_excel_path)
-            
-            # Read data from Excel (now returns list of dictionaries)
-            print(f"[DEBUG] About to read Excel data from: {temp_excel_path}")
-            excel_data = read_excel_data(temp_excel_path)
-            
-            print(f"[DEBUG] Excel reading result: {excel_data}")
-            if excel_data is None or len(excel_data) == 0:
-                print(f"[DEBUG] No data found in Excel file")
-                flash('Error reading Excel file or no data found. Please check the file format.')
-                return redirect(url_for('index'))
-            
-            print(f"[DEBUG] Successfully read {len(excel_data)} data rows from Excel")
-            
-            # Create output file with page count
+            # Read the workbook straight from the upload buffer (no temp file copy)
+            with timings.stage('upload_open'):
+                upload = open_upload(file)
+            with timings.stage('template_load'):
+                template = selected.template
+
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            # Page count will be computed inside populate_word_document for new template
             output_filename = f"Populated_ARN_Form_{timestamp}.docx"
-            output_path = os.path.join(tempfile.gettempdir(), output_filename)
-            
-            print(f"[DEBUG] Will create output file: {output_filename}")
-            print(f"[DEBUG] Full output path: {output_path}")
-            
-            # Populate Word document
-            print(f"[DEBUG] About to populate Word document using template '{TEMPLATE_DOCX}'")
-            result = populate_word_document(TEMPLATE_DOCX, excel_data, output_path)
-            print(f"[DEBUG] Word document population result: {result}")
-            
-            if result:
-                print(f"[DEBUG] Successfully created document, sending to user")
-                return send_file(output_path, as_attachment=True, 
-                               download_name=output_filename,
-                               mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+
+            # Same workbook, template and defaults as an earlier upload today: resend that document
+            cache_key = None
+            if RESULT_CACHE.enabled:
+                with timings.stage('result_cache'):
+                    cache_key = result_cache_key(upload, template, sheets, row_context, kind)
+                    cached = RESULT_CACHE.open(cache_key)
+                if cached is not None:
+                    logger.info("Serving cached result %s for %s", cache_key, filename)
+                    DOCUMENTS.inc(outcome='cached')
+                    if fmt == 'pdf':
+                        with cached:
+                            return _pdf_response(cached.read(), output_filename, timings)
+                    response = send_file(cached, as_attachment=True, download_name=output_filename,
+                                         mimetype=DOCX_MIMETYPE)
+                    response.set_etag(cache_key)
+                    response.headers['X-Result-Cache'] = 'hit'
+                    response.headers['Server-Timing'] = timings.server_timing()
+                    return response
+
+            # Stream rows from Excel; peek at the first one to detect empty sheets
+            logger.debug("About to read Excel data from upload %s", filename)
+            excel_rows = iter_upload_rows(upload, kind, sheets, report=report, context=row_context)
+            try:
+                with timings.stage('excel_parse'):
+                    first_row = next(excel_rows, None)
+            except ValueError as e:
+                # Unknown sheet names in the selection
+                DOCUMENTS.inc(outcome='failed')
+                flash(str(e))
+                return redirect(url_for('index'))
+            except Exception as e:
+                logger.error("Error reading Excel file: %s", e)
+                DOCUMENTS.inc(outcome='failed')
+                first_row = None
             else:
-                print(f"[DEBUG] Failed to create document")
-                flash('Error processing the document. Please try again.')
+                if first_row is None:
+                    DOCUMENTS.inc(outcome='empty')
+            if first_row is None:
+                logger.debug("No data found in Excel file")
+                flash('Error reading Excel file or no data found. Please check the file format.')
                 return redirect(url_for('index'))
+            excel_data = rows_until(chain([first_row], excel_rows), deadline)
+
+            if fmt == 'pdf':
+                # PDF needs the finished document, so it is not streamed
+                buffer = io.BytesIO()
+                write_word_document(template, excel_data, buffer, timings=timings)
+                if cache_key is not None:
+                    writer = RESULT_CACHE.writer(cache_key)
+                    writer.write(buffer.getvalue())
+                    writer.commit()
+                return _pdf_response(buffer.getvalue(), output_filename, timings)
+
+            # Stream the document to the client while pages are filled. The
+            # request context (and with it the upload stream) stays open until
+            # the response has been sent, then the upload is cleaned up
+            logger.debug("Streaming Word document using template '%s'", selected.id)
+            chunks = stream_word_document(template, excel_data, timings=timings)
+            # Fill the first page before sending headers: errors up to here
+            # still redirect with a message instead of a broken download
+            chunks = _primed(next(chunks), chunks)
+            if cache_key is not None:
+                chunks = cache_result(chunks, RESULT_CACHE.writer(cache_key))
+            response = Response(stream_with_context(chunks), mimetype=DOCX_MIMETYPE)
+            response.headers['Content-Disposition'] = f'attachment; filename="{output_filename}"'
+            if cache_key is not None:
+                response.set_etag(cache_key)
+                response.headers['X-Result-Cache'] = 'miss'
+            # Only stages finished before the body starts streaming; the full
+            # breakdown goes to /metrics when the response closes
+            response.headers['Server-Timing'] = timings.server_timing()
+            response.call_on_close(cleanup)
+            streaming = True
+            return response
                 
+        except RequestTimeout as e:
+            logger.warning("Upload %s stopped: %s", filename, e)
+            flash(str(e))
+            return redirect(url_for('index'))
         except Exception as e:
+            logger.exception("Error processing upload %s", filename)
             flash(f'Error processing file: {str(e)}')
             return redirect(url_for('index'))
         finally:
-            # Clean up temporary Excel file
-            if temp_excel_path and os.path.exists(temp_excel_path):
-                try:
-                    os.unlink(temp_excel_path)
-                except PermissionError:
-                    pass
+            if not streaming:
+                cleanup()
     else:
-        flash('Please upload a valid Excel file (.xlsx or .xls)')
+        flash(f'Please upload a valid Excel, CSV or Parquet file ({UPLOAD_TYPES})')
         return redirect(url_for('index'))
 
 
+def _generation_job(job, temp_excel_path, sheets=None, kind='xlsx', template=None, context=None):
+    """Background job body: stream rows from the saved upload into the result buffer."""
+    job.validation = ValidationReport()
+    excel_rows = iter_upload_rows(temp_excel_path, kind, sheets, report=job.validation, context=context)
+    job.timings = StageTimings()
+    try:
+        def counted(rows):
+            for row in rows:
+                job.row_parsed()
+                yield row
+
+        page_count, output = build_word_document(template or TEMPLATE_DOCX, counted(excel_rows),
+                                                 on_page=job.page_rendered, timings=job.timings)
+    finally:
+        job.timings.observe()
+        excel_rows.close()
+        if os.path.exists(temp_excel_path):
+            try:
+                os.unlink(temp_excel_path)
+            except PermissionError:
+                pass
+    if not page_count:
+        raise ValueError('No data found in Excel file or the document could not be generated')
+    return output
+
+
+def _job_urls(job):
+    return {
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id),
+    }
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a generation job for an uploaded Excel (or CSV/Parquet) file and return its id at once."""
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify(error='No file selected'), 400
+    kind = upload_kind(file.filename, file.mimetype)
+    if kind is None:
+        return jsonify(error=f'Please upload a valid Excel, CSV or Parquet file ({UPLOAD_TYPES})'), 400
+    try:
+        selected = _requested_template()
+        row_context = _requested_profile()
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    # The upload stream does not outlive the request, so hand the job a copy on disk
+    temp_excel_fd, temp_excel_path = tempfile.mkstemp(suffix='.' + kind)
+    os.close(temp_excel_fd)
+    try:
+        file.save(temp_excel_path)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # The result document is kept in memory (see SPILL_THRESHOLD) on job.result
+        job = JOB_QUEUE.submit(
+            _generation_job, temp_excel_path, _requested_sheets(), kind, selected.template, row_context,
+            download_name=f"Populated_ARN_Form_{timestamp}.docx",
+            cleanup_paths=[temp_excel_path],
+        )
+    except QueueFull as e:
+        os.unlink(temp_excel_path)
+        logger.warning("Rejecting job: %s", e)
+        response = jsonify(error='Too many jobs in progress, please retry shortly')
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    except Exception:
+        if os.path.exists(temp_excel_path):
+            os.unlink(temp_excel_path)
+        raise
+
+    logger.info("Queued job %s for %s", job.id, secure_filename(file.filename))
+    return jsonify(id=job.id, status=job.status, **_job_urls(job)), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify(error='Unknown or expired job'), 404
+    return jsonify(**job.to_dict(), **_job_urls(job))
+
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify(error='Unknown or expired job'), 404
+    if job.status != DONE:
+        return jsonify(error=job.error or f'Job is {job.status}', status=job.status), 409
+    response = send_file(job.result.open(), as_attachment=True,
+                         download_name=job.download_name,
+                         mimetype=DOCX_MIMETYPE)
+    if job.timings is not None:
+        response.headers['Server-Timing'] = job.timings.server_timing()
+    return response
+
+
+@app.route('/batch', methods=['POST'])
+def batch_upload():
+    """Generate forms for many workbooks (or .zip archives of them) as one zip."""
+    deadline = request_deadline()
+    files = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not files:
+        return jsonify(error='No files selected'), 400
+    rejected = [f.filename for f in files
+                if not (allowed_file(f.filename) or f.filename.lower().endswith('.zip'))]
+    if rejected:
+        return jsonify(error=f'Only {UPLOAD_TYPES} files or .zip archives of them are accepted',
+                       rejected=rejected), 400
+    try:
+        fmt = _requested_format()
+        selected = _requested_template()
+        row_context = _requested_profile()
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    try:
+        # Read uploads now: request streams are gone once the response starts
+        workbooks = list(iter_batch_workbooks((f.filename, f.stream) for f in files))
+    except zipfile.BadZipFile as e:
+        return jsonify(error=f'Invalid zip archive: {e}'), 400
+    except BatchTooLarge as e:
+        return jsonify(error=str(e)), 413
+    if not workbooks:
+        return jsonify(error='No Excel, CSV or Parquet files found in upload'), 400
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    response = Response(stream_batch_zip(workbooks, selected.template, fmt=fmt, sheets=_requested_sheets(),
+                                         context=row_context, deadline=deadline),
+                        mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="Populated_ARN_Forms_{timestamp}.zip"'
+    return response
+
+
+@app.route('/validate', methods=['POST'])
+def validate_upload():
+    """Check the rows of an uploaded file without generating forms; returns the validation report."""
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify(error='No file selected'), 400
+    kind = upload_kind(file.filename, file.mimetype)
+    if kind is None:
+        return jsonify(error=f'Please upload a valid Excel, CSV or Parquet file ({UPLOAD_TYPES})'), 400
+
+    report = ValidationReport()
+    upload = open_upload(file)
+    try:
+        rows = iter_upload_rows(upload, kind, _requested_sheets(), report=report)
+        try:
+            for _ in rows:
+                pass
+        finally:
+            rows.close()
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except Exception as e:
+        logger.warning("Could not validate %s: %s", secure_filename(file.filename), e)
+        return jsonify(error=f'Error reading file: {e}'), 400
+    finally:
+        upload.close()
+    return jsonify(report.to_dict())
+
+
+@app.route('/templates')
+def list_templates():
+    """Templates available for the 'template' parameter, with the version currently loaded."""
+    return jsonify(TEMPLATES.to_dict())
+
+
+@app.route('/profiles')
+def profiles():
+    """Distributor profiles available for the 'profile' parameter, with their values."""
+    return jsonify(default=DEFAULT_PROFILE, profiles=list_profiles())
+
+
+@app.route('/healthz')
+def health():
+    """Liveness/readiness probe: 200 while at least one template is loaded, else 503."""
+    templates = TEMPLATES.ids()
+    body = {
+        'status': 'ok' if templates else 'unavailable',
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - STARTED_AT, 1),
+        'templates': templates,
+        'jobs': JOB_QUEUE.stats(),
+    }
+    return jsonify(body), 200 if templates else 503
+
+
+@app.route('/cache', methods=['GET', 'DELETE'])
+@app.route('/cache/<key>', methods=['DELETE'])
+def result_cache(key=None):
+    """Result cache stats (GET), or drop one entry by its ETag / all entries (DELETE)."""
+    if request.method == 'GET':
+        return jsonify(RESULT_CACHE.stats())
+    removed = RESULT_CACHE.invalidate(key)
+    if key is not None and not removed:
+        return jsonify(error='Unknown cache entry'), 404
+    logger.info("Invalidated %s cached result(s)", removed)
+    return jsonify(removed=removed)
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: stage histograms, row/page/document counters, cache and job stats."""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+_background_pid = None
+_background_lock = threading.Lock()
+
+
+def start_background_tasks():
+    """Start this process's background threads: template watching and PDF warm-up.
+
+    Threads do not survive fork, so a pre-forking server (see gunicorn.conf.py)
+    starts them in each worker; calling this again in the same process does nothing.
+    """
+    global _background_pid
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return
+        _background_pid = os.getpid()
+    if TEMPLATE_RELOAD_INTERVAL > 0:
+        TEMPLATES.stop()  # a watcher inherited from the parent is not running here
+        TEMPLATES.watch(TEMPLATE_RELOAD_INTERVAL)
+    if os.environ.get('ARN_PDF_WARM') == '1':
+        threading.Thread(target=warm_pdf_converter, name='arn-pdf-warm', daemon=True).start()
+
+
+@app.before_request
+def _ensure_background_tasks():
+    if _background_pid != os.getpid():
+        start_background_tasks()
+
+
+STARTED_AT = time.time()
+
+# Parse and check every template at import, before the first request. With a
+# preloading server this happens once in the master and workers share the parsed
+# templates copy-on-write. Render workers started by spawn load their own copies
+if multiprocessing.parent_process() is None:
+    TEMPLATES.refresh()
+
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
+    # Development server; see wsgi.py for production serving
+    start_background_tasks()
+    app.run(debug=os.environ.get('ARN_DEBUG') == '1', host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""Measure what debug logging costs read_excel_data on a large sheet.
+
+Runs the reader on a synthetic workbook twice: with DEBUG enabled (every
+per-row message formatted and written, as the old print() calls did) and
+at INFO (the production default). Prints the timings as JSON.
+
+Usage: python benchmarks/bench_logging.py [rows]
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+
+import app
+
+
+def build_workbook(path, rows):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(['Scheme Name', 'Folio No', 'PAN', 'Investor [First Holder only]', 'Old ARN Number', 'Old ARN Name'])
+    for i in range(rows):
+        sheet.append([f'Scheme {i % 50}', 100000 + i, 'ABCDE1234F', f'Investor {i}', f'ARN-{i % 20}', f'Broker {i % 20}'])
+    workbook.save(path)
+
+
+def time_read(path, level):
+    root = logging.getLogger()
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    try:
+        start = time.perf_counter()
+        rows = app.read_excel_data(path)
+        return time.perf_counter() - start, len(rows or [])
+    finally:
+        handler.stream.close()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.xlsx')
+        build_workbook(path, rows)
+        debug_s, n = time_read(path, logging.DEBUG)
+        info_s, _ = time_read(path, logging.INFO)
+    print(json.dumps({
+        'rows': n,
+        'debug_seconds': round(debug_s, 3),
+        'info_seconds': round(info_s, 3),
+        'speedup': round(debug_s / info_s, 2) if info_s else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
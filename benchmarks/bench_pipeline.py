@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""Benchmark suite for the Excel -> DOCX pipeline.
+
+Builds synthetic workbooks from "Format for ARN change.xlsx" at several
+sizes and times each pipeline stage against both bundled templates. Every
+(stage, template, size) case runs in its own subprocess so the reported
+peak RSS belongs to that case alone. Results are printed (or written) as
+JSON so runs can be diffed to catch regressions.
+
+Stages:
+  read          read_excel_data on the workbook
+  fill_new      fill_page (the new template's form spec) on fresh template copies
+  fill_old      fill_page (the legacy template's form spec) on fresh template copies
+  compile       FormSpec.compile of the detected spec, COMPILE_REPEATS times
+  assemble      write_word_document from pre-read rows (page splice + save)
+  end_to_end    iter_excel_rows streamed into write_word_document
+
+Usage:
+  python benchmarks/bench_pipeline.py [--sizes 1,100,1000,10000] [--stages read,assemble]
+                                      [--templates new,old] [--output results.json]
+                                      [--baseline previous.json [--tolerance 1.25]]
+
+With --baseline, cases more than --tolerance times slower than the matching
+case in a previous report are listed and the exit status is 1.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FORMAT_XLSX = os.path.join(ROOT, "Format for ARN change.xlsx")
+TEMPLATES = {
+    'new': os.path.join(ROOT, "New ARN Change form.docx"),
+    'old': os.path.join(ROOT, "Request for Change of Broker.docx"),
+}
+STAGES = ('read', 'fill_new', 'fill_old', 'compile', 'assemble', 'end_to_end')
+# Stages that only make sense for one template
+STAGE_TEMPLATES = {'fill_new': ('new',), 'fill_old': ('old',), 'read': ('new',)}
+# Compilations timed by the compile stage (independent of the workbook size)
+COMPILE_REPEATS = 100
+DEFAULT_SIZES = (1, 100, 1000, 10000)
+
+
+def build_workbook(path, rows):
+    """Write a workbook with the format file's header and rows cycled from its samples."""
+    import openpyxl
+
+    source = openpyxl.load_workbook(FORMAT_XLSX, read_only=True)
+    try:
+        sheet = source.active
+        header = [c for c in next(sheet.iter_rows(max_row=1, values_only=True))]
+        samples = [r for r in sheet.iter_rows(min_row=2, values_only=True) if any(v is not None for v in r)]
+    finally:
+        source.close()
+    header = (list(header) + [None] * 6)[:4] + ['Old ARN Number', 'Old ARN Name']
+    samples = samples or [('Sample Fund', 1, 'ABCDE1234F', 'Investor')]
+
+    workbook = openpyxl.Workbook(write_only=True)
+    out = workbook.create_sheet()
+    out.append(header)
+    for i in range(rows):
+        scheme, folio, pan, investor = (list(samples[i % len(samples)]) + [None] * 4)[:4]
+        out.append([scheme, (folio if isinstance(folio, int) else 100000) + i, pan, investor, f'ARN-{1000 + i % 25}', f'Old Broker {i % 25}'])
+    workbook.save(path)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def run_case(stage, template_key, workbook_path):
+    """Run one stage in this process and return its measurements."""
+    import logging
+    logging.disable(logging.INFO)
+
+    import app
+
+    template_path = TEMPLATES[template_key]
+    template = app.get_template(template_path)
+    rows = None
+    if stage not in ('read', 'compile', 'end_to_end'):
+        rows = app.read_excel_data(workbook_path) or []
+
+    pages = 0
+    start = time.perf_counter()
+    if stage == 'read':
+        rows = app.read_excel_data(workbook_path) or []
+    elif stage in ('fill_new', 'fill_old'):
+        form = app.get_form(template)
+        for chunk in app.iter_chunks(rows, form.rows_per_page):
+            app.fill_page(template, chunk)
+            pages += 1
+    elif stage == 'compile':
+        spec = app.detect_form_spec(template.new_page(), app._load_bundled_form_specs())
+        for _ in range(COMPILE_REPEATS):
+            spec.compile(template.new_page())
+        pages = COMPILE_REPEATS
+    elif stage == 'assemble':
+        pages = app.write_word_document(template_path, rows, io.BytesIO())
+    elif stage == 'end_to_end':
+        excel_rows = app.iter_excel_rows(workbook_path)
+        try:
+            pages = app.write_word_document(template_path, excel_rows, io.BytesIO())
+        finally:
+            excel_rows.close()
+    seconds = time.perf_counter() - start
+
+    result = {'seconds': round(seconds, 4), 'peak_rss_mb': peak_rss_mb()}
+    if rows is not None:
+        result['rows'] = len(rows)
+    if pages:
+        result['pages'] = pages
+        result['pages_per_sec'] = round(pages / seconds, 1) if seconds else None
+    elif rows:
+        result['rows_per_sec'] = round(len(rows) / seconds, 1) if seconds else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated row counts (up to 100000)")
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--templates', default='new,old')
+    parser.add_argument('--output', help="write JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="previous JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="slowdown factor vs. baseline treated as a regression")
+    parser.add_argument('--case', nargs=3, metavar=('STAGE', 'TEMPLATE', 'WORKBOOK'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(*args.case)))
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    stages = [s for s in args.stages.split(',') if s]
+    templates = [t for t in args.templates.split(',') if t]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            workbook_path = os.path.join(tmp, f'bench_{size}.xlsx')
+            build_workbook(workbook_path, size)
+            for stage in stages:
+                for template_key in templates:
+                    if template_key not in STAGE_TEMPLATES.get(stage, TEMPLATES):
+                        continue
+                    proc = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), '--case', stage, template_key, workbook_path],
+                        capture_output=True, text=True, cwd=ROOT,
+                    )
+                    case = {'stage': stage, 'template': template_key, 'size': size}
+                    if proc.returncode == 0:
+                        case.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+                    else:
+                        case['error'] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'
+                    results.append(case)
+                    print(f"{stage:<12} {template_key:<4} {size:>7} rows  {case.get('seconds', 'ERR')}s",
+                          file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        return compare(results, args.baseline, args.tolerance)
+    return 0
+
+
+def compare(results, baseline_path, tolerance):
+    """Print cases slower than tolerance x baseline; return 1 if there are any."""
+    with open(baseline_path) as f:
+        baseline = {(r['stage'], r['template'], r['size']): r for r in json.load(f)['results']}
+    regressions = 0
+    for case in results:
+        before = baseline.get((case['stage'], case['template'], case['size']))
+        if not before or 'seconds' not in before or 'seconds' not in case or not before['seconds']:
+            continue
+        ratio = case['seconds'] / before['seconds']
+        if ratio > tolerance:
+            regressions += 1
+            print(f"REGRESSION {case['stage']} {case['template']} {case['size']} rows: "
+                  f"{before['seconds']}s -> {case['seconds']}s ({ratio:.2f}x)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
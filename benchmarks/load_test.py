@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+"""Load test for the production server.
+
+Posts a synthetic workbook (built like bench_pipeline's) to /upload from
+--concurrency client threads until --requests uploads have finished, and
+reports throughput and latency percentiles as JSON.
+
+With --workers the script starts gunicorn itself (gunicorn.conf.py) once
+per worker count, with the result and page caches disabled so every
+upload is rendered, and reports how throughput scales:
+
+  python benchmarks/load_test.py --workers 1,2,4 --rows 60 --requests 200 --concurrency 16
+
+Without --workers it targets an already running server:
+
+  python benchmarks/load_test.py --url http://localhost:8000 --rows 60 --requests 200
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import build_workbook  # noqa: E402
+
+
+def multipart(fields, filename, data):
+    """Encode form fields and one file as multipart/form-data; returns (body, content type)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def run_load(url, body, content_type, requests, concurrency, timeout):
+    """Send requests uploads from concurrency threads; returns the measurements."""
+    latencies = []
+    errors = []
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            req = urllib.request.Request(url + '/upload', data=body, headers={'Content-Type': content_type})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=timeout) as response:
+                    response.read()
+                    # Failed uploads redirect back to the (HTML) index page
+                    content = response.headers.get_content_type()
+                    error = None if content != 'text/html' else 'upload rejected'
+            except (urllib.error.URLError, OSError) as e:
+                error = str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if error is None:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(error)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    result = {
+        'requests': requests,
+        'concurrency': concurrency,
+        'ok': len(latencies),
+        'errors': requests - len(latencies),
+        'seconds': round(seconds, 3),
+        'requests_per_sec': round(len(latencies) / seconds, 2) if seconds else None,
+    }
+    if latencies:
+        latencies.sort()
+        result['latency_ms'] = {
+            'p50': round(statistics.median(latencies) * 1000, 1),
+            'p95': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1),
+        }
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+
+def wait_healthy(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/healthz', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not become healthy')
+
+
+def start_server(workers, threads, port):
+    env = dict(os.environ,
+               ARN_WEB_WORKERS=str(workers), ARN_WEB_THREADS=str(threads), ARN_BIND=f'127.0.0.1:{port}',
+               ARN_RESULT_CACHE_BYTES='0', ARN_PAGE_CACHE_BYTES='0', ARN_LOG_LEVEL='WARNING')
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--workers', help="comma-separated gunicorn worker counts to start and compare")
+    parser.add_argument('--threads', type=int, default=8, help="threads per worker for --workers")
+    parser.add_argument('--rows', type=int, default=60, help="rows in the uploaded workbook")
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--template', help="template id to render with (default: the server's default)")
+    parser.add_argument('--timeout', type=float, default=300, help="client timeout per request (seconds)")
+    parser.add_argument('--output', help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook_path = os.path.join(tmp, f'load_{args.rows}.xlsx')
+        build_workbook(workbook_path, args.rows)
+        with open(workbook_path, 'rb') as f:
+            data = f.read()
+    fields = {'template': args.template} if args.template else {}
+    body, content_type = multipart(fields, 'load.xlsx', data)
+
+    runs = []
+    if args.workers:
+        port = 8765
+        for workers in [int(w) for w in args.workers.split(',') if w]:
+            server = start_server(workers, args.threads, port)
+            url = f'http://127.0.0.1:{port}'
+            try:
+                wait_healthy(url)
+                # One warm-up request per worker so first-request costs are not measured
+                run_load(url, body, content_type, workers, workers, args.timeout)
+                result = run_load(url, body, content_type, args.requests, args.concurrency, args.timeout)
+            finally:
+                server.terminate()
+                server.wait()
+            result = dict({'workers': workers, 'threads': args.threads}, **result)
+            runs.append(result)
+            print(f"{workers:>3} worker(s)  {result['requests_per_sec']} req/s", file=sys.stderr)
+    else:
+        wait_healthy(args.url, timeout=5)
+        runs.append(run_load(args.url, body, content_type, args.requests, args.concurrency, args.timeout))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'rows': args.rows,
+        'runs': runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0 if all(run['errors'] == 0 for run in runs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+"""Streaming .docx output.
+
+Instead of growing one in-memory document and saving it at the end, the
+writer copies the template's static parts (styles, numbering, media, ...)
+into the output zip once and then writes ``word/document.xml`` page by page:
+the template's prologue, each filled page body as it arrives, then the
+section properties. Only the page currently being written is held in memory.
+"""
+
+import copy
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+from docx.enum.text import WD_BREAK
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+from lxml import etree
+
+_PAGES_MARKER = 'arn-pages'
+
+
+def _document_frame(doc):
+    """Split the template's serialized w:document around its body content.
+
+    Returns (prologue, epilogue) bytes: everything up to the first body child,
+    and the sectPr plus closing tags. Serialized exactly as python-docx saves
+    the part, so the streamed document.xml matches a regular save.
+    """
+    root = copy.deepcopy(doc.element)
+    body = root.body
+    sect_pr = body.sectPr
+    for child in list(body):
+        body.remove(child)
+    body.append(etree.Comment(_PAGES_MARKER))
+    if sect_pr is not None:
+        body.append(sect_pr)
+    xml = etree.tostring(root, encoding='UTF-8', standalone=True)
+    prologue, epilogue = xml.split(b'<!--' + _PAGES_MARKER.encode() + b'-->')
+    return prologue, epilogue
+
+
+def _add_page_break(body):
+    """Add a page break run to the last paragraph of a page body.
+
+    Same as the in-memory path, which added the break to the last paragraph of
+    the output document before appending the next page.
+    """
+    last_p = next(body.iterchildren(qn('w:p'), reversed=True), None)
+    if last_p is not None:
+        paragraph = Paragraph(last_p, None)
+    else:
+        paragraph = Paragraph(body.add_p(), None)
+    paragraph.add_run().add_break(WD_BREAK.PAGE)
+
+
+def _entry_info(template_info):
+    """Output zip entry for a template member, keeping its timestamp.
+
+    Entries never carry the generation time, so the same rows rendered with
+    the same template always produce byte-identical files.
+    """
+    info = zipfile.ZipInfo(template_info.filename, date_time=template_info.date_time)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = template_info.external_attr
+    return info
+
+
+def _serialize_body_content(body):
+    """Serialize the children of a page body (without sectPr) in document encoding."""
+    sect_pr = body.sectPr
+    if sect_pr is not None:
+        body.remove(sect_pr)
+    if len(body) == 0:
+        return b''
+    xml = etree.tostring(body, encoding='UTF-8', xml_declaration=False)
+    # Drop the <w:body ...> wrapper; the output root declares the same namespaces
+    return xml[xml.index(b'>') + 1:xml.rindex(b'</')]
+
+
+class StreamingDocxWriter:
+    """Write a .docx built from a CompiledTemplate one page body at a time.
+
+    fileobj may be a path or any writable file-like object, including
+    unseekable streams.
+    """
+
+    def __init__(self, template, fileobj):
+        self.page_count = 0
+        self._pending = None
+        self._prologue, self._epilogue = template.compiled('document_frame', _document_frame)
+        document_part = template.compiled('document_partname', lambda doc: doc.part.partname.lstrip('/'))
+
+        self._zip = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(io.BytesIO(template.blob)) as source:
+            for info in source.infolist():
+                if info.filename == document_part:
+                    document_info = _entry_info(info)
+                    continue
+                self._zip.writestr(_entry_info(info), source.read(info))
+        self._document = self._zip.open(document_info, 'w', force_zip64=True)
+        self._document.write(self._prologue)
+
+    def add_page(self, body):
+        """Append a filled page's w:body element (the element is consumed).
+
+        Each page is held back until the next one arrives, because a page
+        break goes on the last paragraph of every page except the final one.
+        """
+        if self._pending is not None:
+            _add_page_break(self._pending)
+            self._document.write(_serialize_body_content(self._pending))
+        self._pending = body
+        self.page_count += 1
+
+    def close(self):
+        if self._document is None:
+            return
+        if self._pending is not None:
+            self._document.write(_serialize_body_content(self._pending))
+            self._pending = None
+        self._document.write(self._epilogue)
+        self._document.close()
+        self._document = None
+        self._zip.close()
+
+    def abort(self):
+        """Close the underlying zip without finishing the document."""
+        if self._document is not None:
+            self._document.close()
+            self._document = None
+        self._zip.close()
+
+
+class ChunkSink:
+    """Unseekable write target that collects bytes for a streamed response."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class SpooledOutput:
+    """Seekable write target kept in memory until it outgrows spill_threshold.
+
+    Past the threshold the bytes written so far move to a temporary file and
+    writing continues there, so only large documents touch the disk. Once
+    closed, open() hands out independent readers; discard() frees the buffer
+    and removes any spill file.
+    """
+
+    def __init__(self, spill_threshold):
+        self.spill_threshold = spill_threshold
+        self.path = None
+        self._file = io.BytesIO()
+        self._data = None
+
+    @property
+    def spilled(self):
+        return self.path is not None
+
+    def _spill(self):
+        fd, self.path = tempfile.mkstemp(suffix='.docx')
+        spill_file = os.fdopen(fd, 'w+b')
+        position = self._file.tell()
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, spill_file)
+        spill_file.seek(position)
+        self._file = spill_file
+
+    def write(self, data):
+        if self.path is None and self._file.tell() + len(data) > self.spill_threshold:
+            self._spill()
+        return self._file.write(data)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def seekable(self):
+        return True
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        """Finish writing; the content stays available through open()."""
+        if self._file is None:
+            return
+        if self.path is None:
+            self._data = self._file.getvalue()
+        self._file.close()
+        self._file = None
+
+    @property
+    def size(self):
+        """Size in bytes of the finished content."""
+        if self._data is not None:
+            return len(self._data)
+        if self.path is not None and os.path.exists(self.path):
+            return os.path.getsize(self.path)
+        return 0
+
+    def open(self):
+        """Return a new binary reader over the finished content."""
+        self.close()
+        if self.path is not None:
+            return open(self.path, 'rb')
+        return io.BytesIO(self._data)
+
+    def discard(self):
+        self.close()
+        self._data = None
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+
+"""Declarative field specs for .docx form templates.
+
+A spec is a JSON file, normally next to its template (``<template>.json``),
+that says where row data goes in the document:
+
+- ``paragraphs``: body paragraphs matched by their text, rewritten as one
+  plain run (``text``) or as formatted ``runs``
+- ``tokens``: text nodes anywhere (including textboxes) whose whole text is
+  one of the token variants, replaced by ``text``
+- ``cells``: table cells by table, row and column; with ``repeat`` the row
+  advances for every row on the page
+
+Texts are ``str.format`` templates over the page's first row (or, in
+repeated cells, the row itself), plus ``date``, ``token`` and any
+``page_fields``. Unknown fields format as ''. ``rows_per_page`` and
+``group_by`` say how rows are laid out into pages, and ``detect`` lists
+conditions that recognise the template when it has no spec of its own.
+
+FormSpec.compile() scans a pristine template once and records every slot
+as a child-index path; CompiledForm.fill() then fills fresh page copies
+without searching them.
+"""
+
+import hashlib
+import json
+import logging
+import string
+from datetime import datetime
+
+from docx.text.paragraph import Paragraph
+
+from template_cache import element_path, resolve_path
+
+logger = logging.getLogger(__name__)
+
+_SPEC_KEYS = {'name', 'rows_per_page', 'group_by', 'detect', 'page_fields', 'paragraphs', 'tokens', 'cells'}
+_MATCH_KEYS = {'equals', 'startswith', 'contains', 'excludes', 'ignore_case'}
+
+
+class FormSpecError(ValueError):
+    """Raised for a spec file that cannot be used."""
+
+
+def _check_format(text, where):
+    if not isinstance(text, str):
+        raise FormSpecError(f"{where}: text must be a string")
+    try:
+        for _, field, _, _ in string.Formatter().parse(text):
+            if field is not None and not field.isidentifier():
+                raise FormSpecError(f"{where}: '{{{field}}}' is not a plain field name")
+    except ValueError as e:
+        raise FormSpecError(f"{where}: {e}") from None
+    return text
+
+
+def _check_match(match, where):
+    if not isinstance(match, dict) or not match or set(match) - _MATCH_KEYS:
+        raise FormSpecError(f"{where}: match needs some of {', '.join(sorted(_MATCH_KEYS))}")
+    for key in ('contains', 'excludes'):
+        if not isinstance(match.get(key, []), list):
+            raise FormSpecError(f"{where}: '{key}' must be a list")
+    return match
+
+
+def _matches(match, text):
+    """True if paragraph text (stripped) satisfies every condition of match."""
+    if match.get('ignore_case'):
+        text = text.lower()
+
+        def norm(s):
+            return s.lower()
+    else:
+        def norm(s):
+            return s
+    if 'equals' in match and text != norm(match['equals']):
+        return False
+    if 'startswith' in match and not text.startswith(norm(match['startswith'])):
+        return False
+    if not all(norm(s) in text for s in match.get('contains', [])):
+        return False
+    return not any(norm(s) in text for s in match.get('excludes', []))
+
+
+class _Values:
+    """Format mapping for one row: page fields, then the row, then defaults, else ''."""
+
+    __slots__ = ('row', 'page', 'defaults')
+
+    def __init__(self, row, page, defaults):
+        self.row = row
+        self.page = page
+        self.defaults = defaults
+
+    def __getitem__(self, key):
+        if key in self.page:
+            return self.page[key]
+        value = self.row.get(key)
+        if value is None:
+            value = self.defaults.get(key, '')
+        return value
+
+
+def _set_paragraph_text(p, text):
+    p.clear_content()
+    if text:
+        p.add_r().text = text
+
+
+def _set_paragraph_runs(p, runs, values):
+    p.clear_content()
+    paragraph = Paragraph(p, None)
+    for spec in runs:
+        run = paragraph.add_run(spec['text'].format_map(values))
+        if spec.get('bold'):
+            run.bold = True
+        if spec.get('underline'):
+            run.underline = True
+
+
+def _set_cell_text(tc, text):
+    tc.clear_content()
+    tc.add_p().add_r().text = text
+
+
+class FormSpec:
+    """A parsed and validated spec; compile() binds it to a template document."""
+
+    def __init__(self, data, content_hash=None, source=None):
+        where = source or 'form spec'
+        if not isinstance(data, dict):
+            raise FormSpecError(f"{where}: expected a JSON object")
+        unknown = set(data) - _SPEC_KEYS
+        if unknown:
+            raise FormSpecError(f"{where}: unknown key(s) {', '.join(sorted(unknown))}")
+        self.source = source
+        self.name = data.get('name') or source or 'form'
+        self.rows_per_page = data.get('rows_per_page', 1)
+        if not isinstance(self.rows_per_page, int) or self.rows_per_page < 1:
+            raise FormSpecError(f"{where}: rows_per_page must be a positive integer")
+        self.group_by = tuple(data.get('group_by', ()))
+        self.detect = data.get('detect')
+        self.page_fields = data.get('page_fields', {})
+        for name, field in self.page_fields.items():
+            if not isinstance(field, dict) or 'common' not in field:
+                raise FormSpecError(f"{where}: page field '{name}' needs 'common' (and optionally 'mixed')")
+
+        self.paragraphs = []
+        for i, rule in enumerate(data.get('paragraphs', [])):
+            at = f"{where}: paragraphs[{i}]"
+            _check_match(rule.get('match'), at)
+            if ('text' in rule) == ('runs' in rule):
+                raise FormSpecError(f"{at}: give either 'text' or 'runs'")
+            if 'text' in rule:
+                _check_format(rule['text'], at)
+            else:
+                for run in rule['runs']:
+                    _check_format(run.get('text'), at)
+            self.paragraphs.append(rule)
+
+        self.tokens = []
+        for i, rule in enumerate(data.get('tokens', [])):
+            at = f"{where}: tokens[{i}]"
+            if not isinstance(rule.get('tokens'), list) or not rule['tokens']:
+                raise FormSpecError(f"{at}: 'tokens' must be a non-empty list")
+            _check_format(rule.get('text'), at)
+            self.tokens.append(rule)
+
+        self.cells = []
+        for i, rule in enumerate(data.get('cells', [])):
+            at = f"{where}: cells[{i}]"
+            if not isinstance(rule.get('table'), int) or not isinstance(rule.get('row'), int):
+                raise FormSpecError(f"{at}: 'table' and 'row' must be integers")
+            columns = rule.get('columns')
+            if not isinstance(columns, dict) or not all(c.isdigit() for c in columns):
+                raise FormSpecError(f"{at}: 'columns' must map column numbers to texts")
+            for text in columns.values():
+                _check_format(text, at)
+            self.cells.append(rule)
+
+        if content_hash is None:
+            content_hash = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        self.content_hash = content_hash
+
+    def detects(self, doc):
+        """True if doc meets any detect condition (min_tables, or a paragraph match)."""
+        for condition in self.detect or ():
+            if 'min_tables' in condition and len(doc.tables) >= condition['min_tables']:
+                return True
+            if 'paragraph' in condition and any(_matches(condition['paragraph'], p.text.strip())
+                                                for p in doc.paragraphs):
+                return True
+        return False
+
+    def compile(self, doc):
+        """Find every slot of this spec in an unfilled template document."""
+        form = CompiledForm(self)
+        cleared = set()
+        for paragraph in doc.paragraphs:
+            txt = paragraph.text.strip()
+            for rule in self.paragraphs:
+                if _matches(rule['match'], txt):
+                    form.paragraphs.append((element_path(paragraph._p), rule))
+                    cleared.add(paragraph._p)
+                    break
+
+        # Text nodes inside rewritten paragraphs are gone by the time tokens are replaced
+        token_rules = {}
+        for rule in self.tokens:
+            for token in rule['tokens']:
+                token_rules[str(token).strip()] = rule
+        if token_rules:
+            for t in doc.element.xpath('.//w:t'):
+                current = (t.text or '').replace('\xa0', ' ').strip()
+                rule = token_rules.get(current)
+                if rule is None or any(ancestor in cleared for ancestor in t.iterancestors()):
+                    continue
+                form.tokens.append((element_path(t), current, rule['text']))
+
+        tables = doc.tables
+        for rule in self.cells:
+            rows = range(self.rows_per_page) if rule.get('repeat') else (0,)
+            for offset in rows:
+                slots = []
+                try:
+                    table = tables[rule['table']]
+                    for column, text in rule['columns'].items():
+                        slots.append((element_path(table.cell(rule['row'] + offset, int(column))._tc), text))
+                except IndexError:
+                    logger.warning("%s: table %s row %s not found in the template",
+                                   self.name, rule['table'], rule['row'] + offset)
+                    slots = None
+                if rule.get('repeat'):
+                    form.repeat_cells.setdefault(offset, []).append((rule, slots))
+                elif slots:
+                    form.cells.extend(slots)
+        return form
+
+
+class CompiledForm:
+    """A FormSpec bound to the slot locations of one template."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.paragraphs = []    # (path, rule)
+        self.tokens = []        # (path, token, text)
+        self.cells = []         # (path, text), filled from the page's first row
+        self.repeat_cells = {}  # page row index -> [(rule, [(path, text)] or None)]
+
+    @property
+    def rows_per_page(self):
+        return self.spec.rows_per_page
+
+    @property
+    def group_by(self):
+        return self.spec.group_by
+
+    @property
+    def spec_hash(self):
+        return self.spec.content_hash
+
+    def _page_values(self, rows):
+        first = rows[0]
+        page = {'date': first.get('date') or datetime.now().strftime('%d-%m-%Y')}
+        for name, field in self.spec.page_fields.items():
+            found = {row.get(field['common'], '') for row in rows}
+            page[name] = next(iter(found)) if len(found) == 1 else field.get('mixed', '')
+        return page
+
+    def fill(self, doc, rows, defaults=None):
+        """Fill one page (a fresh template copy) with up to rows_per_page rows (mappings).
+
+        defaults supplies fields missing from the rows.
+        """
+        defaults = defaults or {}
+        root = doc.element
+        # Resolve every path before any node is modified
+        paragraphs = [(resolve_path(root, path), rule) for path, rule in self.paragraphs]
+        tokens = [(resolve_path(root, path), token, text) for path, token, text in self.tokens]
+        cells = [(resolve_path(root, path), text) for path, text in self.cells]
+        repeat = []
+        for i in range(min(len(rows), self.rows_per_page)):
+            for rule, slots in self.repeat_cells.get(i, ()):
+                if slots is None:
+                    logger.warning("Could not fill table %s row %s", rule['table'], rule['row'] + i)
+                    continue
+                repeat.append((i, [(resolve_path(root, path), text) for path, text in slots]))
+
+        page = self._page_values(rows)
+        values = _Values(rows[0], page, defaults)
+        for p, rule in paragraphs:
+            if 'text' in rule:
+                _set_paragraph_text(p, rule['text'].format_map(values))
+            else:
+                _set_paragraph_runs(p, rule['runs'], values)
+        for t, token, text in tokens:
+            t.text = text.format_map(_Values(rows[0], dict(page, token=token), defaults))
+        for tc, text in cells:
+            _set_cell_text(tc, text.format_map(values))
+        for i, slots in repeat:
+            row_values = _Values(rows[i], page, defaults)
+            for tc, text in slots:
+                _set_cell_text(tc, text.format_map(row_values))
+
+
+def load_form_spec(path):
+    """Read and validate a spec file; raises FormSpecError."""
+    with open(path, 'rb') as f:
+        blob = f.read()
+    try:
+        data = json.loads(blob)
+    except ValueError as e:
+        raise FormSpecError(f"{path}: {e}") from None
+    return FormSpec(data, hashlib.sha256(blob).hexdigest(), source=path)
+
+
+def detect_form_spec(doc, specs):
+    """Return the first spec that detects doc, else the first spec without detect rules."""
+    for spec in specs:
+        if spec.detect and spec.detects(doc):
+            return spec
+    for spec in specs:
+        if not spec.detect:
+            return spec
+    raise FormSpecError('No form spec matches this template')
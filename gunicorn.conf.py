@@ -0,0 +1,37 @@
+"""gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:application
+
+Every value can be set through the ARN_WEB_* environment variables (see
+README, "Production serving").
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('ARN_BIND', '0.0.0.0:8000')
+# Filling pages is CPU bound, so one worker process per CPU; the threads of each
+# worker overlap uploads, downloads and PDF conversion with that work
+workers = int(os.environ.get('ARN_WEB_WORKERS') or multiprocessing.cpu_count())
+threads = int(os.environ.get('ARN_WEB_THREADS', '8'))
+worker_class = 'gthread'
+# Import the app (and parse every template) once in the master; workers share
+# the parsed templates copy-on-write instead of each loading them
+preload_app = True
+# A worker that does not report back for this long is killed and replaced. With
+# gthread workers this only catches a hung process; slow requests are stopped
+# by the app itself at the same deadline (app.REQUEST_TIMEOUT)
+timeout = int(os.environ.get('ARN_REQUEST_TIMEOUT', '120')) or 120
+graceful_timeout = int(os.environ.get('ARN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+# Recycle workers after this many requests (0 = never)
+max_requests = int(os.environ.get('ARN_WEB_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('ARN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Threads started in the master do not survive fork: start template watching
+    # (and PDF warm-up) in every worker
+    from app import start_background_tasks
+
+    start_background_tasks()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""In-process background job queue for document generation.
+
+Jobs run on a bounded thread pool. Submissions beyond max_pending queued or
+running jobs are rejected with QueueFull so callers can apply backpressure
+(the web app answers 429). Finished jobs, their files and results with a
+discard() method are released once they are older than the TTL.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """Raised when the queue already holds max_pending unfinished jobs."""
+
+
+class Job:
+    """State and progress of one background job."""
+
+    def __init__(self, result_path=None, download_name=None, cleanup_paths=()):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.rows_parsed = 0
+        self.pages_rendered = 0
+        self.result = None
+        self.error = None
+        self.result_path = result_path
+        self.download_name = download_name
+        # Files removed when the job expires (the result file is always included)
+        self.cleanup_paths = list(cleanup_paths)
+        # metrics.StageTimings of the generation, when the job records one
+        self.timings = None
+        # validation.ValidationReport of the rows read, when the job records one
+        self.validation = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def row_parsed(self):
+        self.rows_parsed += 1
+
+    def page_rendered(self, page_count):
+        self.pages_rendered = page_count
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'rows_parsed': self.rows_parsed,
+            'pages_rendered': self.pages_rendered,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'validation': self.validation.to_dict() if self.validation is not None else None,
+        }
+
+
+class JobQueue:
+    """Bounded thread-pool job runner with TTL cleanup."""
+
+    def __init__(self, max_workers=2, max_pending=16, ttl_seconds=3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='arn-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **job_kwargs):
+        """Queue fn(job, *args) and return the Job; raises QueueFull when saturated.
+
+        job_kwargs are passed to Job (result_path, download_name, cleanup_paths).
+        fn's return value is stored on job.result; an exception marks it failed.
+        """
+        self.cleanup()
+        job = Job(**job_kwargs)
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if not j.finished)
+            if pending >= self.max_pending:
+                raise QueueFull(f'{pending} jobs already pending')
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        job.status = RUNNING
+        job.started_at = time.time()
+        # finished_at is set before the final status: other threads treat a
+        # finished job as having one (cleanup, /jobs/<id>)
+        try:
+            job.result = fn(job, *args)
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.status = FAILED
+        else:
+            job.finished_at = time.time()
+            job.status = DONE
+
+    def get(self, job_id):
+        self.cleanup()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cleanup(self):
+        """Forget finished jobs older than the TTL and delete their files."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [j for j in self._jobs.values()
+                       if j.finished and j.finished_at is not None and j.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            discard = getattr(job.result, 'discard', None)
+            if discard is not None:
+                discard()
+            for path in [job.result_path] + job.cleanup_paths:
+                if path and os.path.exists(path):
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        logger.warning("Could not remove %s for expired job %s", path, job.id)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'queued': sum(1 for j in jobs if j.status == QUEUED),
+            'running': sum(1 for j in jobs if j.status == RUNNING),
+            'finished': sum(1 for j in jobs if j.finished),
+        }
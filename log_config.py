@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+"""Logging setup shared by the web app and the command-line script.
+
+Modules log through ``logging.getLogger(__name__)`` with lazy %-style
+arguments, so debug output costs nothing unless DEBUG is enabled.
+
+Environment:
+  ARN_LOG_LEVEL   DEBUG, INFO (default), WARNING, ...
+  ARN_LOG_FORMAT  'text' (default) or 'json' (one JSON object per line)
+"""
+
+import json
+import logging
+import os
+
+LOG_LEVEL_ENV = 'ARN_LOG_LEVEL'
+LOG_FORMAT_ENV = 'ARN_LOG_FORMAT'
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level=None, fmt=None, force=False):
+    """Install a stderr handler on the root logger.
+
+    level and fmt default to ARN_LOG_LEVEL / ARN_LOG_FORMAT. When the root
+    logger already has handlers (e.g. configured by the WSGI server) it is
+    left alone unless force is True.
+    """
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return
+
+    level = level or os.environ.get(LOG_LEVEL_ENV, 'INFO')
+    fmt = fmt or os.environ.get(LOG_FORMAT_ENV, 'text')
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
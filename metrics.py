@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+"""Pipeline metrics in Prometheus text format.
+
+A small in-process registry (no client library needed) with counters,
+histograms and callback metrics read at scrape time. Document generation
+records its stage breakdown in a StageTimings, which feeds the stage
+histogram once per document and renders the Server-Timing header.
+
+Metrics are per process: with several server processes, scrape each one.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a single-page fill up to a very large sheet
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                yield self.name + '_bucket', labels + (('le', _format_value(float(bound))),), cumulative
+            yield self.name + '_sum', labels, values[-1]
+            yield self.name + '_count', labels, cumulative
+
+
+class CallbackMetric:
+    """Metric whose value is read from fn() at scrape time.
+
+    fn returns a number, or a list of (labels dict, value) pairs.
+    """
+
+    def __init__(self, name, kind, help_text, fn):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.fn = fn
+
+    def samples(self):
+        result = self.fn()
+        if isinstance(result, (int, float)):
+            yield self.name, (), result
+            return
+        for labels, value in result:
+            yield self.name, tuple(labels.items()), value
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name, kind, help_text, fn):
+        return self.register(CallbackMetric(name, kind, help_text, fn))
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'arn_stage_duration_seconds',
+    'Time spent in each pipeline stage, per generated document.',
+    ('stage',),
+)
+ROWS = REGISTRY.counter('arn_rows_total', 'Excel data rows read for generated documents.')
+PAGES = REGISTRY.counter('arn_pages_total', 'Pages written to generated documents.')
+DOCUMENTS = REGISTRY.counter(
+    'arn_documents_total',
+    'Document generations by outcome (ok, empty, failed, cached).',
+    ('outcome',),
+)
+
+
+class StageTimings:
+    """Per-document stage durations plus row and page counts.
+
+    Durations of repeated stages (page_fill, page_splice, ...) are summed.
+    Call observe() once the document is finished to feed the histograms.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.rows = 0
+        self.pages = 0
+        self._start = time.perf_counter()
+        self._observed = False
+
+    def add(self, stage, seconds):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def count_rows(self, rows, stage='excel_parse'):
+        """Yield from rows, timing each step as stage and counting the rows."""
+        iterator = iter(rows)
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - start)
+                return
+            self.add(stage, time.perf_counter() - start)
+            self.rows += 1
+            yield row
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def server_timing(self):
+        """Return the stages as a Server-Timing header value (milliseconds)."""
+        return ', '.join(f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in self.durations.items())
+
+    def observe(self):
+        """Record the stages (plus a 'total') and counts in the global metrics, once."""
+        if self._observed:
+            return
+        self._observed = True
+        self.durations.setdefault('total', self.elapsed())
+        for stage, seconds in self.durations.items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+        ROWS.inc(self.rows)
+        PAGES.inc(self.pages)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""In-memory cache of filled page bodies for incremental regeneration.
+
+Every page of a generated document is stored as its serialized ``w:body``
+under a fingerprint of the rows on that page plus everything else that
+shapes it (template content, defaults, date). When a corrected workbook is
+uploaded again, pages whose rows did not change are taken from here instead
+of being filled again; only edited pages are re-rendered.
+
+Because pages are content-addressed, a re-upload does not have to be
+recognised as the "same" workbook: any page identical to one rendered
+recently is reused.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def page_fingerprint(context, rows):
+    """Return the cache key for a page filled from rows (mappings) under context (bytes)."""
+    digest = hashlib.sha256(context)
+    digest.update(json.dumps([dict(row) for row in rows], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class PageCache:
+    """LRU of serialized page bodies, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, fingerprint):
+        with self._lock:
+            xml = self._entries.get(fingerprint)
+            if xml is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return xml
+
+    def put(self, fingerprint, xml):
+        if len(xml) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(fingerprint, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[fingerprint] = xml
+            self._bytes += len(xml)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""PDF conversion of generated documents through headless LibreOffice.
+
+Every conversion runs a new soffice process, but most of LibreOffice's cold
+start is creating and loading its user profile. The converter keeps a fixed
+number of slots, each with its own profile directory that is created once
+and reused (warm() creates them up front), so conversions after the first
+only pay for starting the process. Slots never share a profile, so up to
+`workers` documents convert at the same time.
+
+The profiles live in a temporary directory per process, removed by
+shutdown() or when the process exits.
+
+Converted PDFs can be cached by the content hash of the .docx. Generated
+documents are byte-for-byte reproducible, so a document is only converted once.
+"""
+
+import hashlib
+import logging
+import multiprocessing.util
+import os
+import pathlib
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SOFFICE_ENV = 'ARN_SOFFICE'
+_KNOWN_LOCATIONS = (
+    '/Applications/LibreOffice.app/Contents/MacOS/soffice',
+    r'C:\Program Files\LibreOffice\program\soffice.exe',
+)
+
+
+class PdfUnavailable(Exception):
+    """Raised when no LibreOffice executable is available."""
+
+
+class PdfConversionError(Exception):
+    """Raised when LibreOffice fails or times out converting a document."""
+
+
+def find_soffice():
+    """Return the LibreOffice executable from ARN_SOFFICE, PATH or the usual install locations."""
+    configured = os.environ.get(SOFFICE_ENV)
+    if configured:
+        return configured if os.path.exists(configured) else shutil.which(configured)
+    for name in ('soffice', 'libreoffice'):
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in _KNOWN_LOCATIONS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class PdfConverter:
+    """LibreOffice profile slots converting .docx bytes to PDF bytes.
+
+    cache, if given, is a result_cache.ResultCache used to store PDFs by the
+    sha256 of the source document.
+    """
+
+    def __init__(self, binary=None, workers=2, timeout=120, cache=None):
+        self.binary = binary or find_soffice()
+        self.workers = max(int(workers), 1)
+        self.timeout = timeout
+        self.cache = cache
+        self.conversions = 0
+        self._root = None
+        self._root_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.binary is not None
+
+    def _get_slots(self):
+        with self._lock:
+            if self._slots is not None and self._root_pid != os.getpid():
+                # Forked from the process that owns these profiles: make our own
+                self._root = self._slots = None
+            if self._slots is None:
+                if not self.available:
+                    raise PdfUnavailable(f'LibreOffice (soffice) not found; install it or set {SOFFICE_ENV}')
+                self._root = tempfile.mkdtemp(prefix='arn-pdf-')
+                self._root_pid = os.getpid()
+                # Runs at interpreter exit, and also in multiprocessing workers,
+                # which skip atexit handlers
+                multiprocessing.util.Finalize(self, _remove_root, args=(self._root, self._root_pid),
+                                              exitpriority=10)
+                self._slots = queue.Queue()
+                for i in range(self.workers):
+                    profile = os.path.join(self._root, f'profile{i}')
+                    os.makedirs(profile)
+                    self._slots.put(profile)
+            return self._slots
+
+    def warm(self, sample_docx):
+        """Initialize every slot's profile by converting sample_docx (bytes) once, in parallel."""
+        slots = self._get_slots()
+        profiles = [slots.get() for _ in range(self.workers)]
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(lambda profile: self._run(profile, sample_docx), profiles))
+        finally:
+            for profile in profiles:
+                slots.put(profile)
+        logger.info("PDF converter warmed (%s profile(s))", self.workers)
+
+    def convert(self, docx_bytes):
+        """Return the PDF rendering of a .docx given as bytes."""
+        key = hashlib.sha256(docx_bytes).hexdigest()
+        if self.cache is not None:
+            cached = self.cache.open(key)
+            if cached is not None:
+                with cached:
+                    return cached.read()
+
+        slots = self._get_slots()
+        profile = slots.get()
+        try:
+            pdf = self._run(profile, docx_bytes)
+        finally:
+            slots.put(profile)
+
+        if self.cache is not None:
+            writer = self.cache.writer(key)
+            if writer is not None:
+                writer.write(pdf)
+                writer.commit()
+        return pdf
+
+    def _run(self, profile, docx_bytes):
+        with tempfile.TemporaryDirectory(dir=self._root) as work:
+            source = os.path.join(work, 'document.docx')
+            with open(source, 'wb') as f:
+                f.write(docx_bytes)
+            command = [
+                self.binary,
+                f'-env:UserInstallation={pathlib.Path(profile).as_uri()}',
+                '--headless', '--invisible', '--norestore', '--nologo', '--nodefault', '--nolockcheck',
+                '--convert-to', 'pdf:writer_pdf_Export',
+                '--outdir', work,
+                source,
+            ]
+            try:
+                proc = subprocess.run(command, capture_output=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                raise PdfConversionError(f'LibreOffice timed out after {self.timeout}s')
+            target = os.path.join(work, 'document.pdf')
+            if proc.returncode != 0 or not os.path.exists(target):
+                detail = proc.stderr.decode(errors='replace').strip()[-500:]
+                raise PdfConversionError(f'LibreOffice failed (exit {proc.returncode}): {detail}')
+            with open(target, 'rb') as f:
+                pdf = f.read()
+        with self._lock:
+            self.conversions += 1
+        return pdf
+
+    def shutdown(self):
+        """Remove the profiles; the next conversion starts cold again."""
+        with self._lock:
+            if self._root is not None:
+                _remove_root(self._root, self._root_pid)
+            self._root = None
+            self._slots = None
+
+
+def _remove_root(root, pid):
+    # Only the process that created the profiles removes them: forked
+    # children (e.g. gunicorn workers) inherit exit hooks and the directory name
+    if os.getpid() == pid:
+        shutil.rmtree(root, ignore_errors=True)
@@ -3,28 +3,40 @@
 import openpyxl
 from docx import Document
 from docx.enum.text import WD_BREAK
+import argparse
+import glob
+import io
 import os
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
 def read_excel_data(excel_file_path):
     """Read data from Excel file and return as list of dictionaries (one per row)"""
-    print(f"[DEBUG] Starting Excel file reading: {excel_file_path}")
+    logger.debug("Starting Excel file reading: %s", excel_file_path)
     workbook = None
     try:
         workbook = openpyxl.load_workbook(excel_file_path)
         sheet = workbook.active
-        print(f"[DEBUG] Excel file loaded successfully")
-        print(f"[DEBUG] Sheet name: {sheet.title}")
-        print(f"[DEBUG] Max row: {sheet.max_row}, Max column: {sheet.max_column}")
+        logger.debug("Excel file loaded successfully")
+        logger.debug("Sheet name: %s", sheet.title)
+        logger.debug("Max row: %s, Max column: %s", sheet.max_row, sheet.max_column)
         
         # Get all data rows (row 1 contains headers, data starts from row 2)
         data_rows = []
         max_row = sheet.max_row
         
-        print(f"[DEBUG] Processing rows 2 to {max_row}")
+        logger.debug("Processing rows 2 to %s", max_row)
         
         for row_num in range(2, max_row + 1):  # Start from row 2, go to last row
-            print(f"[DEBUG] --- Processing Row {row_num} ---")
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("--- Processing Row %s ---", row_num)
             
             # Check if row has any data (skip completely empty rows)
             mutual_fund = sheet[f'A{row_num}'].value
@@ -32,10 +44,11 @@ def read_excel_data(excel_file_path):
             pan = sheet[f'C{row_num}'].value
             investor = sheet[f'D{row_num}'].value
             
-            print(f"[DEBUG] Raw values: MF='{mutual_fund}' (type: {type(mutual_fund)})")
-            print(f"[DEBUG] Raw values: FN='{folio_no}' (type: {type(folio_no)})")
-            print(f"[DEBUG] Raw values: PAN='{pan}' (type: {type(pan)})")
-            print(f"[DEBUG] Raw values: INV='{investor}' (type: {type(investor)})")
+            if debug:
+                logger.debug("Raw values: MF='%s' (type: %s)", mutual_fund, type(mutual_fund))
+                logger.debug("Raw values: FN='%s' (type: %s)", folio_no, type(folio_no))
+                logger.debug("Raw values: PAN='%s' (type: %s)", pan, type(pan))
+                logger.debug("Raw values: INV='%s' (type: %s)", investor, type(investor))
             
             # Convert to strings and strip whitespace for better empty detection
             mutual_fund_str = str(mutual_fund).strip() if mutual_fund is not None else ''
@@ -43,10 +56,11 @@ def read_excel_data(excel_file_path):
             pan_str = str(pan).strip() if pan is not None else ''
             investor_str = str(investor).strip() if investor is not None else ''
             
-            print(f"[DEBUG] Processed values: MF='{mutual_fund_str}'")
-            print(f"[DEBUG] Processed values: FN='{folio_no_str}'")
-            print(f"[DEBUG] Processed values: PAN='{pan_str}'")
-            print(f"[DEBUG] Processed values: INV='{investor_str}'")
+            if debug:
+                logger.debug("Processed values: MF='%s'", mutual_fund_str)
+                logger.debug("Processed values: FN='%s'", folio_no_str)
+                logger.debug("Processed values: PAN='%s'", pan_str)
+                logger.debug("Processed values: INV='%s'", investor_str)
             
             # Skip row if all cells are empty or contain only 'None'
             has_data = any([mutual_fund_str and mutual_fund_str != 'None', 
@@ -54,10 +68,9 @@ def read_excel_data(excel_file_path):
                            pan_str and pan_str != 'None', 
                            investor_str and investor_str != 'None'])
             
-            print(f"[DEBUG] Row {row_num} has data: {has_data}")
-            
             if not has_data:
-                print(f"[DEBUG] SKIPPING empty row {row_num}")
+                if debug:
+                    logger.debug("SKIPPING empty row %s", row_num)
                 continue
                 
             data = {
@@ -67,23 +80,25 @@ def read_excel_data(excel_file_path):
                 'investor': investor_str
             }
             data_rows.append(data)
-            print(f"[DEBUG] ADDED row {row_num} to data_rows (total now: {len(data_rows)})")
+            if debug:
+                logger.debug("ADDED row %s to data_rows (total now: %s)", row_num, len(data_rows))
         
-        print(f"[DEBUG] Excel reading complete. Total data rows found: {len(data_rows)}")
+        logger.info("Excel reading complete. Total data rows found: %s", len(data_rows))
         return data_rows if data_rows else None
     except Exception as e:
-        print(f"[DEBUG] ERROR reading Excel file: {str(e)}")
+        logger.error("Error reading Excel file: %s", e)
         return None
     finally:
         # Ensure workbook is properly closed
         if workbook:
             workbook.close()
-            print(f"[DEBUG] Excel workbook closed")
+            logger.debug("Excel workbook closed")
 
 def populate_single_page(doc, data):
     """Helper function to populate a single page with data"""
-    print(f"[DEBUG] Starting to populate single page with data: {data}")
-    print(f"[DEBUG] Document has {len(doc.paragraphs)} paragraphs")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Starting to populate single page with data: %s", data)
+        logger.debug("Document has %s paragraphs", len(doc.paragraphs))
     
     fields_populated = 0
     
@@ -93,7 +108,7 @@ def populate_single_page(doc, data):
         
         # Handle "Mutual Fund: " line (Paragraph 3)
         if original_text.strip() == 'Mutual Fund:':
-            print(f"[DEBUG] Found Mutual Fund field at paragraph {i}")
+            logger.debug("Found Mutual Fund field at paragraph %s", i)
             paragraph.clear()
             # Add bold label
             run1 = paragraph.add_run("  Mutual Fund: ")
@@ -102,11 +117,11 @@ def populate_single_page(doc, data):
             run2 = paragraph.add_run(str(data['mutual_fund']))
             run2.underline = True
             fields_populated += 1
-            print(f"[DEBUG] Populated Mutual Fund: '{data['mutual_fund']}'")
+            logger.debug("Populated Mutual Fund: '%s'", data['mutual_fund'])
         
         # Handle "Folio No:* ... PAN:* " line (Paragraph 4)
         elif 'Folio No:*' in original_text and 'PAN:*' in original_text:
-            print(f"[DEBUG] Found Folio/PAN field at paragraph {i}")
+            logger.debug("Found Folio/PAN field at paragraph %s", i)
             paragraph.clear()
             # Add bold "Folio No:*" label
             run1 = paragraph.add_run("      Folio No:* ")
@@ -123,11 +138,11 @@ def populate_single_page(doc, data):
             run4 = paragraph.add_run(str(data['pan']))
             run4.underline = True
             fields_populated += 1
-            print(f"[DEBUG] Populated Folio: '{data['folio_no']}', PAN: '{data['pan']}'")
+            logger.debug("Populated Folio: '%s', PAN: '%s'", data['folio_no'], data['pan'])
         
         # Handle "Investor [First Holder only]:  " line (Paragraph 5)
         elif original_text.strip() == 'Investor [First Holder only]:':
-            print(f"[DEBUG] Found Investor field at paragraph {i}")
+            logger.debug("Found Investor field at paragraph %s", i)
             paragraph.clear()
             # Add bold label
             run1 = paragraph.add_run("  Investor [First Holder only]: ")
@@ -136,11 +151,11 @@ def populate_single_page(doc, data):
             run2 = paragraph.add_run(str(data['investor']).strip())
             run2.underline = True
             fields_populated += 1
-            print(f"[DEBUG] Populated Investor: '{data['investor']}'")
+            logger.debug("Populated Investor: '%s'", data['investor'])
         
         # Handle acknowledgement slip fields
         elif original_text.strip() == 'Mutual Fund :':
-            print(f"[DEBUG] Found Acknowledgement Mutual Fund field at paragraph {i}")
+            logger.debug("Found Acknowledgement Mutual Fund field at paragraph %s", i)
             paragraph.clear()
             # Add bold label
             run1 = paragraph.add_run("Mutual Fund : ")
@@ -149,9 +164,9 @@ def populate_single_page(doc, data):
             run2 = paragraph.add_run(str(data['mutual_fund']))
             run2.underline = True
             fields_populated += 1
-            print(f"[DEBUG] Populated Ack Mutual Fund: '{data['mutual_fund']}'")
+            logger.debug("Populated Ack Mutual Fund: '%s'", data['mutual_fund'])
         elif 'Folio No :' in original_text and 'Date of Receipt:' in original_text:
-            print(f"[DEBUG] Found Acknowledgement Folio field at paragraph {i}")
+            logger.debug("Found Acknowledgement Folio field at paragraph %s", i)
             paragraph.clear()
             # Add bold "Folio No :" label
             run1 = paragraph.add_run("Folio No : ")
@@ -162,105 +177,352 @@ def populate_single_page(doc, data):
             # Add spacing and Date of Receipt
             paragraph.add_run("                              		                                       Date of Receipt:	")
             fields_populated += 1
-            print(f"[DEBUG] Populated Ack Folio: '{data['folio_no']}'")
+            logger.debug("Populated Ack Folio: '%s'", data['folio_no'])
     
-    print(f"[DEBUG] Single page population complete. Fields populated: {fields_populated}")
+    logger.debug("Single page population complete. Fields populated: %s", fields_populated)
 
 def populate_word_document(template_path, data_list, output_path):
     """Populate Word document with multiple pages of Excel data"""
-    print(f"[DEBUG] Starting Word document population")
-    print(f"[DEBUG] Template path: {template_path}")
-    print(f"[DEBUG] Output path: {output_path}")
-    print(f"[DEBUG] Data list contains {len(data_list)} entries")
+    logger.debug("Starting Word document population")
+    logger.debug("Template path: %s", template_path)
+    logger.debug("Output path: %s", output_path)
+    logger.debug("Data list contains %s entries", len(data_list))
     
     try:
         # For single page, use simpler approach
         if len(data_list) == 1:
-            print(f"[DEBUG] Single page mode - using direct template modification")
+            logger.debug("Single page mode - using direct template modification")
             doc = Document(template_path)
-            print(f"[DEBUG] Template loaded with {len(doc.paragraphs)} paragraphs")
             populate_single_page(doc, data_list[0])
             doc.save(output_path)
-            print(f"[DEBUG] Single page document saved successfully")
+            logger.debug("Single page document saved successfully")
             return 1
         
-        print(f"[DEBUG] Multi-page mode - using first page as base")
+        logger.debug("Multi-page mode - using first page as base")
         # For multiple pages, start with the first populated template as base
-        print(f"[DEBUG] === Processing Page 1 of {len(data_list)} ===")
-        print(f"[DEBUG] Page data: {data_list[0]}")
+        logger.debug("=== Processing Page 1 of %s ===", len(data_list))
+        logger.debug("Page data: %s", data_list[0])
         
         # Load and populate the first page as the base document
         output_doc = Document(template_path)
-        print(f"[DEBUG] Base template loaded with {len(output_doc.paragraphs)} paragraphs")
         populate_single_page(output_doc, data_list[0])
-        print(f"[DEBUG] Base template populated for page 1")
+        logger.debug("Base template populated for page 1")
         
         # Process remaining pages (if any)
         for page_index in range(1, len(data_list)):
             data = data_list[page_index]
-            print(f"[DEBUG] === Processing Page {page_index + 1} of {len(data_list)} ===")
-            print(f"[DEBUG] Page data: {data}")
+            logger.debug("=== Processing Page %s of %s ===", page_index + 1, len(data_list))
+            logger.debug("Page data: %s", data)
             
             # Add page break to the last paragraph of the current document
-            print(f"[DEBUG] Adding page break to last paragraph before page {page_index + 1}")
+            logger.debug("Adding page break to last paragraph before page %s", page_index + 1)
             if output_doc.paragraphs:
                 last_para = output_doc.paragraphs[-1]
                 run = last_para.add_run()
                 run.add_break(WD_BREAK.PAGE)
-                print(f"[DEBUG] Page break added to existing paragraph")
+                logger.debug("Page break added to existing paragraph")
             else:
                 # Fallback if no paragraphs exist
                 break_para = output_doc.add_paragraph()
                 run = break_para.add_run()
                 run.add_break(WD_BREAK.PAGE)
-                print(f"[DEBUG] Page break added as new paragraph")
+                logger.debug("Page break added as new paragraph")
             
             # Load a fresh template for this page
             template_doc = Document(template_path)
-            print(f"[DEBUG] Fresh template loaded with {len(template_doc.paragraphs)} paragraphs")
             
             # Populate this template with the current row's data
             populate_single_page(template_doc, data)
-            print(f"[DEBUG] Template populated for page {page_index + 1}")
-            
-            # Count elements before copying
-            elements_before = len(output_doc.element.body)
-            print(f"[DEBUG] Output document has {elements_before} elements before copying")
+            logger.debug("Template populated for page %s", page_index + 1)
             
             # Copy all paragraphs and elements from template to output (except sectPr)
             elements_copied = 0
             for element in template_doc.element.body:
                 element_type = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-                print(f"[DEBUG] Processing element type: {element_type}")
+                logger.debug("Processing element type: %s", element_type)
                 
                 # Skip sectPr (section properties) elements to avoid blank pages
                 if element_type == 'sectPr':
-                    print(f"[DEBUG] SKIPPING sectPr element to prevent blank page")
+                    logger.debug("SKIPPING sectPr element to prevent blank page")
                     continue
                 
                 output_doc.element.body.append(element)
                 elements_copied += 1
-                print(f"[DEBUG] Copied element {elements_copied}: {element_type}")
+                logger.debug("Copied element %s: %s", elements_copied, element_type)
             
-            elements_after = len(output_doc.element.body)
-            print(f"[DEBUG] Copied {elements_copied} elements from template")
-            print(f"[DEBUG] Output document now has {elements_after} elements")
-            print(f"[DEBUG] Output document now has {len(output_doc.paragraphs)} paragraphs")
+            logger.debug("Copied %s elements from template", elements_copied)
         
-        print(f"[DEBUG] Final document has {len(output_doc.paragraphs)} paragraphs")
-        print(f"[DEBUG] Final document has {len(output_doc.element.body)} body elements")
+        logger.debug("Final document has %s body elements", len(output_doc.element.body))
         
         # Save the multi-page document
         output_doc.save(output_path)
-        print(f"[DEBUG] Multi-page document saved successfully")
+        logger.debug("Multi-page document saved successfully")
         return len(data_list)  # Return number of pages created
     except Exception as e:
-        print(f"[DEBUG] ERROR populating Word document: {str(e)}")
-        import traceback
-        print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
+        logger.exception("Error populating Word document: %s", e)
         return False
 
-def main():
+def convert_to_pdf(docx_path):
+    """Convert a generated .docx next to itself; returns the .pdf path or None."""
+    from pdf_convert import PdfConverter
+
+    converter = PdfConverter(workers=1)
+    if not converter.available:
+        print("Error: PDF output needs LibreOffice (soffice); install it or set ARN_SOFFICE.")
+        return None
+    pdf_path = os.path.splitext(docx_path)[0] + '.pdf'
+    try:
+        with open(docx_path, 'rb') as f:
+            pdf = converter.convert(f.read())
+    except Exception as e:
+        print(f"Error: PDF conversion failed: {e}")
+        return None
+    finally:
+        converter.shutdown()
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf)
+    return pdf_path
+
+
+def resolve_template(app, template):
+    """Template path for --template: a registered id (new, old, ...) or a .docx path."""
+    if not template:
+        return app.TEMPLATE_DOCX
+    if template.lower().endswith('.docx') and os.path.exists(template):
+        return os.path.abspath(template)
+    try:
+        return app.TEMPLATES.get(template).path
+    except KeyError:
+        raise ValueError(f"unknown template '{template}' (use {', '.join(app.TEMPLATES.ids())} or a .docx file)") from None
+
+
+def expand_inputs(patterns, recursive=False):
+    """Files named by paths, directories and glob patterns, in order and without duplicates.
+
+    Directories contribute the workbooks and exports directly inside them (all
+    levels with recursive) and glob patterns the workbooks and exports they
+    match; Office lock files (~$...) are skipped.
+    """
+    import app
+
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                paths = sorted(os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names)
+            else:
+                paths = sorted(os.path.join(pattern, name) for name in os.listdir(pattern))
+            paths = [p for p in paths if os.path.isfile(p) and app.allowed_file(p)]
+        elif glob.has_magic(pattern):
+            paths = sorted(p for p in glob.glob(pattern, recursive=True)
+                           if os.path.isfile(p) and app.allowed_file(p))
+        else:
+            paths = [pattern]
+        found.extend(p for p in paths if not os.path.basename(p).startswith('~$'))
+    return list(dict.fromkeys(found))
+
+
+def render_file(source, output_path, template_path, fmt='docx', sheets=None, profile=None):
+    """Render one input file to output_path; returns its summary (runs in a worker process)."""
+    import app
+
+    entry = {'source': source, 'output': output_path, 'rows': 0, 'pages': 0}
+    start = time.perf_counter()
+    partial = output_path + '.part'
+    report = app.ValidationReport()
+
+    def counted(rows):
+        for row in rows:
+            entry['rows'] += 1
+            yield row
+
+    try:
+        kind = app.upload_kind(source)
+        if kind is None:
+            raise ValueError(f"unsupported file type (use {app.UPLOAD_TYPES})")
+        rows = app.iter_upload_rows(source, kind, sheets, report=report, context=app.profile_row_context(profile))
+        try:
+            # Files are already spread over processes, so pages are filled serially here
+            if fmt == 'pdf':
+                buffer = io.BytesIO()
+                entry['pages'] = app.write_word_document(template_path, counted(rows), buffer, workers=1)
+                if entry['pages']:
+                    with open(partial, 'wb') as f:
+                        f.write(app.PDF_CONVERTER.convert(buffer.getvalue()))
+            else:
+                entry['pages'] = app.write_word_document(template_path, counted(rows), partial, workers=1)
+        finally:
+            rows.close()
+        if not entry['pages']:
+            raise ValueError('No data found in Excel file')
+        os.replace(partial, output_path)
+    except Exception as e:
+        entry['error'] = str(e)
+        if os.path.exists(partial):
+            os.unlink(partial)
+    entry['issues'] = report.issue_count
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def run_files(inputs, output_dir, workers=None, fmt='docx', sheets=None, profile=None, template=None,
+              recursive=False, quiet=False):
+    """Render every input file to its own document in output_dir, workers files at a time."""
+    import app
+
+    try:
+        template_path = resolve_template(app, template)
+        app.profile_row_context(profile)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    except KeyError:
+        print(f"Error: unknown profile '{profile}' (see python profiles.py list)")
+        return 1
+    if fmt == 'pdf' and not app.PDF_CONVERTER.available:
+        print("Error: PDF output needs LibreOffice (soffice); install it or set ARN_SOFFICE.")
+        return 1
+
+    sources = expand_inputs(inputs, recursive)
+    missing = [path for path in sources if not os.path.exists(path)]
+    if missing:
+        print(f"Error: input '{missing[0]}' not found!")
+        return 1
+    if not sources:
+        print("Error: no Excel, CSV or Parquet files found in the inputs.")
+        return 1
+    os.makedirs(output_dir, exist_ok=True)
+    used = set()
+    jobs = [(source, os.path.join(output_dir, app._unique_name(app.output_name(os.path.basename(source), fmt), used)))
+            for source in sources]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    print(f"Processing {len(jobs)} file(s) with template '{os.path.basename(template_path)}' "
+          f"and {workers} worker(s)...")
+
+    results = []
+    start = time.perf_counter()
+
+    def done(entry):
+        results.append(entry)
+        if quiet and 'error' not in entry:
+            return
+        prefix = f"[{len(results)}/{len(jobs)}]"
+        if 'error' in entry:
+            print(f"{prefix} FAILED  {entry['source']}: {entry['error']}")
+        else:
+            issues = f", {entry['issues']} issue(s)" if entry['issues'] else ''
+            print(f"{prefix} OK      {entry['source']} -> {entry['output']} "
+                  f"({entry['rows']} rows, {entry['pages']} pages{issues}, {entry['seconds']}s)")
+
+    if workers == 1:
+        for source, output_path in jobs:
+            done(render_file(source, output_path, template_path, fmt, sheets, profile))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render_file, source, output_path, template_path, fmt, sheets, profile)
+                       for source, output_path in jobs]
+            for future in as_completed(futures):
+                done(future.result())
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for e in results if 'error' in e)
+    rows = sum(e['rows'] for e in results)
+    pages = sum(e['pages'] for e in results)
+    print(f"\nWrote {len(results) - failed} document(s) to {output_dir}, {failed} failed: "
+          f"{rows} rows, {pages} pages in {elapsed:.1f}s "
+          f"({len(results) / elapsed:.1f} files/s, {pages / elapsed:.1f} pages/s)")
+    return 1 if failed else 0
+
+
+def run_batch(inputs, output_zip, workers=None, fmt='docx', sheets=None, profile=None, template=None):
+    """Render many workbooks (or .zip archives of them) into one zip of forms."""
+    # Uses the web app's pipeline: shared template cache, streaming reader/writer
+    import app
+
+    try:
+        template_path = resolve_template(app, template)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    if not os.path.exists(template_path):
+        print(f"Error: Word document '{template_path}' not found!")
+        return 1
+    try:
+        context = app.profile_row_context(profile)
+    except KeyError:
+        print(f"Error: unknown profile '{profile}' (see python profiles.py list)")
+        return 1
+    if fmt == 'pdf':
+        if not app.PDF_CONVERTER.available:
+            print("Error: PDF output needs LibreOffice (soffice); install it or set ARN_SOFFICE.")
+            return 1
+        # Create every LibreOffice profile up front instead of on the first document
+        app.warm_pdf_converter()
+
+    named_files = []
+    for path in inputs:
+        if not os.path.exists(path):
+            print(f"Error: input '{path}' not found!")
+            return 1
+        named_files.append((path, open(path, 'rb')))
+
+    try:
+        print(f"Processing {len(named_files)} input(s) with template '{os.path.basename(template_path)}'...")
+        # Local files: the upload limits of /batch do not apply
+        workbooks = app.iter_batch_workbooks(named_files, max_files=0, max_file_bytes=0, max_total_bytes=0)
+        manifest = app.write_batch_zip(workbooks, output_zip, template_path, max_workers=workers, fmt=fmt,
+                                       sheets=sheets, context=context)
+    finally:
+        for _, f in named_files:
+            f.close()
+
+    for entry in manifest:
+        if 'error' in entry:
+            print(f"  FAILED  {entry['source']}: {entry['error']}")
+        else:
+            issues = f", {entry['issues']} issue(s)" if entry.get('issues') else ''
+            print(f"  OK      {entry['source']} -> {entry['output']} ({entry['rows']} rows, {entry['pages']} pages{issues})")
+    failed = sum(1 for e in manifest if 'error' in e)
+    print(f"\nWrote {output_zip}: {len(manifest) - failed} form(s), {failed} failed.")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Populate ARN change forms from Excel data.",
+        epilog="With inputs, each file becomes its own document in --output-dir (files are rendered in "
+               "parallel processes); with --batch they go into one zip. Without inputs the bundled "
+               "'Format for ARN change.xlsx' is filled into the legacy template.")
+    parser.add_argument('inputs', nargs='*',
+                        help="Excel, CSV, TSV or Parquet files, directories of them or glob patterns "
+                             "(quote them, e.g. 'clients/**/*.xlsx'); .zip archives with --batch")
+    parser.add_argument('-o', '--output-dir', default='.', help="where the documents are written (default: .)")
+    parser.add_argument('--batch', metavar='OUTPUT_ZIP',
+                        help="render every input into one zip of .docx files plus manifest.json")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="files rendered at once: worker processes (default: one per CPU), "
+                             "or threads with --batch")
+    parser.add_argument('--template', help="template id (new, old, or one from form_templates/) or a .docx file")
+    parser.add_argument('-r', '--recursive', action='store_true', help="include files in subdirectories of input directories")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="only print failures and the summary (no per-row or per-file output)")
+    parser.add_argument('--format', choices=('docx', 'pdf'), default='docx',
+                        help="output format (pdf needs LibreOffice)")
+    parser.add_argument('--sheets', help="comma-separated sheet names to read (default: all visible sheets)")
+    parser.add_argument('--profile', help="distributor profile for the new ARN values (default: default)")
+    args = parser.parse_args(argv)
+    # --quiet also drops the per-file INFO logs, unless ARN_LOG_LEVEL asks for them
+    configure_logging(level='WARNING' if args.quiet and not os.environ.get('ARN_LOG_LEVEL') else None)
+
+    sheets = [name.strip() for name in args.sheets.split(',') if name.strip()] if args.sheets else None
+    if args.batch:
+        if not args.inputs:
+            parser.error("--batch needs at least one input file")
+        return run_batch(args.inputs, args.batch, args.workers, args.format, sheets, args.profile, args.template)
+    if args.inputs:
+        return run_files(args.inputs, args.output_dir, args.workers, args.format, sheets, args.profile,
+                         args.template, args.recursive, args.quiet)
+
     # File paths
     excel_file = "Format for ARN change.xlsx"
     docx_file = "Request for Change of Broker.docx"
@@ -284,10 +546,11 @@ def main():
             return
         
         print(f"Excel data loaded - {len(excel_data)} row(s) found:")
-        for i, data in enumerate(excel_data, 1):
-            print(f"\nRow {i}:")
-            for key, value in data.items():
-                print(f"  {key}: {value}")
+        if not args.quiet:
+            for i, data in enumerate(excel_data, 1):
+                print(f"\nRow {i}:")
+                for key, value in data.items():
+                    print(f"  {key}: {value}")
         
         # Create output file with page count
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -298,6 +561,10 @@ def main():
         print(f"\nPopulating Word document with {page_count} page(s)...")
         result = populate_word_document(docx_file, excel_data, output_file)
         
+        if result and args.format == 'pdf':
+            output_file = convert_to_pdf(output_file)
+            if output_file is None:
+                return
         if result:
             print(f"\nSuccess! Generated {result} page(s) from {len(excel_data)} Excel row(s).")
             print(f"Output file: {output_file}")
@@ -308,4 +575,4 @@ def main():
         print(f"Error: {str(e)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
\ No newline at end of file
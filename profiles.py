@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""Distributor profiles: the values every row of an upload shares.
+
+A profile holds the new ARN, EUIN, place and the other fields of a
+rows.RowContext for one distributor entity, so one server can fill forms
+for several of them; requests pick a profile by id. Profiles live in a
+small SQLite file and are cached in memory. Every change bumps a
+generation number in the same file, so processes that share it (e.g.
+gunicorn workers) drop their cached profiles on the next lookup after a
+change.
+
+Manage profiles from the command line:
+
+    python profiles.py set acme --new-arn-code 123456 --new-arn-name "Acme Securities" \\
+        --new-euin-code E112233 --euin-name "A. Person" --place "Mumbai, Maharashtra"
+    python profiles.py list
+    python profiles.py delete acme
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from rows import CONTEXT_FIELDS
+
+PROFILE_ID_RE = re.compile(r'[a-z0-9][a-z0-9_-]{0,63}')
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    {', '.join(f"{field} TEXT NOT NULL DEFAULT ''" for field in CONTEXT_FIELDS)},
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+
+class ProfileStore:
+    """Profiles in a SQLite file at path, with an in-memory cache.
+
+    The file is only created by the first put(); until then the store is empty.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._generation = None
+
+    def _connect(self, create=False):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not create and not os.path.exists(self.path):
+                return None
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _current_generation(self, conn):
+        return conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def get(self, profile_id):
+        """Return the fields of a profile as a dict, or None if there is no such profile.
+
+        Only existing profiles are cached, so lookups of arbitrary ids (e.g. from
+        request parameters) cannot grow the cache.
+        """
+        if not isinstance(profile_id, str) or not PROFILE_ID_RE.fullmatch(profile_id):
+            return None
+        conn = self._connect()
+        if conn is None:
+            return None
+        generation = self._current_generation(conn)
+        with self._lock:
+            if generation != self._generation:
+                self._cache.clear()
+                self._generation = generation
+            if profile_id in self._cache:
+                return dict(self._cache[profile_id])
+        row = conn.execute('SELECT * FROM profiles WHERE id = ?', (profile_id,)).fetchone()
+        if row is None:
+            return None
+        values = {field: row[field] for field in CONTEXT_FIELDS}
+        with self._lock:
+            if self._generation == generation:
+                self._cache[profile_id] = values
+        return dict(values)
+
+    def list(self):
+        """Return [(id, fields)] of every profile, by id."""
+        conn = self._connect()
+        if conn is None:
+            return []
+        rows = conn.execute('SELECT * FROM profiles ORDER BY id').fetchall()
+        return [(row['id'], {field: row[field] for field in CONTEXT_FIELDS}) for row in rows]
+
+    def put(self, profile_id, values):
+        """Create or replace a profile; values maps CONTEXT_FIELDS to strings (missing fields are '')."""
+        if not PROFILE_ID_RE.fullmatch(profile_id):
+            raise ValueError(f"Invalid profile id '{profile_id}' (lower-case letters, digits, '-' and '_')")
+        unknown = set(values) - set(CONTEXT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown profile field(s): {', '.join(sorted(unknown))}")
+        conn = self._connect(create=True)
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO profiles (id, {', '.join(CONTEXT_FIELDS)}, updated_at) "
+                f"VALUES (?, {', '.join('?' for _ in CONTEXT_FIELDS)}, ?)",
+                (profile_id, *(str(values.get(field) or '') for field in CONTEXT_FIELDS), time.time()),
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    def delete(self, profile_id):
+        """Remove a profile; returns whether it existed."""
+        conn = self._connect()
+        if conn is None:
+            return False
+        with conn:
+            removed = conn.execute('DELETE FROM profiles WHERE id = ?', (profile_id,)).rowcount
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        return bool(removed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage distributor profiles')
+    parser.add_argument('--db', help='profile database (default: ARN_PROFILE_DB or profiles.db next to app.py)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='print every profile as JSON')
+    set_parser = commands.add_parser('set', help='create or replace a profile')
+    set_parser.add_argument('id')
+    for field in CONTEXT_FIELDS:
+        set_parser.add_argument('--' + field.replace('_', '-'), dest=field, default='')
+    delete_parser = commands.add_parser('delete', help='remove a profile')
+    delete_parser.add_argument('id')
+    args = parser.parse_args(argv)
+
+    path = args.db or os.environ.get('ARN_PROFILE_DB') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'profiles.db')
+    store = ProfileStore(path)
+    if args.command == 'list':
+        print(json.dumps({profile_id: values for profile_id, values in store.list()}, indent=2))
+    elif args.command == 'set':
+        try:
+            store.put(args.id, {field: getattr(args, field) for field in CONTEXT_FIELDS})
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Saved profile '{args.id}' to {path}")
+    elif args.command == 'delete':
+        if not store.delete(args.id):
+            print(f"No profile '{args.id}' in {path}", file=sys.stderr)
+            return 1
+        print(f"Deleted profile '{args.id}'")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+"""Disk cache of generated documents, keyed by content.
+
+Callers derive the key from everything that determines the output (upload
+bytes, template content hash, defaults, date), so an identical request is
+answered from disk without parsing or rendering. Entries are files named
+``<key><suffix>`` (``.docx`` by default) in one directory; the total size is bounded and the least
+recently used entries are evicted first.
+
+The directory itself is the index: lookups open the entry's file, recency
+is the files' modification times (touched on every hit) and the size limit
+is enforced over what the directory holds. So processes sharing a directory
+(e.g. gunicorn workers) share entries and one limit, and both survive
+restarts. Only the hit/miss/eviction counters are per process.
+"""
+
+import logging
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_KEY_RE = re.compile(r'^[0-9a-f]{16,128}$')
+
+
+def _private_directory(directory):
+    """Create directory (mode 0700) or check an existing one is private to this user.
+
+    The cache holds documents full of client data and serves whatever it finds,
+    so a directory owned by another user (or a symlink) is refused with an
+    OSError, and group/other access is removed from one we own.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if stat.S_ISLNK(st.st_mode):
+        raise OSError(f"{directory} is a symbolic link")
+    if not stat.S_ISDIR(st.st_mode):
+        raise OSError(f"{directory} is not a directory")
+    if hasattr(os, 'getuid'):
+        if st.st_uid != os.getuid():
+            raise OSError(f"{directory} is owned by another user (uid {st.st_uid})")
+        if stat.S_IMODE(st.st_mode) & 0o077:
+            os.chmod(directory, 0o700)
+
+
+class CacheEntryWriter:
+    """Collects a result being generated; commit() publishes it atomically."""
+
+    def __init__(self, cache, key):
+        self._cache = cache
+        self.key = key
+        fd, self._tmp_path = tempfile.mkstemp(suffix='.part', dir=cache.directory)
+        self._file = os.fdopen(fd, 'wb')
+        self.size = 0
+
+    def write(self, data):
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        self._file.close()
+        self._cache._publish(self.key, self._tmp_path, self.size)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+
+class ResultCache:
+    """Size-bounded LRU cache of result files in a directory."""
+
+    def __init__(self, directory, max_bytes, suffix='.docx'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.enabled:
+            try:
+                _private_directory(directory)
+            except OSError as e:
+                # Never serve or store documents in a directory others control
+                logger.error("Result cache disabled: %s", e)
+                self.max_bytes = 0
+                return
+            self._remove_stale_parts()
+            with self._lock:
+                self._evict()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _remove_stale_parts(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith('.part'):
+                continue
+            # Left behind by an interrupted write (recent ones may belong to another process)
+            path = os.path.join(self.directory, name)
+            try:
+                if time.time() - os.stat(path).st_mtime > 3600:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _scan(self):
+        """[(mtime, key, size)] of the entries in the directory, least recently used first."""
+        found = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                key, ext = os.path.splitext(item.name)
+                if ext != self.suffix or not _KEY_RE.match(key):
+                    continue
+                try:
+                    st = item.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process meanwhile
+                found.append((st.st_mtime, key, st.st_size))
+        found.sort()
+        return found
+
+    @property
+    def total_bytes(self):
+        return sum(size for _, _, size in self._scan())
+
+    def open(self, key):
+        """Return an open binary file for key, or None on a miss."""
+        if not self.enabled or not _KEY_RE.match(key):
+            return None
+        try:
+            f = open(self._path(key), 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return f
+
+    def writer(self, key):
+        """Return a CacheEntryWriter for key, or None when the cache is disabled."""
+        return CacheEntryWriter(self, key) if self.enabled else None
+
+    def _publish(self, key, tmp_path, size):
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._evict(keep=key)
+        logger.debug("Cached result %s (%s bytes)", key, size)
+
+    def _evict(self, keep=None):
+        """Remove the least recently used files until the directory fits in max_bytes.
+
+        keep (the entry just written) and the newest entry stay even if they
+        alone exceed max_bytes.
+        """
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+        for _, key, size in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            if self._remove_file(key):
+                self.evictions += 1
+            total -= size
+
+    def _remove_file(self, key):
+        """Delete an entry's file; returns whether this call removed it."""
+        try:
+            os.unlink(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning("Could not remove cached result %s: %s", key, e)
+            return False
+
+    def invalidate(self, key=None):
+        """Remove one entry (or every entry when key is None); returns the number removed."""
+        if not self.enabled:
+            return 0
+        if key is None:
+            keys = [k for _, k, _ in self._scan()]
+        else:
+            keys = [key] if _KEY_RE.match(key) else []
+        return sum(1 for k in keys if self._remove_file(k))
+
+    def stats(self):
+        """Counters of this process; entries and bytes of the whole directory."""
+        entries = self._scan() if self.enabled else []
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'bytes': sum(size for _, _, size in entries),
+                'max_bytes': self.max_bytes,
+            }
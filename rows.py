@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""Compact row records for uploaded data.
+
+A Row holds only what differs from row to row (folio, scheme, investor,
+PAN, old ARN, mutual fund and sheet). The values every row of an upload
+shares (new ARN, EUIN, place, ...) live once in a RowContext that each row
+points to. Rows still read like the plain dicts the populate functions were
+written for: row['new_arn_code'] and row.get('place') resolve through the
+context, and dict(row) gives the full mapping.
+"""
+
+from collections.abc import Mapping
+
+ROW_FIELDS = ('mutual_fund', 'folio_no', 'scheme_name', 'investor', 'pan', 'old_arn_code', 'old_arn_name')
+CONTEXT_FIELDS = (
+    'new_arn_code', 'new_arn_name', 'new_sub_arn_code', 'new_euin_code', 'sub_distributor_name',
+    'euin_name', 'arn_euin_holder_signature', 'new_distributor_staff_info', 'place',
+)
+_ROW_FIELDS = frozenset(ROW_FIELDS)
+_CONTEXT_FIELDS = frozenset(CONTEXT_FIELDS)
+
+
+class RowContext:
+    """Values shared by every row of one upload; missing fields are ''."""
+
+    __slots__ = CONTEXT_FIELDS
+
+    def __init__(self, **values):
+        unknown = set(values) - _CONTEXT_FIELDS
+        if unknown:
+            raise TypeError(f"Unknown row context field(s): {', '.join(sorted(unknown))}")
+        for field in CONTEXT_FIELDS:
+            setattr(self, field, values.get(field, ''))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in CONTEXT_FIELDS}
+
+    def __eq__(self, other):
+        return isinstance(other, RowContext) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, field) for field in CONTEXT_FIELDS))
+
+    def __repr__(self):
+        return f'RowContext({self.to_dict()!r})'
+
+
+class Row(Mapping):
+    """One upload row: per-row fields in slots, shared values read from its context.
+
+    sheet is None unless the row was tagged with its worksheet, and only
+    appears as a key when set (like the 'sheet' key of tagged row dicts).
+    """
+
+    __slots__ = ROW_FIELDS + ('sheet', 'context')
+
+    def __init__(self, context, folio_no='', scheme_name='', investor='', pan='',
+                 old_arn_code='', old_arn_name='', mutual_fund='Multiple', sheet=None):
+        self.context = context
+        self.mutual_fund = mutual_fund
+        self.folio_no = folio_no
+        self.scheme_name = scheme_name
+        self.investor = investor
+        self.pan = pan
+        self.old_arn_code = old_arn_code
+        self.old_arn_name = old_arn_name
+        self.sheet = sheet
+
+    def __getitem__(self, key):
+        if key in _ROW_FIELDS:
+            return getattr(self, key)
+        if key in _CONTEXT_FIELDS:
+            return getattr(self.context, key)
+        if key == 'sheet' and self.sheet is not None:
+            return self.sheet
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from ROW_FIELDS
+        yield from CONTEXT_FIELDS
+        if self.sheet is not None:
+            yield 'sheet'
+
+    def __len__(self):
+        return len(ROW_FIELDS) + len(CONTEXT_FIELDS) + (self.sheet is not None)
+
+    def __repr__(self):
+        return f'Row({dict(self)!r})'
@@ -53,8 +53,8 @@ echo.
 timeout /t 3 /nobreak >nul
 start http://localhost:8000
 
-:: Start the Flask application (this will keep running)
-python app.py
+:: Start the production server (this will keep running)
+python wsgi.py
 
 :: This will only execute if the Python app exits
 echo.
@@ -67,5 +67,5 @@ elif command -v start &> /dev/null; then
     start http://localhost:8000
 fi
 
-# Start the Flask application (this will keep running)
-python app.py
\ No newline at end of file
+# Start the production server (this will keep running)
+python -m gunicorn -c gunicorn.conf.py wsgi:application
\ No newline at end of file
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+"""Process-wide cache of parsed .docx templates.
+
+Each template is parsed once and kept as a pristine ``w:document`` tree.
+Pages are filled on cheap deep copies of that tree instead of re-reading
+and re-parsing the .docx zip for every page.
+"""
+
+import copy
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from docx import Document
+from docx.document import Document as DocumentObject
+
+
+class CompiledTemplate:
+    """A template parsed once, handing out fresh copies for each page."""
+
+    def __init__(self, path, mtime_ns, content_hash, blob):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+        self.blob = blob
+        self._source = Document(io.BytesIO(blob))
+        self._element = self._source.element
+        self._compiled = {}
+        self._compile_lock = threading.Lock()
+        # Pages may be requested from several threads (jobs, batches)
+        self._copy_lock = threading.Lock()
+
+    @property
+    def key(self):
+        return (self.path, self.mtime_ns, self.content_hash)
+
+    def new_document(self):
+        """Return a full, independent Document (used as the output container)."""
+        return Document(io.BytesIO(self.blob))
+
+    def new_page(self):
+        """Return a Document proxy over a deep copy of the template XML.
+
+        The copy shares the parsed package (styles, relationships, media) with
+        the cache entry, so it is only meant to be filled and have its body
+        elements moved into an output document.
+        """
+        with self._copy_lock:
+            element = copy.deepcopy(self._element)
+        return DocumentObject(element, self._source.part)
+
+    def compiled(self, name, builder):
+        """Return builder(document) computed once against the pristine template.
+
+        builder must only read the document; its result is shared by every page.
+        """
+        with self._compile_lock:
+            if name not in self._compiled:
+                self._compiled[name] = builder(self._source)
+            return self._compiled[name]
+
+
+def element_path(element):
+    """Return the child-index path from the document root down to element."""
+    path = []
+    parent = element.getparent()
+    while parent is not None:
+        path.append(parent.index(element))
+        element, parent = parent, parent.getparent()
+    return tuple(reversed(path))
+
+
+def resolve_path(root, path):
+    """Return the element at a path produced by element_path on an identical tree."""
+    element = root
+    for index in path:
+        element = element[index]
+    return element
+
+
+class TemplateCache:
+    """LRU cache of CompiledTemplate keyed by path, mtime and content hash.
+
+    A pinned template is returned for its path without checking the file,
+    until another version is pinned (see template_registry).
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pinned = {}
+        # (path, mtime_ns, size) -> content hash, so unchanged files are not re-hashed
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, template_path):
+        """Return the CompiledTemplate for template_path, parsing it on a miss."""
+        path = os.path.abspath(template_path)
+        pinned = self._pinned.get(path)
+        if pinned is not None:
+            with self._lock:
+                self.hits += 1
+            return pinned
+        return self.load(path)
+
+    def load(self, template_path, reload=False):
+        """Return the CompiledTemplate of the file as it is now, ignoring pins.
+
+        With reload, the file is parsed again even if it has not changed, so
+        the result shares nothing (e.g. compiled form specs) with earlier entries.
+        """
+        path = os.path.abspath(template_path)
+        st = os.stat(path)
+        stat_key = (path, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            content_hash = None if reload else self._hashes.get(stat_key)
+            if content_hash is not None:
+                key = (path, st.st_mtime_ns, content_hash)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+
+        with open(path, 'rb') as f:
+            blob = f.read()
+        content_hash = hashlib.sha256(blob).hexdigest()
+        key = (path, st.st_mtime_ns, content_hash)
+
+        with self._lock:
+            self._hashes[stat_key] = content_hash
+            entry = None if reload else self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        # Parse outside the lock; a concurrent miss on the same key just wins the race
+        entry = CompiledTemplate(path, st.st_mtime_ns, content_hash, blob)
+
+        with self._lock:
+            self.misses += 1
+            # Drop stale versions of the same file before inserting the new one
+            for old_key in [k for k in self._entries if k[0] == path]:
+                del self._entries[old_key]
+            self._hashes = {k: v for k, v in self._hashes.items() if k[0] != path or k == stat_key}
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._hashes = {k: v for k, v in self._hashes.items() if k[0] != evicted_key[0]}
+                self.evictions += 1
+            return self._entries[key]
+
+    def pin(self, template):
+        """Serve template for its path from now on, whatever the file holds."""
+        with self._lock:
+            self._pinned[template.path] = template
+
+    def unpin(self, template_path):
+        with self._lock:
+            self._pinned.pop(os.path.abspath(template_path), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hashes.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'pinned': len(self._pinned),
+                'max_entries': self.max_entries,
+            }
+
+
+TEMPLATE_CACHE = TemplateCache(max_entries=int(os.environ.get('ARN_TEMPLATE_CACHE_SIZE', '8')))
+
+
+def get_template(template_path):
+    """Return the process-wide CompiledTemplate for template_path."""
+    return TEMPLATE_CACHE.get(template_path)
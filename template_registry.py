@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""Registry of the form templates a request can choose from.
+
+Templates are the bundled ones (by fixed id, e.g. 'new' and 'old') plus
+every .docx in a templates directory, whose id is its file name without
+the extension (lower-cased, other characters than letters and digits
+turned into '-'). refresh() parses and validates each template whose file
+or form spec changed and pins the new version in the template cache, so
+requests never parse a template themselves and a render in progress keeps
+the version it started with. A template that fails to load keeps its
+previous version (or stays unavailable) until its files change again.
+
+watch() runs refresh() periodically on a background thread, so edited,
+added and removed templates are picked up without a restart.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def template_id(path):
+    """The id of a template in the templates directory: 'ARN Form (HDFC).docx' -> 'arn-form-hdfc'."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'[^a-z0-9]+', '-', stem.lower()).strip('-')
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class RegisteredTemplate:
+    """One loaded version of a template: its CompiledTemplate and CompiledForm."""
+
+    __slots__ = ('id', 'path', 'template', 'form', 'stamp', 'loaded_at')
+
+    def __init__(self, template_id, path, template, form, stamp):
+        self.id = template_id
+        self.path = path
+        self.template = template
+        self.form = form
+        self.stamp = stamp
+        self.loaded_at = time.time()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'file': os.path.basename(self.path),
+            'form': self.form.spec.name,
+            'rows_per_page': self.form.rows_per_page,
+            'content_hash': self.template.content_hash,
+            'spec_hash': self.form.spec_hash,
+            'loaded_at': self.loaded_at,
+        }
+
+
+class TemplateRegistry:
+    """Loaded templates by id.
+
+    bundled maps ids to template paths, directory (optional) holds further
+    templates. load(path) returns the (CompiledTemplate, CompiledForm) of a
+    template, raising if it cannot be used; spec_path(path) names the files
+    besides the .docx whose changes trigger a reload. pin(template) makes a
+    loaded version the one served for its path.
+    """
+
+    def __init__(self, bundled, directory=None, load=None, spec_path=None, pin=None, unpin=None):
+        self.bundled = dict(bundled)
+        self.directory = directory
+        self._load = load
+        self._spec_path = spec_path
+        self._pin = pin
+        self._unpin = unpin
+        self._entries = {}
+        self._failed = {}  # path -> stamp that failed to load, so it is reported once
+        self._refresh_lock = threading.Lock()
+        self._stop = None
+        self.reloads = 0
+        self.errors = 0
+
+    def sources(self):
+        """Current {id: path} of bundled templates and templates in the directory."""
+        found = {tid: os.path.abspath(path) for tid, path in self.bundled.items() if os.path.exists(path)}
+        if self.directory and os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if not name.lower().endswith('.docx') or name.startswith(('~$', '.')):
+                    continue
+                path = os.path.abspath(os.path.join(self.directory, name))
+                tid = template_id(path)
+                if tid in found:
+                    if found[tid] != path:
+                        logger.warning("Ignoring template %s: id '%s' is already taken by %s",
+                                       path, tid, found[tid])
+                    continue
+                found[tid] = path
+        return found
+
+    def _file_stamp(self, path):
+        spec = self._spec_path(path) if self._spec_path else None
+        return (_stamp(path), _stamp(spec) if spec else None)
+
+    def refresh(self):
+        """Load new and changed templates and drop removed ones; returns the ids that changed."""
+        with self._refresh_lock:
+            entries = dict(self._entries)
+            changed = []
+            sources = self.sources()
+            for tid, path in sources.items():
+                stamp = self._file_stamp(path)
+                current = entries.get(tid)
+                if current is not None and current.path == path and current.stamp == stamp:
+                    continue
+                if self._failed.get(path) == stamp:
+                    continue
+                started = time.perf_counter()
+                try:
+                    template, form = self._load(path)
+                except Exception as e:
+                    self.errors += 1
+                    self._failed[path] = stamp
+                    if current is not None:
+                        logger.error("Could not reload template '%s' (%s), keeping the loaded version: %s",
+                                     tid, path, e)
+                    else:
+                        logger.error("Could not load template '%s' (%s): %s", tid, path, e)
+                    continue
+                self._failed.pop(path, None)
+                if self._pin:
+                    self._pin(template)
+                entries[tid] = RegisteredTemplate(tid, path, template, form, stamp)
+                changed.append(tid)
+                if current is not None:
+                    self.reloads += 1
+                logger.info("%s template '%s' (%s, form '%s') in %.0f ms",
+                            'Reloaded' if current is not None else 'Loaded', tid,
+                            os.path.basename(path), form.spec.name, (time.perf_counter() - started) * 1000)
+            for tid in [tid for tid in entries if tid not in sources]:
+                removed = entries.pop(tid)
+                if self._unpin:
+                    self._unpin(removed.path)
+                changed.append(tid)
+                logger.info("Removed template '%s' (%s)", tid, removed.path)
+            # Requests look templates up without the lock; swap the whole mapping at once
+            self._entries = entries
+            return changed
+
+    def get(self, template_id=None):
+        """Return the RegisteredTemplate for template_id (default: the first bundled one).
+
+        Raises KeyError for an unknown or unavailable id.
+        """
+        entries = self._entries
+        if template_id is None:
+            template_id = self.default_id
+        if template_id not in entries:
+            raise KeyError(template_id)
+        return entries[template_id]
+
+    @property
+    def default_id(self):
+        entries = self._entries
+        for tid in self.bundled:
+            if tid in entries:
+                return tid
+        return next(iter(entries), None)
+
+    def ids(self):
+        return list(self._entries)
+
+    def paths(self):
+        return [entry.path for entry in self._entries.values()]
+
+    def to_dict(self):
+        return {
+            'default': self.default_id,
+            'templates': [entry.to_dict() for entry in self._entries.values()],
+        }
+
+    def watch(self, interval):
+        """Call refresh() every interval seconds on a daemon thread, until stop()."""
+        if self._stop is not None:
+            return
+        self._stop = threading.Event()
+        stop = self._stop
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Template refresh failed")
+
+        threading.Thread(target=run, name='arn-template-watch', daemon=True).start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
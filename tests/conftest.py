@@ -0,0 +1,21 @@
+"""Shared setup: import app with a fixed, isolated configuration."""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app reads these at import time: no caches, no stored profiles or extra
+# templates, serial rendering, default page packing
+_scratch = tempfile.mkdtemp(prefix='arn-tests-')
+os.environ.update({
+    'ARN_RESULT_CACHE_BYTES': '0',
+    'ARN_PAGE_CACHE_BYTES': '0',
+    'ARN_RENDER_WORKERS': '1',
+    'ARN_PROFILE_DB': os.path.join(_scratch, 'profiles.db'),
+    'ARN_TEMPLATE_DIR': os.path.join(_scratch, 'form_templates'),
+    'ARN_LOG_LEVEL': 'WARNING',
+})
+os.environ.pop('ARN_PAGE_PACKING', None)
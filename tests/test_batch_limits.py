@@ -0,0 +1,55 @@
+"""Batch uploads: .zip archives are expanded only within the BATCH_MAX_* limits."""
+
+import io
+import zipfile
+
+import pytest
+
+import app
+
+
+def archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return buffer.getvalue()
+
+
+def expand(data, **limits):
+    return list(app.iter_batch_workbooks([('upload.zip', io.BytesIO(data))], **limits))
+
+
+def test_members_are_filtered():
+    data = archive({'a.csv': b'x', 'notes.txt': b'x', '~$a.xlsx': b'x', '__MACOSX/._b.csv': b'x', 'd/b.tsv': b'y'})
+    assert expand(data) == [('a.csv', b'x'), ('b.tsv', b'y')]
+
+
+def test_member_over_size_limit_is_not_decompressed():
+    # 100 MB of zeros compresses to about 100 KB
+    data = archive({'big.csv': b'\0' * (100 * 1024 * 1024)})
+    assert len(data) < 1024 * 1024
+    with pytest.raises(app.BatchTooLarge, match='big.csv'):
+        expand(data, max_file_bytes=1024 * 1024)
+
+
+def test_total_size_limit():
+    data = archive({f'{i}.csv': b'x' * 1000 for i in range(5)})
+    with pytest.raises(app.BatchTooLarge, match='larger than 3000 bytes'):
+        expand(data, max_total_bytes=3000)
+    assert len(expand(data, max_total_bytes=5000)) == 5
+
+
+def test_file_count_limit():
+    data = archive({f'{i}.csv': b'x' for i in range(4)})
+    with pytest.raises(app.BatchTooLarge, match='More than 3 files'):
+        expand(data, max_files=3)
+    assert len(expand(data, max_files=0)) == 4
+
+
+def test_batch_endpoint_rejects_oversized_archive(monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_MAX_FILE_BYTES', 1024)
+    data = archive({'big.csv': b'\0' * 4096})
+    response = app.app.test_client().post('/batch', data={'files': (io.BytesIO(data), 'forms.zip')})
+    assert response.status_code == 413
+    assert 'big.csv' in response.get_json()['error']
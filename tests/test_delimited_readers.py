@@ -0,0 +1,68 @@
+"""CSV/TSV exports: encoding detection, and result cache keys per reader kind."""
+
+import io
+
+import pytest
+
+import app
+from result_cache import ResultCache
+
+TSV = ('Scheme Name\tFolio No\tPAN\tInvestor\tOld ARN\tOld ARN Name\n'
+       'Equity Fund, Growth\t1001\tABCDE1234F\tInvestor One\tARN-1\tBroker, One\n')
+
+
+def test_utf8_with_bom():
+    data = ('﻿' + TSV.replace('Investor One', 'Zoë Investor')).encode('utf-8')
+    rows = list(app.iter_upload_rows(io.BytesIO(data), 'tsv'))
+    assert [row['investor'] for row in rows] == ['Zoë Investor']
+    assert rows[0]['scheme_name'] == 'Equity Fund, Growth'
+
+
+def test_windows_1252_fallback():
+    data = TSV.replace('Investor One', 'Zoë Investor').encode('cp1252')
+    assert app.detect_text_encoding(io.BytesIO(data)) == 'cp1252'
+    rows = list(app.iter_upload_rows(io.BytesIO(data), 'tsv'))
+    assert [row['investor'] for row in rows] == ['Zoë Investor']
+
+
+def test_undecodable_file_fails_before_any_row():
+    # 0x81 is undefined in Windows-1252 and invalid as UTF-8
+    data = TSV.encode() + b'Fund\t1002\t\t\x81\tARN-2\tBroker\n'
+    rows = app.iter_upload_rows(io.BytesIO(data), 'tsv')
+    with pytest.raises(ValueError, match='neither UTF-8 nor Windows-1252'):
+        next(rows)
+
+
+def test_csv_and_tsv_read_the_same_bytes_differently():
+    data = TSV.encode()
+    as_tsv = list(app.iter_upload_rows(io.BytesIO(data), 'tsv'))
+    as_csv = list(app.iter_upload_rows(io.BytesIO(data), 'csv'))
+    assert as_tsv[0]['scheme_name'] != as_csv[0]['scheme_name']
+
+
+def test_result_cache_key_includes_reader_kind():
+    template = app.TEMPLATES.get().template
+    upload = io.BytesIO(TSV.encode())
+    assert (app.result_cache_key(upload, template, kind='tsv')
+            != app.result_cache_key(upload, template, kind='csv'))
+
+
+def test_upload_as_csv_does_not_hit_the_tsv_result(tmp_path, monkeypatch):
+    # Regression: the same bytes posted as x.tsv and then as x.csv were served the TSV document
+    monkeypatch.setattr(app, 'RESULT_CACHE', ResultCache(str(tmp_path / 'results'), 1024 * 1024))
+    client = app.app.test_client()
+    data = TSV.encode()
+
+    def post(name):
+        response = client.post('/upload', data={'file': (io.BytesIO(data), name)})
+        body = response.get_data()
+        response.close()
+        return response, body
+
+    first, tsv_document = post('x.tsv')
+    assert first.status_code == 200 and first.headers['X-Result-Cache'] == 'miss'
+    second, csv_document = post('x.csv')
+    assert second.status_code == 200 and second.headers['X-Result-Cache'] == 'miss'
+    third, _ = post('x.tsv')
+    assert third.headers['X-Result-Cache'] == 'hit'
+    assert tsv_document != csv_document
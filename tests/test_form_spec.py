@@ -0,0 +1,55 @@
+"""FormSpec validation: malformed specs are rejected with FormSpecError."""
+
+import json
+import os
+
+import pytest
+
+import app
+from form_spec import FormSpec, FormSpecError, load_form_spec
+
+
+def test_bundled_specs_load():
+    for path in app.BUNDLED_FORM_SPECS:
+        spec = load_form_spec(path)
+        assert spec.rows_per_page >= 1
+
+
+@pytest.mark.parametrize('data, message', [
+    ([], 'expected a JSON object'),
+    ({'unknown': 1}, "unknown key(s) unknown"),
+    ({'rows_per_page': 0}, 'rows_per_page must be a positive integer'),
+    ({'rows_per_page': '6'}, 'rows_per_page must be a positive integer'),
+    ({'page_fields': {'header': {'mixed': 'Multiple'}}}, "page field 'header' needs 'common'"),
+    ({'paragraphs': [{'text': 'x'}]}, 'match needs some of'),
+    ({'paragraphs': [{'match': {'contains': 'Date'}, 'text': 'x'}]}, "'contains' must be a list"),
+    ({'paragraphs': [{'match': {'startswith': 'Date:'}}]}, "give either 'text' or 'runs'"),
+    ({'paragraphs': [{'match': {'startswith': 'Date:'}, 'text': 'x', 'runs': []}]},
+     "give either 'text' or 'runs'"),
+    ({'paragraphs': [{'match': {'startswith': 'Date:'}, 'text': 'Date: {date'}]}, 'paragraphs[0]'),
+    ({'paragraphs': [{'match': {'startswith': 'Date:'}, 'text': '{row.pan}'}]}, 'is not a plain field name'),
+    ({'tokens': [{'tokens': [], 'text': '{pan}'}]}, "'tokens' must be a non-empty list"),
+    ({'tokens': [{'tokens': ['X'], 'text': 5}]}, 'text must be a string'),
+    ({'cells': [{'table': '1', 'row': 0, 'columns': {'0': '{pan}'}}]}, "'table' and 'row' must be integers"),
+    ({'cells': [{'table': 1, 'row': 0, 'columns': {'a': '{pan}'}}]}, "'columns' must map column numbers"),
+])
+def test_invalid_spec(data, message):
+    with pytest.raises(FormSpecError) as e:
+        FormSpec(data, source='test.json')
+    assert message in str(e.value)
+    assert str(e.value).startswith('test.json')
+
+
+def test_load_form_spec_reports_bad_json(tmp_path):
+    path = tmp_path / 'broken.json'
+    path.write_text('{"rows_per_page": ')
+    with pytest.raises(FormSpecError) as e:
+        load_form_spec(str(path))
+    assert os.fspath(path) in str(e.value)
+
+
+def test_content_hash_follows_content():
+    with open(app.BUNDLED_FORM_SPECS[0]) as f:
+        data = json.load(f)
+    assert FormSpec(data).content_hash == FormSpec(dict(data)).content_hash
+    assert FormSpec(data).content_hash != FormSpec(dict(data, rows_per_page=3)).content_hash
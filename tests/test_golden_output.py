@@ -0,0 +1,53 @@
+"""Golden output: the bundled sample workbook rendered with both templates.
+
+word/document.xml must match tests/golden/ byte for byte. After an intended
+change to the output, regenerate the files with
+
+    ARN_UPDATE_GOLDEN=1 python -m pytest tests/test_golden_output.py
+
+and review the diff.
+"""
+
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+import app
+import form_spec
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+SAMPLE_WORKBOOK = os.path.join(app.APP_DIR, 'Format for ARN change.xlsx')
+
+
+class _FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 7, 30, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def fixed_date(monkeypatch):
+    # Pages are dated with today's date
+    monkeypatch.setattr(form_spec, 'datetime', _FixedDatetime)
+
+
+@pytest.mark.parametrize('template_id, golden', [
+    ('new', 'new_arn_change_form.xml'),
+    ('old', 'request_for_change_of_broker.xml'),
+])
+def test_sample_workbook_matches_golden(template_id, golden):
+    template = app.TEMPLATES.get(template_id).template
+    output = io.BytesIO()
+    pages = app.write_word_document(template, app.iter_excel_rows(SAMPLE_WORKBOOK), output, workers=1)
+    assert pages > 0
+    document = zipfile.ZipFile(output).read('word/document.xml')
+
+    path = os.path.join(GOLDEN_DIR, golden)
+    if os.environ.get('ARN_UPDATE_GOLDEN') == '1':
+        with open(path, 'wb') as f:
+            f.write(document)
+    with open(path, 'rb') as f:
+        assert document == f.read()
@@ -0,0 +1,108 @@
+"""JobQueue: results, failures, backpressure and TTL cleanup."""
+
+import threading
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, RUNNING, JobQueue, QueueFull
+
+
+def _wait(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, f'job still {job.status}'
+        time.sleep(0.01)
+    return job
+
+
+def _age(job, seconds):
+    job.finished_at -= seconds
+
+
+class Discardable:
+    discarded = False
+
+    def discard(self):
+        self.discarded = True
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1, max_pending=2, ttl_seconds=60)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+def test_result_and_progress(queue):
+    def work(job, count):
+        for _ in range(count):
+            job.row_parsed()
+        job.page_rendered(2)
+        return 'ok'
+
+    job = _wait(queue.submit(work, 3))
+    assert job.status == DONE and job.result == 'ok' and job.error is None
+    assert job.rows_parsed == 3 and job.pages_rendered == 2
+    assert job.started_at <= job.finished_at
+    assert queue.get(job.id) is job
+
+
+def test_failed_job(queue):
+    def work(job):
+        raise ValueError('bad row')
+
+    job = _wait(queue.submit(work))
+    assert job.status == FAILED and job.error == 'bad row'
+    assert job.finished_at is not None
+    assert job.to_dict()['error'] == 'bad row'
+
+
+def test_queue_full_until_a_job_finishes(queue):
+    release = threading.Event()
+    jobs = [queue.submit(lambda job: release.wait(5)) for _ in range(2)]
+    with pytest.raises(QueueFull):
+        queue.submit(lambda job: None)
+    assert queue.stats()['queued'] + queue.stats()['running'] == 2
+    release.set()
+    for job in jobs:
+        _wait(job)
+    _wait(queue.submit(lambda job: None))
+
+
+def test_finished_jobs_expire_with_their_files(queue, tmp_path):
+    result_path = tmp_path / 'result.docx'
+    upload_path = tmp_path / 'upload.xlsx'
+    result_path.write_bytes(b'docx')
+    upload_path.write_bytes(b'xlsx')
+    result = Discardable()
+
+    job = _wait(queue.submit(lambda job: result, result_path=str(result_path),
+                             cleanup_paths=[str(upload_path)]))
+    assert queue.cleanup() == 0
+    assert result_path.exists()
+
+    _age(job, 61)
+    assert queue.get(job.id) is None
+    assert not result_path.exists() and not upload_path.exists()
+    assert result.discarded
+    assert queue.stats()['finished'] == 0
+
+
+def test_unfinished_jobs_never_expire(queue):
+    release = threading.Event()
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        release.wait(5)
+
+    running = queue.submit(work)
+    assert started.wait(5)
+    queued = queue.submit(lambda job: None)
+    queue.ttl_seconds = 0
+    time.sleep(0.01)
+    assert queue.cleanup() == 0
+    assert running.status == RUNNING and queue.get(queued.id) is queued
+    release.set()
+    _wait(queued)
@@ -0,0 +1,87 @@
+"""pack_pages and iter_page_chunks: how rows are split into pages."""
+
+import os
+
+import app
+from app import iter_page_chunks, pack_pages
+
+FIELDS = ('mutual_fund', 'old_arn_code')
+
+
+def rows(*groups):
+    """One row dict per (mutual fund, old ARN) pair, numbered in order."""
+    return [{'mutual_fund': fund, 'old_arn_code': arn, 'n': i} for i, (fund, arn) in enumerate(groups)]
+
+
+def numbers(pages):
+    return [[row['n'] for row in page] for page in pages]
+
+
+def test_groups_never_share_a_page():
+    data = rows(('A', '1'), ('B', '1'), ('A', '1'), ('A', '2'), ('B', '1'))
+    pages = list(pack_pages(data, 6, FIELDS))
+    assert numbers(pages) == [[0, 2], [1, 4], [3]]
+    for page in pages:
+        assert len({(row['mutual_fund'], row['old_arn_code']) for row in page}) == 1
+
+
+def test_full_pages_come_first_then_partial_pages_in_first_seen_order():
+    data = rows(*[('A', '1')] * 7, ('B', '1'), ('B', '1'))
+    assert numbers(pack_pages(data, 3, FIELDS)) == [[0, 1, 2], [3, 4, 5], [6], [7, 8]]
+
+
+def test_fewest_pages_per_group():
+    data = rows(*[('A', '1'), ('B', '1')] * 7)
+    pages = list(pack_pages(data, 6, FIELDS))
+    # 7 rows of each group: ceil(7 / 6) = 2 pages each
+    assert len(pages) == 4
+    assert sorted(len(page) for page in pages) == [1, 1, 6, 6]
+    assert sorted(n for page in numbers(pages) for n in page) == list(range(14))
+
+
+def test_streams_rows():
+    def endless():
+        n = 0
+        while True:
+            yield {'mutual_fund': 'A', 'old_arn_code': '1', 'n': n}
+            n += 1
+
+    first = next(pack_pages(endless(), 6, FIELDS))
+    assert [row['n'] for row in first] == [0, 1, 2, 3, 4, 5]
+
+
+def test_empty_input():
+    assert list(pack_pages([], 6, FIELDS)) == []
+
+
+def test_missing_fields_group_together():
+    data = [{'n': 0}, {'n': 1, 'mutual_fund': ''}]
+    assert numbers(pack_pages(data, 6, FIELDS)) == [[0, 1]]
+
+
+def test_page_chunks_keep_file_order_and_split_sheets():
+    data = [{'sheet': 'S1', 'n': n} for n in range(4)] + [{'sheet': 'S2', 'n': n} for n in range(4, 6)]
+    assert numbers(iter_page_chunks(data, 3)) == [[0, 1, 2], [3], [4, 5]]
+
+
+def _sample_row(**values):
+    row = dict(next(app.iter_excel_rows(os.path.join(app.APP_DIR, 'Format for ARN change.xlsx'))))
+    row.update(values)
+    return row
+
+
+def _page_count(template_id, data, packing):
+    template = app.TEMPLATES.get(template_id).template
+    return sum(1 for _ in app.iter_page_bodies(template, template.path, data, workers=1, packing=packing))
+
+
+def test_packing_modes():
+    # Two AMCs interleaved: grouping needs a page each, file order fits one page
+    data = [_sample_row(mutual_fund=fund) for fund in ('A', 'B') * 3]
+    assert _page_count('new', data, 'group') == 2
+    assert _page_count('new', data, 'file') == 1
+
+
+def test_packing_does_not_apply_to_one_row_pages():
+    data = [_sample_row(mutual_fund=fund) for fund in ('A', 'B', 'A')]
+    assert _page_count('old', data, 'group') == _page_count('old', data, 'file') == 3
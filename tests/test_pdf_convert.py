@@ -0,0 +1,71 @@
+"""PdfConverter profile directories: created once per process, removed on exit."""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from pdf_convert import PdfConverter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not os.path.exists('/bin/true'), reason='needs a stand-in executable')
+
+
+def test_shutdown_removes_profiles():
+    converter = PdfConverter(binary='/bin/true', workers=2)
+    converter._get_slots()
+    root = converter._root
+    assert sorted(os.listdir(root)) == ['profile0', 'profile1']
+    converter.shutdown()
+    assert not os.path.exists(root)
+
+
+def run(script):
+    """Run script in a fresh interpreter; returns the profile roots it printed."""
+    code = textwrap.dedent(f'''
+        import sys
+        sys.path.insert(0, {ROOT!r})
+        from pdf_convert import PdfConverter
+        converter = PdfConverter(binary='/bin/true')
+
+        def root(_=None):
+            converter._get_slots()
+            return converter._root
+    ''') + textwrap.dedent(script)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return output.split()
+
+
+def test_profiles_are_removed_at_exit():
+    roots = run('print(root())')
+    assert roots and not any(os.path.exists(r) for r in roots)
+
+
+def test_process_pool_workers_remove_their_profiles():
+    roots = run('''
+        from concurrent.futures import ProcessPoolExecutor
+        if __name__ == '__main__':
+            with ProcessPoolExecutor(2) as executor:
+                print(*set(executor.map(root, range(4))))
+    ''')
+    assert roots and not any(os.path.exists(r) for r in roots)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_child_keeps_the_parents_profiles():
+    roots = run('''
+        import os
+        parent = root()
+        pid = os.fork()
+        if pid == 0:
+            print(root())  # the child's own directory
+            sys.exit(0)
+        os.waitpid(pid, 0)
+        print(parent, os.path.exists(parent))
+    ''')
+    child, parent, parent_existed = roots
+    assert child != parent and parent_existed == 'True'
+    assert not os.path.exists(parent) and not os.path.exists(child)
@@ -0,0 +1,72 @@
+"""ProfileStore: storage, validation and cache invalidation across processes."""
+
+import pytest
+
+from profiles import ProfileStore
+
+ACME = {'new_arn_code': '123456', 'new_arn_name': 'Acme Securities', 'place': 'Mumbai'}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'profiles.db')
+
+
+def test_empty_store_has_no_file(path, tmp_path):
+    store = ProfileStore(path)
+    assert store.get('acme') is None
+    assert store.list() == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_put_get_list_delete(path):
+    store = ProfileStore(path)
+    store.put('acme', ACME)
+    values = store.get('acme')
+    assert values['new_arn_code'] == '123456' and values['new_euin_code'] == ''
+    assert [profile_id for profile_id, _ in store.list()] == ['acme']
+    assert store.delete('acme')
+    assert not store.delete('acme')
+    assert store.get('acme') is None
+
+
+def test_returned_values_are_copies(path):
+    store = ProfileStore(path)
+    store.put('acme', ACME)
+    store.get('acme')['new_arn_code'] = 'changed'
+    assert store.get('acme')['new_arn_code'] == '123456'
+
+
+@pytest.mark.parametrize('profile_id', ['Acme', '../x', '', '-acme', 'a' * 65])
+def test_invalid_ids_are_rejected(path, profile_id):
+    with pytest.raises(ValueError, match='Invalid profile id'):
+        ProfileStore(path).put(profile_id, ACME)
+
+
+def test_unknown_fields_are_rejected(path):
+    with pytest.raises(ValueError, match='Unknown profile field'):
+        ProfileStore(path).put('acme', {'colour': 'blue'})
+
+
+def test_misses_are_not_cached(path):
+    # Regression: every unknown id from a request used to stay in the cache
+    store = ProfileStore(path)
+    store.put('acme', ACME)
+    for i in range(100):
+        assert store.get(f'unknown-{i}') is None
+    assert store.get('Not A Valid Id!') is None
+    assert list(store._cache) == []
+    store.get('acme')
+    assert list(store._cache) == ['acme']
+
+
+def test_changes_reach_other_processes(path):
+    # Two stores on one file stand in for two gunicorn workers
+    first = ProfileStore(path)
+    second = ProfileStore(path)
+    first.put('acme', ACME)
+    assert second.get('acme')['place'] == 'Mumbai'
+    first.put('acme', dict(ACME, place='Pune'))
+    assert second.get('acme')['place'] == 'Pune'
+    first.delete('acme')
+    assert second.get('acme') is None
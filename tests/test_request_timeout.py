@@ -0,0 +1,52 @@
+"""ARN_REQUEST_TIMEOUT: /upload and /batch stop rendering at the request deadline."""
+
+import io
+import json
+import time
+import zipfile
+
+import pytest
+
+import app
+
+
+def csv_upload(rows=50):
+    lines = ['Scheme Name,Folio No,PAN,Investor,Old ARN,Old ARN Name']
+    lines += [f'Scheme {i},{1000 + i},,Investor {i},ARN-1,Broker' for i in range(rows)]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def test_rows_until_passes_rows_before_the_deadline():
+    assert list(app.rows_until(iter([1, 2, 3]), time.monotonic() + 60)) == [1, 2, 3]
+    assert list(app.rows_until(iter([1, 2, 3]), None)) == [1, 2, 3]
+
+def test_rows_until_stops_after_the_deadline():
+    rows = app.rows_until(iter([1, 2, 3]), time.monotonic() - 1)
+    with pytest.raises(app.RequestTimeout):
+        next(rows)
+
+def test_no_deadline_when_disabled(monkeypatch):
+    monkeypatch.setattr(app, 'REQUEST_TIMEOUT', 0)
+    assert app.request_deadline() is None
+
+def test_upload_past_deadline_redirects_with_message(monkeypatch):
+    monkeypatch.setattr(app, 'REQUEST_TIMEOUT', 1e-9)
+    client = app.app.test_client()
+    response = client.post('/upload', data={'file': (io.BytesIO(csv_upload()), 'x.csv')})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert 'longer than' in session['_flashes'][0][1]
+
+def test_upload_within_deadline(monkeypatch):
+    monkeypatch.setattr(app, 'REQUEST_TIMEOUT', 60)
+    response = app.app.test_client().post('/upload', data={'file': (io.BytesIO(csv_upload()), 'x.csv')})
+    assert response.status_code == 200
+    assert response.get_data()[:2] == b'PK'
+
+def test_batch_past_deadline_lists_failures(monkeypatch):
+    monkeypatch.setattr(app, 'REQUEST_TIMEOUT', 1e-9)
+    response = app.app.test_client().post('/batch', data={'files': (io.BytesIO(csv_upload()), 'x.csv')})
+    assert response.status_code == 200
+    manifest = json.loads(zipfile.ZipFile(io.BytesIO(response.get_data())).read('manifest.json'))
+    assert manifest['failed'] == 1
+    assert 'longer than' in manifest['files'][0]['error']
@@ -0,0 +1,135 @@
+"""ResultCache: lookups, LRU eviction and sharing a directory between processes;
+result_cache_key: what a cached document depends on."""
+
+import io
+import os
+import time
+
+import pytest
+
+import app
+from result_cache import ResultCache
+from rows import RowContext
+
+KEYS = [c * 16 for c in 'abcdef']
+
+
+def put(cache, key, size):
+    writer = cache.writer(key)
+    writer.write(b'x' * size)
+    writer.commit()
+    # Distinct modification times, so recency is unambiguous
+    time.sleep(0.01)
+
+
+def read(cache, key):
+    f = cache.open(key)
+    if f is None:
+        return None
+    with f:
+        return f.read()
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'results')
+
+
+def test_hit_and_miss(directory):
+    cache = ResultCache(directory, 1000)
+    assert read(cache, KEYS[0]) is None
+    put(cache, KEYS[0], 10)
+    assert read(cache, KEYS[0]) == b'x' * 10
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_invalid_keys_are_never_paths(directory):
+    cache = ResultCache(directory, 1000)
+    assert cache.open('../../etc/passwd') is None
+    assert cache.invalidate('../x') == 0
+
+
+def test_least_recently_used_entries_are_evicted(directory):
+    cache = ResultCache(directory, 1000)
+    put(cache, KEYS[0], 400)
+    put(cache, KEYS[1], 400)
+    read(cache, KEYS[0])  # now more recent than KEYS[1]
+    time.sleep(0.01)
+    put(cache, KEYS[2], 400)
+    assert read(cache, KEYS[1]) is None
+    assert read(cache, KEYS[0]) is not None and read(cache, KEYS[2]) is not None
+    assert cache.stats()['bytes'] == 800
+
+
+def test_oversized_entry_is_kept_alone(directory):
+    cache = ResultCache(directory, 1000)
+    put(cache, KEYS[0], 400)
+    put(cache, KEYS[1], 5000)
+    assert cache.stats()['entries'] == 1
+    assert read(cache, KEYS[1]) is not None
+
+
+def test_processes_share_entries_and_one_limit(directory):
+    # Two instances on one directory stand in for two gunicorn workers
+    first = ResultCache(directory, 1000)
+    second = ResultCache(directory, 1000)
+    put(first, KEYS[0], 400)
+    assert read(second, KEYS[0]) is not None
+    put(second, KEYS[1], 400)
+    put(first, KEYS[2], 400)
+    assert first.stats()['bytes'] <= 1000
+    assert second.stats()['bytes'] <= 1000
+    assert read(second, KEYS[2]) is not None
+
+
+def test_invalidate(directory):
+    cache = ResultCache(directory, 1000)
+    for key in KEYS[:3]:
+        put(cache, key, 10)
+    assert cache.invalidate(KEYS[0]) == 1
+    assert cache.invalidate(KEYS[0]) == 0
+    assert cache.invalidate() == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_failed_write_leaves_nothing(directory):
+    cache = ResultCache(directory, 1000)
+    writer = cache.writer(KEYS[0])
+    writer.write(b'partial')
+    writer.abort()
+    assert read(cache, KEYS[0]) is None
+    assert os.listdir(directory) == []
+
+
+def test_disabled_cache(directory):
+    cache = ResultCache(directory, 0)
+    assert not cache.enabled
+    assert cache.writer(KEYS[0]) is None
+    assert cache.open(KEYS[0]) is None
+
+
+def test_directory_is_private(directory):
+    ResultCache(directory, 1000)
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='needs symlinks')
+def test_symlinked_directory_is_refused(tmp_path):
+    target = tmp_path / 'elsewhere'
+    target.mkdir()
+    link = tmp_path / 'results'
+    link.symlink_to(target)
+    assert not ResultCache(str(link), 1000).enabled
+
+
+def test_result_cache_key_covers_what_shapes_the_document():
+    new = app.TEMPLATES.get('new').template
+    old = app.TEMPLATES.get('old').template
+    upload = io.BytesIO(b'workbook bytes')
+    key = app.result_cache_key(upload, new)
+    assert upload.tell() == 0
+    assert app.result_cache_key(upload, new) == key
+    assert app.result_cache_key(io.BytesIO(b'other bytes'), new) != key
+    assert app.result_cache_key(upload, old) != key
+    assert app.result_cache_key(upload, new, sheets=['Sheet1']) != key
+    assert app.result_cache_key(upload, new, context=RowContext(new_arn_code='999999')) != key
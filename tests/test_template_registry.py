@@ -0,0 +1,119 @@
+"""TemplateRegistry: loading, hot reload, failed reloads, removal and pinning."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import app
+from template_registry import TemplateRegistry, template_id
+
+BROKER_DOCX = os.path.join(app.APP_DIR, 'Request for Change of Broker.docx')
+
+
+def _touch(path, seconds=1):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def _rename_form(spec_path, name):
+    with open(spec_path, encoding='utf-8') as f:
+        spec = json.load(f)
+    spec['name'] = name
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    _touch(spec_path)
+
+
+@pytest.fixture
+def directory(tmp_path):
+    shutil.copy(BROKER_DOCX, tmp_path / 'Broker Form (Copy).docx')
+    shutil.copy(app.form_spec_path(BROKER_DOCX), tmp_path / 'Broker Form (Copy).json')
+    return tmp_path
+
+
+@pytest.fixture
+def registry(directory):
+    registry = TemplateRegistry(
+        {'new': app.NEW_TEMPLATE_DOCX},
+        str(directory),
+        load=app.load_registered_template,
+        spec_path=app.form_spec_path,
+        pin=app.TEMPLATE_CACHE.pin,
+        unpin=app.TEMPLATE_CACHE.unpin,
+    )
+    yield registry
+    for path in registry.paths():
+        app.TEMPLATE_CACHE.unpin(path)
+
+
+def test_template_id():
+    assert template_id('/x/ARN Form (HDFC).docx') == 'arn-form-hdfc'
+
+
+def test_refresh_loads_bundled_and_directory_templates(registry):
+    assert sorted(registry.refresh()) == ['broker-form-copy', 'new']
+    assert registry.default_id == 'new'
+    assert registry.get().id == 'new'
+    assert registry.get('broker-form-copy').form.spec.name == 'Request for Change of Broker'
+    assert registry.refresh() == []
+    assert registry.reloads == 0 and registry.errors == 0
+    with pytest.raises(KeyError):
+        registry.get('missing')
+
+
+def test_spec_change_reloads_and_pins_the_new_version(registry, directory):
+    registry.refresh()
+    before = registry.get('broker-form-copy')
+    assert app.TEMPLATE_CACHE.get(before.path) is before.template
+
+    _rename_form(str(directory / 'Broker Form (Copy).json'), 'Broker v2')
+    assert registry.refresh() == ['broker-form-copy']
+    after = registry.get('broker-form-copy')
+    assert after.form.spec.name == 'Broker v2'
+    assert after.template is not before.template
+    assert registry.reloads == 1
+    assert app.TEMPLATE_CACHE.get(after.path) is after.template
+    # A render that started on the old version still has a usable form
+    assert before.form.spec.name == 'Request for Change of Broker'
+
+
+def test_broken_spec_keeps_the_loaded_version(registry, directory):
+    registry.refresh()
+    before = registry.get('broker-form-copy')
+    spec_path = directory / 'Broker Form (Copy).json'
+
+    spec_path.write_text('{not json', encoding='utf-8')
+    _touch(str(spec_path))
+    assert registry.refresh() == []
+    assert registry.get('broker-form-copy') is before
+    assert registry.errors == 1
+    # The failure is reported once, not on every refresh
+    assert registry.refresh() == []
+    assert registry.errors == 1
+
+    shutil.copy(app.form_spec_path(BROKER_DOCX), spec_path)
+    _touch(str(spec_path), 2)
+    assert registry.refresh() == ['broker-form-copy']
+    assert registry.get('broker-form-copy') is not before
+
+
+def test_unusable_new_template_stays_unavailable(registry, directory):
+    (directory / 'Empty.docx').write_bytes(b'not a docx')
+    assert 'empty' not in registry.refresh()
+    assert 'empty' not in registry.ids()
+    assert registry.errors == 1
+
+
+def test_removed_template_is_dropped_and_unpinned(registry, directory):
+    registry.refresh()
+    path = registry.get('broker-form-copy').path
+    assert path in app.TEMPLATE_CACHE._pinned
+
+    os.remove(path)
+    assert registry.refresh() == ['broker-form-copy']
+    assert registry.ids() == ['new']
+    assert path not in app.TEMPLATE_CACHE._pinned
+    with pytest.raises(KeyError):
+        registry.get('broker-form-copy')
@@ -0,0 +1,62 @@
+"""Validation of uploaded rows: malformed PANs, missing and duplicate folios."""
+
+import io
+
+import pytest
+
+import app
+from validation import (DUPLICATE_FOLIO, MALFORMED_PAN, MISSING_FOLIO, ValidationReport,
+                        looks_like_malformed_pan)
+
+
+@pytest.mark.parametrize('value', ['ABCD1234FF', 'ABCDE12345', 'ABCDEF234F'])
+def test_mistyped_pans(value):
+    assert looks_like_malformed_pan(value)
+
+
+@pytest.mark.parametrize('value', ['OVERRIDE12', 'EQUITYFUND', 'SCHEME', '1234567890', 'ABC-1234-F', 'ABCDE1234'])
+def test_scheme_names_are_not_pans(value):
+    assert not looks_like_malformed_pan(value)
+
+
+def test_check_row():
+    report = ValidationReport()
+    report.check_row(2, 'S1', '1001', 'Scheme A', 'ABCDE1234F', 'ABCDE1234F')
+    report.check_row(3, 'S1', '', 'Scheme A', '', '')
+    report.check_row(4, 'S1', '1001', 'Scheme A', '', 'ABCD1234FF')
+    report.check_row(5, 'S2', '1001', 'Scheme A', '', 'Override scheme')
+    assert report.rows == 4
+    assert report.counts == {MALFORMED_PAN: 1, MISSING_FOLIO: 1, DUPLICATE_FOLIO: 1}
+    assert [(d['problem'], d['row']) for d in report.details] == [
+        (MISSING_FOLIO, 3), (DUPLICATE_FOLIO, 4), (MALFORMED_PAN, 4)]
+    assert 'first on row 2' in report.details[1]['value']
+
+
+def test_details_are_capped_but_every_issue_counted():
+    report = ValidationReport(max_details=2)
+    for row in range(2, 7):
+        report.check_row(row, None, '', 'Scheme', '', '')
+    summary = report.to_dict()
+    assert summary['issues'] == 5 and len(summary['details']) == 2 and summary['truncated']
+
+
+def test_merge():
+    first, second = ValidationReport(max_details=3), ValidationReport()
+    first.check_row(2, 'S1', '', 'Scheme', '', '')
+    for row in range(2, 5):
+        second.check_row(row, 'S2', '', 'Scheme', '', '')
+    first.merge(second)
+    assert first.rows == 4 and first.counts[MISSING_FOLIO] == 4 and len(first.details) == 3
+
+
+def test_readers_fill_the_report():
+    data = ('Scheme Name,Folio No,PAN,Investor,Old ARN,Old ARN Name\n'
+            'Scheme A,1001,ABCDE1234F,One,ARN-1,Broker\n'
+            'Scheme A,1001,ABCD1234FF,Two,ARN-1,Broker\n'
+            'Scheme B,,,Three,ARN-1,Broker\n').encode()
+    report = ValidationReport()
+    rows = list(app.iter_upload_rows(io.BytesIO(data), 'csv', report=report))
+    assert len(rows) == 3
+    # Nothing is changed: the malformed PAN is read as a scheme override, as before
+    assert rows[1]['pan'] == '' and rows[1]['scheme_name'] == 'ABCD1234FF'
+    assert report.counts == {MALFORMED_PAN: 1, MISSING_FOLIO: 1, DUPLICATE_FOLIO: 0}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""Validation report for uploaded rows.
+
+The readers fill a ValidationReport while they normalize rows, so problems
+are found in the same pass that reads the file: malformed PANs in column C,
+rows without a folio number and folio + scheme pairs that appear more than
+once on a sheet. Nothing is dropped or changed; the report only lists rows
+to check before the forms are sent out.
+"""
+
+import re
+
+_ALNUM_10_RE = re.compile(r'[A-Z0-9]{10}')
+# Character class of each position of a PAN (AAAAA9999A)
+_PAN_SHAPE = 'AAAAA9999A'
+
+MALFORMED_PAN = 'malformed_pan'
+MISSING_FOLIO = 'missing_folio'
+DUPLICATE_FOLIO = 'duplicate_folio'
+PROBLEMS = (MALFORMED_PAN, MISSING_FOLIO, DUPLICATE_FOLIO)
+
+
+def looks_like_malformed_pan(value):
+    """True if value (upper-cased, spaces removed) looks like a mistyped PAN rather than a scheme name.
+
+    That is ten letters and digits, at least one a digit, with at most two
+    positions off the PAN shape ('ABCD1234FF' is, 'OVERRIDE12' is not).
+    """
+    if not _ALNUM_10_RE.fullmatch(value) or value.isalpha():
+        return False
+    misplaced = sum(ch.isdigit() != (kind == '9') for ch, kind in zip(value, _PAN_SHAPE))
+    return misplaced <= 2
+
+
+class ValidationReport:
+    """Issues found in the rows of one upload.
+
+    Every issue is counted; details are kept for the first max_details only.
+    """
+
+    def __init__(self, max_details=1000):
+        self.max_details = max_details
+        self.rows = 0
+        self.counts = dict.fromkeys(PROBLEMS, 0)
+        self.details = []
+        self._seen = {}  # (sheet, folio, scheme) -> first row number
+
+    @property
+    def issue_count(self):
+        return sum(self.counts.values())
+
+    def add(self, problem, row, sheet=None, value=''):
+        self.counts[problem] += 1
+        if len(self.details) < self.max_details:
+            issue = {'problem': problem, 'row': row, 'value': value}
+            if sheet is not None:
+                issue['sheet'] = sheet
+            self.details.append(issue)
+
+    def check_row(self, row, sheet, folio, scheme, pan, column_c):
+        """Check one normalized row; pan is '' when column_c is not a valid PAN."""
+        self.rows += 1
+        if not folio:
+            self.add(MISSING_FOLIO, row, sheet, scheme)
+        elif (sheet, folio, scheme) in self._seen:
+            self.add(DUPLICATE_FOLIO, row, sheet,
+                     f"{folio} / {scheme} (first on row {self._seen[sheet, folio, scheme]})")
+        else:
+            self._seen[sheet, folio, scheme] = row
+        if not pan and column_c and looks_like_malformed_pan(column_c.upper().replace(' ', '')):
+            self.add(MALFORMED_PAN, row, sheet, column_c)
+
+    def merge(self, other):
+        """Add the issues of a report for other sheets (e.g. parsed in a worker process)."""
+        self.rows += other.rows
+        for problem, count in other.counts.items():
+            self.counts[problem] += count
+        room = self.max_details - len(self.details)
+        self.details.extend(other.details[:max(room, 0)])
+        self._seen.update(other._seen)
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'issues': self.issue_count,
+            'counts': dict(self.counts),
+            'details': list(self.details),
+            'truncated': self.issue_count > len(self.details),
+        }
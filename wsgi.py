@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""Production entry point.
+
+Pre-forking, multi-worker (Linux/macOS)::
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Single process, multi-threaded (any platform, including Windows)::
+
+    python wsgi.py
+
+Both are configured with the ARN_WEB_* environment variables (see README,
+"Production serving"). Importing this module parses every template (see
+app.TEMPLATES); gunicorn.conf.py does that once in the master.
+"""
+
+import logging
+import os
+
+from app import app, start_background_tasks
+
+application = app
+
+logger = logging.getLogger(__name__)
+
+
+def web_threads():
+    return int(os.environ.get('ARN_WEB_THREADS', '8'))
+
+
+def request_timeout():
+    # 0 turns off the app's request deadline, not waitress's idle timeout
+    return int(os.environ.get('ARN_REQUEST_TIMEOUT', '120')) or 120
+
+
+def serve():
+    """Serve with waitress: one process, ARN_WEB_THREADS threads."""
+    from waitress import serve as waitress_serve
+
+    bind = os.environ.get('ARN_BIND', '0.0.0.0:8000')
+    host, _, port = bind.rpartition(':')
+    start_background_tasks()
+    logger.info("Serving on %s with %s thread(s)", bind, web_threads())
+    waitress_serve(
+        application,
+        host=host or '0.0.0.0',
+        port=int(port),
+        threads=web_threads(),
+        # Idle connections are closed after this long; responses themselves are streamed
+        channel_timeout=request_timeout(),
+        connection_limit=int(os.environ.get('ARN_WEB_CONNECTIONS', '100')),
+        ident='arn-form-generator',
+    )
+
+
+if __name__ == '__main__':
+    serve()